@@ -0,0 +1,29 @@
+from celery import Celery
+from app.config.settings import settings
+from app.util.transcode_scheduler import transcode_slots
+
+# Started by docker-compose as: celery -A app.celery worker
+celery_app = Celery(
+    "post_interaction_reel",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.task.reel_task"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    # A transcode takes minutes: ack only once it finished so a crashed worker's job is redelivered,
+    # and never reserve more jobs than a worker process is running
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    # One prefork process per transcode slot: processes x TRANSCODE_THREADS ~ the cores
+    worker_concurrency=transcode_slots(),
+    # Redis serves priority 0 first; enqueue_transcode gives short clips the low numbers
+    broker_transport_options={"queue_order_strategy": "priority", "priority_steps": list(range(10))},
+    task_default_priority=5,
+    task_track_started=True,
+    result_expires=24 * 3600
+)
@@ -1,7 +1,57 @@
 import redis
+import redis.asyncio as aioredis
+from typing import Optional
 from app.config.settings import settings
 
 redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Cache payloads are binary (see app/util/serializer.py) and must not be decoded as text
+redis_binary_client = redis.from_url(settings.REDIS_URL)
+
+# Event-loop client for async endpoints (binary, like redis_binary_client); created on startup by init_async_redis
+async_redis_pool: Optional[aioredis.ConnectionPool] = None
+async_redis_client: Optional[aioredis.Redis] = None
 
 def get_redis():
     return redis_client
+
+def get_redis_binary():
+    return redis_binary_client
+
+def _create_async_pool() -> aioredis.ConnectionPool:
+    return aioredis.ConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+
+async def init_async_redis() -> aioredis.Redis:
+    """Open the async connection pool (called from the app lifespan)"""
+    global async_redis_pool, async_redis_client
+    if async_redis_client is None:
+        async_redis_pool = _create_async_pool()
+        async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
+    try:
+        await async_redis_client.ping()
+    except Exception as e:
+        print(f"Async Redis connection error: {e}")
+    return async_redis_client
+
+async def close_async_redis() -> None:
+    """Close the async client and every pooled connection"""
+    global async_redis_pool, async_redis_client
+    if async_redis_client is not None:
+        await async_redis_client.aclose()
+    if async_redis_pool is not None:
+        await async_redis_pool.disconnect()
+    async_redis_client = None
+    async_redis_pool = None
+
+def get_async_redis() -> aioredis.Redis:
+    global async_redis_pool, async_redis_client
+    if async_redis_client is None:
+        # Outside the app lifespan (scripts, tests) the pool is created lazily
+        async_redis_pool = _create_async_pool()
+        async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
+    return async_redis_client
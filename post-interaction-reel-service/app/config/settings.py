@@ -8,6 +8,9 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
+    REDIS_MAX_CONNECTIONS: int = 50  # async pool size per worker
+    REDIS_SOCKET_TIMEOUT: float = 2.0  # seconds
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds an idle connection goes unchecked
     
     # MinIO/S3
     MINIO_ENDPOINT: str = "localhost:9000"
@@ -22,6 +25,11 @@ class Settings(BaseSettings):
     AWS_REGION: str = "us-east-1"
     S3_BUCKET_NAME: Optional[str] = None
     
+    # Storage client (one pooled client per process, shared by MinIO and S3 paths)
+    STORAGE_MAX_POOL_CONNECTIONS: int = 32  # per process; minio sends up to 3 parts per upload in parallel
+    STORAGE_CONNECT_TIMEOUT: float = 5.0  # seconds
+    STORAGE_READ_TIMEOUT: float = 60.0  # seconds
+    
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
@@ -33,17 +41,56 @@ class Settings(BaseSettings):
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    TRANSCODE_MAX_RETRIES: int = 2  # retries of a reel transcode after storage/DB errors
+    TRANSCODE_THREADS: int = 2  # FFmpeg -threads per transcode (decoder, filters, each encoder)
+    TRANSCODE_WORKERS: Optional[int] = None  # concurrent transcodes per worker; default cores // TRANSCODE_THREADS
+    TRANSCODE_MAX_QUEUE: int = 50  # waiting transcodes before new reels are refused with 503
+    TRANSCODE_DURATION_WEIGHT: float = 10.0  # queue seconds a clip yields per second of its length
     
     # File upload
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # bytes buffered per multipart part (S3 minimum is 5MB)
+    UPLOAD_MAX_CONCURRENCY: int = 8  # concurrent storage uploads per worker, across all requests
+    UPLOAD_REQUEST_CONCURRENCY: int = 4  # concurrent uploads of one multi-file request
+    UPLOAD_SESSION_TTL: int = 3600  # seconds a presigned upload URL and its session stay valid
+    UPLOAD_SESSION_MAX_FILES: int = 10  # files per direct-to-storage upload session
+    MEDIA_DEDUP_ENABLED: bool = True  # store identical uploads (by SHA-256) once, reference-counted
+    IMAGE_FORMAT: str = "webp"  # encoding of post image variants: webp, or avif (needs pillow-avif-plugin on Pillow < 11.2)
+    IMAGE_QUALITY: int = 80  # encoder quality of the variants (0-100)
+    IMAGE_MAX_SIZE: int = 20 * 1024 * 1024  # 20MB; larger post images are refused (they are decoded whole)
+    IMAGE_WORKERS: Optional[int] = None  # image resize/encode processes per worker; defaults to one per available core
     ALLOWED_IMAGE_TYPES: list = ["image/jpeg", "image/png", "image/gif", "image/webp"]
     ALLOWED_VIDEO_TYPES: list = ["video/mp4", "video/avi", "video/mov", "video/quicktime"]
     
+    # Service thread pool (blocking SQLAlchemy/redis/S3 calls from async routes)
+    SERVICE_POOL_SIZE: int = 15  # threads per worker; keep <= DB pool_size + max_overflow (5 + 10)
+    
     # Reel settings
     MAX_REEL_DURATION: int = 60  # seconds
+    REEL_HLS_ENABLED: bool = True  # also encode the 240p/480p/720p HLS ladder next to the MP4
+    REEL_HLS_SEGMENT_SECONDS: int = 4  # HLS segment length (and keyframe interval of the ladder)
+    REEL_STREAMING_TRANSCODE: bool = True  # pipe the fragmented MP4 into its upload instead of a temp file
+    REEL_THUMBNAIL_CANDIDATES: int = 8  # keyframes scored (with the 1s frame) to pick the thumbnail; 0: 1s frame only
+    REEL_SPRITE_ENABLED: bool = True  # also render a low-res sprite sheet of frames for scrubbing
     
     # Cache settings
     CACHE_TTL: int = 3600  # 1 hour
+    CACHE_SERIALIZER: str = "orjson"  # orjson, msgpack or json
+    CACHE_COMPRESSION: str = "zstd"  # zstd, zlib or none
+    CACHE_COMPRESSION_THRESHOLD: int = 1024  # bytes; smaller payloads are stored uncompressed
+    LOCAL_CACHE_MAX_ENTRIES: int = 1000
+    LOCAL_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 32MB per worker
+    LOCAL_CACHE_TTL: float = 5.0  # seconds; bounds staleness if an invalidation message is lost
+    CACHE_EARLY_REFRESH_BETA: float = 1.0  # >1 refreshes earlier, 0 disables early refresh
+    CACHE_LOCK_TIMEOUT: float = 10.0  # seconds a rebuild lock is held at most
+    CACHE_LOCK_WAIT: float = 2.0  # seconds a miss waits for another worker's rebuild
+    RESPONSE_CACHE_TTL: int = 300  # seconds a pre-rendered feed response body is kept
+    FEED_PAGE_SIZE: int = 20  # default page size of feed endpoints
+    FEED_PREWARM_PAGES: int = 3  # global/reel feed pages rebuilt right after an invalidation
+    
+    # Home timeline (fan-out on write)
+    TIMELINE_MAX_LENGTH: int = 800  # post ids kept per follower
+    TIMELINE_CELEBRITY_THRESHOLD: int = 10000  # followers above which posts are pulled on read
     
     # Debug mode
     DEBUG: bool = True
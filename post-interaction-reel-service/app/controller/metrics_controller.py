@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from app.util.cache_helper import cache_stats
+from app.util.executor import executor_stats
+from app.util.transcode_scheduler import transcode_stats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """Get per-tier cache hit rates of this worker"""
+    return cache_stats()
+
+@router.get("/executor")
+async def get_executor_metrics():
+    """Get size, backlog and queue time of this worker's service and upload thread pools"""
+    return executor_stats()
+
+@router.get("/transcode")
+async def get_transcode_metrics():
+    """Get slots, backlog and queue time of this process's transcode scheduler (in-process transcodes)"""
+    return transcode_stats()
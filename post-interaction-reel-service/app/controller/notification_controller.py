@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.config.database import get_db
 from app.service.notification_service import NotificationService
 from app.schema.notification_schema import NotificationResponse, NotificationListResponse, MarkAsReadRequest
+from app.util.executor import run_sync
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -15,10 +16,17 @@ async def get_notifications(
     user_id: int = 1,  # This would come from JWT token
     page: int = 1,
     size: int = 20,
+    cursor: Optional[str] = None,
     service: NotificationService = Depends(get_notification_service)
 ):
     """Get user notifications"""
-    return service.get_user_notifications(user_id, page, size)
+    try:
+        return await run_sync(service.get_user_notifications, user_id, page, size, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.get("/unread-count")
 async def get_unread_count(
@@ -26,7 +34,7 @@ async def get_unread_count(
     service: NotificationService = Depends(get_notification_service)
 ):
     """Get unread notification count"""
-    count = service.get_unread_count(user_id)
+    count = await run_sync(service.get_unread_count, user_id)
     return {"unread_count": count}
 
 @router.patch("/mark-read")
@@ -36,7 +44,7 @@ async def mark_notifications_as_read(
     service: NotificationService = Depends(get_notification_service)
 ):
     """Mark specific notifications as read"""
-    updated_count = service.mark_as_read(request.notification_ids, user_id)
+    updated_count = await run_sync(service.mark_as_read, request.notification_ids, user_id)
     return {
         "message": f"Marked {updated_count} notifications as read",
         "updated_count": updated_count
@@ -48,7 +56,7 @@ async def mark_all_notifications_as_read(
     service: NotificationService = Depends(get_notification_service)
 ):
     """Mark all notifications as read"""
-    updated_count = service.mark_all_as_read(user_id)
+    updated_count = await run_sync(service.mark_all_as_read, user_id)
     return {
         "message": f"Marked {updated_count} notifications as read",
         "updated_count": updated_count
@@ -61,7 +69,7 @@ async def delete_notification(
     service: NotificationService = Depends(get_notification_service)
 ):
     """Delete notification"""
-    success = service.delete_notification(notification_id, user_id)
+    success = await run_sync(service.delete_notification, notification_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -79,7 +87,8 @@ async def test_like_notification(
     service: NotificationService = Depends(get_notification_service)
 ):
     """Test like notification (for development)"""
-    success = service.send_like_notification(
+    success = await run_sync(
+        service.send_like_notification,
         post_owner_id, actor_id, actor_name, post_id, post_type
     )
     if success:
@@ -100,7 +109,8 @@ async def test_comment_notification(
     service: NotificationService = Depends(get_notification_service)
 ):
     """Test comment notification (for development)"""
-    success = service.send_comment_notification(
+    success = await run_sync(
+        service.send_comment_notification,
         post_owner_id, actor_id, actor_name, post_id, post_type
     )
     if success:
@@ -119,7 +129,7 @@ async def test_follow_notification(
     service: NotificationService = Depends(get_notification_service)
 ):
     """Test follow notification (for development)"""
-    success = service.send_follow_notification(user_id, actor_id, actor_name)
+    success = await run_sync(service.send_follow_notification, user_id, actor_id, actor_name)
     if success:
         return {"message": "Follow notification sent successfully"}
     else:
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Header, Response, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.config.database import get_db
+from app.config.settings import settings
 from app.service.post_service import PostService
-from app.schema.post_schema import PostCreate, PostUpdate, PostResponse, PostFeedResponse
+from app.schema.post_schema import PostCreate, PostUpdate, PostResponse, PostFeedResponse, PostUploadComplete
+from app.schema.upload_schema import UploadSessionCreate, UploadSessionResponse
 from app.schema.comment_schema import CommentCreate, CommentUpdate, CommentResponse, LikeRequest
-from app.util.s3_helper import S3Helper
+from app.util.s3_helper import get_s3_helper
+from app.util.image_pipeline import has_variants
+from app.util.upload_helper import upload_files
+from app.util.pagination import next_cursor
+from app.util.response_cache import rendered_response
+from app.util.executor import run_sync
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
@@ -15,12 +22,17 @@ def get_post_service(db: Session = Depends(get_db)) -> PostService:
 @router.post("/", response_model=PostResponse)
 async def create_post(
     post: PostCreate,
+    background_tasks: BackgroundTasks,
     user_id: int = 1,  # This would come from JWT token in real implementation
+    follower_ids: List[int] = Query([]),  # This would come from follow service
     service: PostService = Depends(get_post_service)
 ):
     """Create a new post"""
     try:
-        return service.create_post(post, user_id)
+        created = await run_sync(service.create_post, post, user_id, follower_ids)
+        # Rebuild the first global feed pages after the response instead of on the next reader's miss
+        background_tasks.add_task(service.prewarm_global_feed)
+        return created
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -32,10 +44,12 @@ async def upload_post_media(
     files: List[UploadFile] = File(...),
     content: Optional[str] = Form(None)
 ):
-    """Upload media files for post"""
-    s3_helper = S3Helper()
-    uploaded_urls = []
-    
+    """Upload media files for post (concurrently; either every file is stored or none is).
+
+    Still images are stored as thumb/feed/full variants without EXIF; pass media_variants
+    on to create_post so clients can pick the size they show.
+    """
+    # Reject the whole request before anything reaches storage
     for file in files:
         if not file.content_type.startswith(('image/', 'video/')):
             raise HTTPException(
@@ -43,29 +57,87 @@ async def upload_post_media(
                 detail=f"File type {file.content_type} not supported"
             )
         
-        try:
-            file_data = await file.read()
-            url = s3_helper.upload_file(file_data, file.filename, file.content_type)
-            uploaded_urls.append(url)
-        except Exception as e:
+        if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File {file.filename} exceeds the maximum size of {settings.MAX_FILE_SIZE} bytes"
+            )
+        
+        if has_variants(file.content_type) and file.size is not None and file.size > settings.IMAGE_MAX_SIZE:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error uploading file {file.filename}: {str(e)}"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Image {file.filename} exceeds the maximum size of {settings.IMAGE_MAX_SIZE} bytes"
             )
     
+    # Each file streams from its spooled upload part by part instead of being read into memory
+    s3_helper = await run_sync(get_s3_helper)
+    results = await upload_files(
+        s3_helper, files, settings.MAX_FILE_SIZE, settings.UPLOAD_REQUEST_CONCURRENCY, image_variants=True
+    )
+    failures = [result for result in results if result["status"] in ("too_large", "failed")]
+    if failures:
+        raise HTTPException(
+            status_code=(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                if all(result["status"] == "too_large" for result in failures)
+                else status.HTTP_500_INTERNAL_SERVER_ERROR
+            ),
+            detail={
+                "message": f"Error uploading {', '.join(result['filename'] for result in failures)}; no files were kept",
+                "files": results
+            }
+        )
+    
     return {
-        "media_urls": uploaded_urls,
+        "media_urls": [result["url"] for result in results],
+        "media_variants": {result["url"]: result["variants"] for result in results if result["variants"]},
+        "files": results,
         "content": content,
         "message": "Files uploaded successfully"
     }
 
+@router.post("/upload-sessions", response_model=UploadSessionResponse)
+async def create_post_upload_session(
+    session: UploadSessionCreate,
+    user_id: int = 1,  # This would come from JWT token
+    service: PostService = Depends(get_post_service)
+):
+    """Get presigned URLs to PUT post media straight to storage"""
+    try:
+        return await run_sync(service.create_upload_session, session.files, user_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.post("/upload-sessions/{session_id}/complete", response_model=PostResponse)
+async def complete_post_upload_session(
+    session_id: str,
+    completion: PostUploadComplete,
+    background_tasks: BackgroundTasks,
+    user_id: int = 1,  # This would come from JWT token
+    follower_ids: List[int] = Query([]),  # This would come from follow service
+    service: PostService = Depends(get_post_service)
+):
+    """Verify the directly uploaded media and create the post"""
+    try:
+        created = await run_sync(service.complete_upload_session, session_id, completion, user_id, follower_ids)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    background_tasks.add_task(service.prewarm_global_feed)
+    return created
+
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(
     post_id: int,
     service: PostService = Depends(get_post_service)
 ):
     """Get post by ID"""
-    post = service.get_post(post_id)
+    post = await run_sync(service.get_post, post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -78,10 +150,23 @@ async def get_user_posts(
     user_id: int,
     page: int = 1,
     size: int = 20,
+    viewer_id: Optional[int] = None,  # This would come from JWT token
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     service: PostService = Depends(get_post_service)
 ):
     """Get user's posts"""
-    return service.get_user_posts(user_id, page, size)
+    try:
+        if viewer_id is None:
+            # Anonymous pages are identical for everyone: serve the pre-rendered bytes
+            etag, body = await service.render_user_posts(user_id, page, size, cursor)
+            return rendered_response(etag, body, if_none_match)
+        return await run_sync(service.get_user_posts, user_id, page, size, viewer_id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.get("/feed/personal", response_model=PostFeedResponse)
 async def get_personal_feed(
@@ -89,19 +174,39 @@ async def get_personal_feed(
     following_ids: List[int] = [],  # This would come from follow service
     page: int = 1,
     size: int = 20,
+    cursor: Optional[str] = None,
     service: PostService = Depends(get_post_service)
 ):
     """Get personalized feed"""
-    return service.get_feed(user_id, following_ids, page, size)
+    try:
+        return await run_sync(service.get_feed, user_id, following_ids, page, size, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.get("/feed/global", response_model=PostFeedResponse)
 async def get_global_feed(
     page: int = 1,
     size: int = 20,
+    viewer_id: Optional[int] = None,  # This would come from JWT token
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     service: PostService = Depends(get_post_service)
 ):
     """Get global feed"""
-    return service.get_global_feed(page, size)
+    try:
+        if viewer_id is None:
+            # Anonymous pages are identical for everyone: serve the pre-rendered bytes
+            etag, body = await service.render_global_feed(page, size, cursor)
+            return rendered_response(etag, body, if_none_match)
+        return await service.get_global_feed_async(page, size, viewer_id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.put("/{post_id}", response_model=PostResponse)
 async def update_post(
@@ -111,7 +216,7 @@ async def update_post(
     service: PostService = Depends(get_post_service)
 ):
     """Update post"""
-    post = service.update_post(post_id, post_update, user_id)
+    post = await run_sync(service.update_post, post_id, post_update, user_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -122,16 +227,18 @@ async def update_post(
 @router.delete("/{post_id}")
 async def delete_post(
     post_id: int,
+    background_tasks: BackgroundTasks,
     user_id: int = 1,  # This would come from JWT token
     service: PostService = Depends(get_post_service)
 ):
     """Delete post"""
-    success = service.delete_post(post_id, user_id)
+    success = await run_sync(service.delete_post, post_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found or you don't have permission to delete"
         )
+    background_tasks.add_task(service.prewarm_global_feed)
     return {"message": "Post deleted successfully"}
 
 @router.post("/{post_id}/like")
@@ -141,7 +248,7 @@ async def like_post(
     service: PostService = Depends(get_post_service)
 ):
     """Like a post"""
-    success = service.like_post(post_id, user_id)
+    success = await run_sync(service.like_post, post_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -156,7 +263,7 @@ async def unlike_post(
     service: PostService = Depends(get_post_service)
 ):
     """Unlike a post"""
-    success = service.unlike_post(post_id, user_id)
+    success = await run_sync(service.unlike_post, post_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -171,7 +278,7 @@ async def create_comment(
     service: PostService = Depends(get_post_service)
 ):
     """Create a comment"""
-    comment_response = service.create_comment(comment, user_id)
+    comment_response = await run_sync(service.create_comment, comment, user_id)
     if not comment_response:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -182,12 +289,25 @@ async def create_comment(
 @router.get("/{post_id}/comments", response_model=List[CommentResponse])
 async def get_post_comments(
     post_id: int,
+    response: Response,
     page: int = 1,
     size: int = 20,
+    cursor: Optional[str] = None,
     service: PostService = Depends(get_post_service)
 ):
-    """Get post comments"""
-    return service.get_post_comments(post_id, page, size)
+    """Get post comments (the next page cursor is returned in the X-Next-Cursor header)"""
+    try:
+        comments = await run_sync(service.get_post_comments, post_id, page, size, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    cursor_for_next = next_cursor(comments, size)
+    if cursor_for_next:
+        response.headers["X-Next-Cursor"] = cursor_for_next
+    return comments
 
 @router.put("/comments/{comment_id}", response_model=CommentResponse)
 async def update_comment(
@@ -197,7 +317,7 @@ async def update_comment(
     service: PostService = Depends(get_post_service)
 ):
     """Update comment"""
-    comment = service.update_comment(comment_id, comment_update, user_id)
+    comment = await run_sync(service.update_comment, comment_id, comment_update, user_id)
     if not comment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -212,7 +332,7 @@ async def delete_comment(
     service: PostService = Depends(get_post_service)
 ):
     """Delete comment"""
-    success = service.delete_comment(comment_id, user_id)
+    success = await run_sync(service.delete_comment, comment_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
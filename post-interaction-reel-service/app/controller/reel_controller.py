@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Header, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.config.database import get_db
+from app.config.settings import settings
 from app.service.reel_service import ReelService
-from app.schema.reel_schema import ReelCreate, ReelUpdate, ReelResponse, ReelFeedResponse, ReelCommentCreate, ReelCommentResponse
-from app.util.s3_helper import S3Helper
+from app.schema.reel_schema import ReelCreate, ReelUpdate, ReelResponse, ReelFeedResponse, ReelCommentCreate, ReelCommentResponse, ReelUploadComplete
+from app.schema.upload_schema import UploadSessionCreate, UploadSessionResponse
+from app.util.s3_helper import UploadTooLargeError, get_s3_helper
+from app.util.pagination import next_cursor
+from app.util.response_cache import rendered_response
+from app.util.executor import run_sync, run_upload
+from app.util.transcode_scheduler import TranscodeQueueFullError
 
 router = APIRouter(prefix="/reels", tags=["reels"])
 
 def get_reel_service(db: Session = Depends(get_db)) -> ReelService:
     return ReelService(db)
 
-@router.post("/", response_model=ReelResponse)
+def transcode_queue_full(error: TranscodeQueueFullError) -> HTTPException:
+    """503 asking the client to retry once the transcode backlog has drained"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Reel processing is busy, try again later: {error}",
+        headers={"Retry-After": "30"}
+    )
+
+@router.post("/", response_model=ReelResponse, status_code=status.HTTP_202_ACCEPTED)
 async def create_reel(
     video_url: str = Form(...),
     thumbnail_url: Optional[str] = Form(None),
@@ -20,7 +34,7 @@ async def create_reel(
     user_id: int = 1,  # This would come from JWT token
     service: ReelService = Depends(get_reel_service)
 ):
-    """Create a new reel"""
+    """Create a new reel (returned as processing; poll GET /reels/{reel_id} until it is ready)"""
     try:
         reel_data = ReelCreate(
             video_url=video_url,
@@ -28,7 +42,9 @@ async def create_reel(
             audio_url=audio_url,
             duration=duration
         )
-        return service.create_reel(reel_data, user_id)
+        return await run_sync(service.create_reel, reel_data, user_id)
+    except TranscodeQueueFullError as e:
+        raise transcode_queue_full(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,11 +62,19 @@ async def upload_reel_video(
             detail=f"File type {file.content_type} not supported for reels"
         )
     
-    s3_helper = S3Helper()
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Video exceeds the maximum size of {settings.MAX_FILE_SIZE} bytes"
+        )
+    
+    s3_helper = await run_sync(get_s3_helper)
     
     try:
-        file_data = await file.read()
-        url = s3_helper.upload_file(file_data, file.filename, file.content_type)
+        # Stream the spooled upload to storage part by part instead of reading it into memory
+        url = await run_upload(
+            s3_helper.upload_stream, file.file, file.filename, file.content_type, settings.MAX_FILE_SIZE
+        )
         
         return {
             "video_url": url,
@@ -58,19 +82,59 @@ async def upload_reel_video(
             "content_type": file.content_type,
             "message": "Video uploaded successfully"
         }
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error uploading video: {str(e)}"
         )
 
+@router.post("/upload-sessions", response_model=UploadSessionResponse)
+async def create_reel_upload_session(
+    session: UploadSessionCreate,
+    user_id: int = 1,  # This would come from JWT token
+    service: ReelService = Depends(get_reel_service)
+):
+    """Get a presigned URL to PUT the reel video straight to storage"""
+    try:
+        return await run_sync(service.create_upload_session, session.files, user_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.post("/upload-sessions/{session_id}/complete", response_model=ReelResponse,
+             status_code=status.HTTP_202_ACCEPTED)
+async def complete_reel_upload_session(
+    session_id: str,
+    completion: ReelUploadComplete,
+    user_id: int = 1,  # This would come from JWT token
+    service: ReelService = Depends(get_reel_service)
+):
+    """Verify the directly uploaded video and create the reel (processing until transcoded)"""
+    try:
+        created = await run_sync(service.complete_upload_session, session_id, completion, user_id)
+    except TranscodeQueueFullError as e:
+        raise transcode_queue_full(e)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return created
+
 @router.get("/{reel_id}", response_model=ReelResponse)
 async def get_reel(
     reel_id: int,
     service: ReelService = Depends(get_reel_service)
 ):
     """Get reel by ID"""
-    reel = service.get_reel(reel_id)
+    reel = await run_sync(service.get_reel, reel_id)
     if not reel:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -83,19 +147,40 @@ async def get_user_reels(
     user_id: int,
     page: int = 1,
     size: int = 20,
+    viewer_id: Optional[int] = None,  # This would come from JWT token
+    cursor: Optional[str] = None,
     service: ReelService = Depends(get_reel_service)
 ):
     """Get user's reels"""
-    return service.get_user_reels(user_id, page, size)
+    try:
+        return await run_sync(service.get_user_reels, user_id, page, size, viewer_id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.get("/feed", response_model=ReelFeedResponse)
 async def get_reel_feed(
     page: int = 1,
     size: int = 20,
+    viewer_id: Optional[int] = None,  # This would come from JWT token
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     service: ReelService = Depends(get_reel_service)
 ):
     """Get reel feed"""
-    return service.get_reel_feed(page, size)
+    try:
+        if viewer_id is None:
+            # Anonymous pages are identical for everyone: serve the pre-rendered bytes
+            etag, body = await service.render_reel_feed(page, size, cursor)
+            return rendered_response(etag, body, if_none_match)
+        return await service.get_reel_feed_async(page, size, viewer_id, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.put("/{reel_id}", response_model=ReelResponse)
 async def update_reel(
@@ -105,7 +190,7 @@ async def update_reel(
     service: ReelService = Depends(get_reel_service)
 ):
     """Update reel"""
-    reel = service.update_reel(reel_id, reel_update, user_id)
+    reel = await run_sync(service.update_reel, reel_id, reel_update, user_id)
     if not reel:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -116,16 +201,18 @@ async def update_reel(
 @router.delete("/{reel_id}")
 async def delete_reel(
     reel_id: int,
+    background_tasks: BackgroundTasks,
     user_id: int = 1,  # This would come from JWT token
     service: ReelService = Depends(get_reel_service)
 ):
     """Delete reel"""
-    success = service.delete_reel(reel_id, user_id)
+    success = await run_sync(service.delete_reel, reel_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reel not found or you don't have permission to delete"
         )
+    background_tasks.add_task(service.prewarm_reel_feed)
     return {"message": "Reel deleted successfully"}
 
 @router.post("/{reel_id}/like")
@@ -135,7 +222,7 @@ async def like_reel(
     service: ReelService = Depends(get_reel_service)
 ):
     """Like a reel"""
-    success = service.like_reel(reel_id, user_id)
+    success = await run_sync(service.like_reel, reel_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -150,7 +237,7 @@ async def unlike_reel(
     service: ReelService = Depends(get_reel_service)
 ):
     """Unlike a reel"""
-    success = service.unlike_reel(reel_id, user_id)
+    success = await run_sync(service.unlike_reel, reel_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -164,7 +251,7 @@ async def view_reel(
     service: ReelService = Depends(get_reel_service)
 ):
     """Record reel view"""
-    success = service.view_reel(reel_id)
+    success = await run_sync(service.view_reel, reel_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -179,7 +266,7 @@ async def create_reel_comment(
     service: ReelService = Depends(get_reel_service)
 ):
     """Create a reel comment"""
-    comment_response = service.create_reel_comment(comment, user_id)
+    comment_response = await run_sync(service.create_reel_comment, comment, user_id)
     if not comment_response:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -190,12 +277,25 @@ async def create_reel_comment(
 @router.get("/{reel_id}/comments", response_model=List[ReelCommentResponse])
 async def get_reel_comments(
     reel_id: int,
+    response: Response,
     page: int = 1,
     size: int = 20,
+    cursor: Optional[str] = None,
     service: ReelService = Depends(get_reel_service)
 ):
-    """Get reel comments"""
-    return service.get_reel_comments(reel_id, page, size)
+    """Get reel comments (the next page cursor is returned in the X-Next-Cursor header)"""
+    try:
+        comments = await run_sync(service.get_reel_comments, reel_id, page, size, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    cursor_for_next = next_cursor(comments, size)
+    if cursor_for_next:
+        response.headers["X-Next-Cursor"] = cursor_for_next
+    return comments
 
 @router.delete("/comments/{comment_id}")
 async def delete_reel_comment(
@@ -204,7 +304,7 @@ async def delete_reel_comment(
     service: ReelService = Depends(get_reel_service)
 ):
     """Delete reel comment"""
-    success = service.delete_reel_comment(comment_id, user_id)
+    success = await run_sync(service.delete_reel_comment, comment_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
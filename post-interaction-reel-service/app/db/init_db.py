@@ -1,29 +1,32 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, text
 from app.config.database import Base
 from app.config.settings import settings
-from app.model.post_model import Post, Comment, Like
-from app.model.reel_model import Reel, ReelComment
-from app.model.notification_model import Notification
+import app.model  # noqa: F401 - register every table on Base.metadata
 
 def init_db():
-    """Initialize database with tables"""
-    engine = create_engine(settings.DATABASE_URL)
-    
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
+    """Initialize database by applying every migration (the migrations own the schema)"""
+    migrate_db()
 
 def drop_db():
     """Drop all database tables"""
     engine = create_engine(settings.DATABASE_URL)
     
-    # Drop all tables
+    # Drop all tables, and Alembic's revision so the next init migrates from scratch
     Base.metadata.drop_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
     print("Database tables dropped successfully!")
 
+def migrate_db(revision: str = "head"):
+    """Apply Alembic migrations up to revision"""
+    from alembic import command
+    from alembic.config import Config
+    
+    command.upgrade(Config("alembic.ini"), revision)
+    print(f"Database migrated to {revision} successfully!")
+
 def reset_db():
-    """Reset database (drop and recreate all tables)"""
+    """Reset database (drop all tables and migrate again)"""
     drop_db()
     init_db()
 
@@ -38,7 +41,9 @@ if __name__ == "__main__":
             drop_db()
         elif command == "reset":
             reset_db()
+        elif command == "migrate":
+            migrate_db()
         else:
-            print("Usage: python init_db.py [init|drop|reset]")
+            print("Usage: python init_db.py [init|drop|reset|migrate]")
     else:
-        print("Usage: python init_db.py [init|drop|reset]")
+        print("Usage: python init_db.py [init|drop|reset|migrate]")
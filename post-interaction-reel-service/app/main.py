@@ -7,22 +7,40 @@ import uvicorn
 from app.controller.post_controller import router as post_router
 from app.controller.reel_controller import router as reel_router
 from app.controller.notification_controller import router as notification_router
-from app.config.database import engine, Base
+from app.controller.metrics_controller import router as metrics_router
 from app.config.settings import settings
+from app.config.redis_config import init_async_redis, close_async_redis
+from app.util.cache_helper import start_invalidation_listener, stop_invalidation_listener
+from app.util.executor import run_sync, shutdown_executor
+from app.util.image_pipeline import shutdown_image_pool
+from app.util.transcode_scheduler import transcode_scheduler
+from app.util.s3_helper import ensure_bucket
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting Post, Interaction & Reel Service...")
     
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully")
+    # The schema is owned by the Alembic migrations (app/db/init_db.py init / alembic upgrade head),
+    # not created here: tables built from the current models would make those migrations fail
+    
+    # Open the async Redis pool and keep the in-process cache tier in sync with other workers
+    await init_async_redis()
+    start_invalidation_listener()
+    
+    # Check the storage bucket once here instead of on every S3Helper construction
+    if await run_sync(ensure_bucket):
+        print("Storage bucket is ready")
     
     yield
     
     # Shutdown
     print("Shutting down Post, Interaction & Reel Service...")
+    stop_invalidation_listener()
+    await close_async_redis()
+    shutdown_executor()
+    transcode_scheduler.shutdown()
+    shutdown_image_pool()
 
 app = FastAPI(
     title="Post, Interaction & Reel Service",
@@ -44,6 +62,7 @@ app.add_middleware(
 app.include_router(post_router)
 app.include_router(reel_router)
 app.include_router(notification_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 async def root():
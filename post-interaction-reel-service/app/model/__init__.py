@@ -1,2 +1,5 @@
+from app.model.post_model import Post, Like
+from app.model.comment_model import Comment
 from app.model.reel_model import Reel, ReelComment
-# thêm các model khác nếu có
+from app.model.notification_model import Notification
+from app.model.media_model import MediaBlob
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, Integer, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Text, Integer, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.config.database import Base
@@ -17,3 +17,6 @@ class Comment(Base):
     # Relationships
     post = relationship("Post", back_populates="comments")
     parent = relationship("Comment", remote_side=[id], backref="replies")
+
+# Keyset pagination index for get_post_comments
+Index("ix_comments_post_id_created_at_id", Comment.post_id, Comment.created_at.desc(), Comment.id.desc())
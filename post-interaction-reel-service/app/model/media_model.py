@@ -0,0 +1,14 @@
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, JSON
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class MediaBlob(Base):
+    __tablename__ = "media_blobs"
+    
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the stored bytes
+    object_key = Column(String, nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(100))
+    ref_count = Column(Integer, nullable=False, default=1)  # uploads currently pointing at the object
+    transcode = Column(JSON)  # reel outputs already produced from this object as a source
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, Boolean, DateTime
+from sqlalchemy import Column, BigInteger, String, Text, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.config.database import Base
 
@@ -14,3 +14,8 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Keyset pagination index for get_user_notifications
+Index("ix_notifications_user_id_created_at_id", Notification.user_id, Notification.created_at.desc(), Notification.id.desc())
+# Unread badge count and mark_all_as_read
+Index("ix_notifications_user_id_is_read", Notification.user_id, Notification.is_read)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.config.database import Base
@@ -12,7 +12,10 @@ class Reel(Base):
     video_url = Column(String, nullable=False)
     thumbnail_url = Column(String)
     audio_url = Column(String)
+    hls_manifest_url = Column(String)  # HLS master playlist of the rendition ladder
+    thumbnail_sprite = Column(JSON)  # scrubbing sprite sheet: url, columns, rows, tile width/height, interval
     duration = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="ready", server_default="ready")  # processing, ready or failed
     view_count = Column(Integer, default=0)
     like_count = Column(Integer, default=0)
     comment_count = Column(Integer, default=0)
@@ -22,6 +25,10 @@ class Reel(Base):
     likes = relationship("Like", back_populates="reel", cascade="all, delete-orphan")
     comments = relationship("ReelComment", back_populates="reel", cascade="all, delete-orphan")
 
+# Keyset pagination indexes: (created_at, id) matches the listing ORDER BY and cursor predicate
+Index("ix_reels_user_id_created_at_id", Reel.user_id, Reel.created_at.desc(), Reel.id.desc())
+Index("ix_reels_created_at_id", Reel.created_at.desc(), Reel.id.desc())
+
 class ReelComment(Base):
     __tablename__ = "reel_comments"
     
@@ -35,3 +42,5 @@ class ReelComment(Base):
     # Relationships
     reel = relationship("Reel", back_populates="comments")
     parent = relationship("ReelComment", remote_side=[id], backref="replies")
+
+Index("ix_reel_comments_reel_id_created_at_id", ReelComment.reel_id, ReelComment.created_at.desc(), ReelComment.id.desc())
@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
-from typing import List, Optional
+from sqlalchemy import and_
+from typing import List, Optional, Set
 from app.model.comment_model import Comment
+from app.model.post_model import Like
 from app.schema.comment_schema import CommentCreate, CommentUpdate
+from app.util.pagination import Cursor, paginate
 
 class CommentRepository:
     def __init__(self, db: Session):
@@ -23,8 +25,9 @@ class CommentRepository:
     def get_comment_by_id(self, comment_id: int) -> Optional[Comment]:
         return self.db.query(Comment).filter(Comment.id == comment_id).first()
     
-    def get_post_comments(self, post_id: int, skip: int = 0, limit: int = 20) -> List[Comment]:
-        return self.db.query(Comment).filter(Comment.post_id == post_id).order_by(desc(Comment.created_at)).offset(skip).limit(limit).all()
+    def get_post_comments(self, post_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[Comment]:
+        query = self.db.query(Comment).filter(Comment.post_id == post_id)
+        return paginate(query, Comment, skip, limit, cursor).all()
     
     def update_comment(self, comment_id: int, comment_update: CommentUpdate, user_id: int) -> Optional[Comment]:
         db_comment = self.db.query(Comment).filter(and_(Comment.id == comment_id, Comment.user_id == user_id)).first()
@@ -92,3 +95,20 @@ class LikeRepository:
             )
         ).first()
         return like is not None
+    
+    def liked_by(self, user_id: int, post_ids: Optional[List[int]] = None, reel_ids: Optional[List[int]] = None) -> Set[int]:
+        """Return the subset of post_ids (or reel_ids) liked by user in a single query"""
+        if post_ids:
+            column, ids = Like.post_id, post_ids
+        elif reel_ids:
+            column, ids = Like.reel_id, reel_ids
+        else:
+            return set()
+        
+        rows = self.db.query(column).filter(
+            and_(
+                Like.user_id == user_id,
+                column.in_(ids)
+            )
+        ).all()
+        return {row[0] for row in rows}
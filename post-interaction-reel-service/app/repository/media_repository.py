@@ -0,0 +1,66 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Optional
+from app.model import MediaBlob
+
+class MediaBlobRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def claim(self, content_hash: str, object_key: str, size: int, content_type: str) -> str:
+        """Reference the object holding content_hash, registering object_key if the bytes are new.
+
+        One atomic upsert, so concurrent uploads of the same bytes agree on a single object.
+        Returns the key of that object; when it is not object_key the caller's copy is a duplicate.
+        """
+        insert = postgresql.insert if self.db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        statement = (
+            insert(MediaBlob)
+            .values(content_hash=content_hash, object_key=object_key, size=size,
+                    content_type=content_type, ref_count=1)
+            .on_conflict_do_update(index_elements=[MediaBlob.content_hash],
+                                   set_={"ref_count": MediaBlob.ref_count + 1})
+            .returning(MediaBlob.object_key)
+        )
+        key = self.db.execute(statement).scalar_one()
+        self.db.commit()
+        return key
+
+    def add_reference(self, object_key: str) -> bool:
+        """Count one more reference to a stored object; False if it is not in the index"""
+        result = self.db.execute(
+            update(MediaBlob).where(MediaBlob.object_key == object_key)
+            .values(ref_count=MediaBlob.ref_count + 1)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def release(self, object_key: str) -> Optional[int]:
+        """Drop one reference and return how many remain (the row goes at 0); None if not indexed"""
+        remaining = self.db.execute(
+            update(MediaBlob).where(MediaBlob.object_key == object_key)
+            .values(ref_count=MediaBlob.ref_count - 1)
+            .returning(MediaBlob.ref_count)
+        ).scalar_one_or_none()
+        if remaining is not None and remaining <= 0:
+            # A claim may have re-referenced the object in between; then the row (and object) stay
+            deleted = self.db.execute(
+                delete(MediaBlob).where(MediaBlob.object_key == object_key, MediaBlob.ref_count <= 0)
+            ).rowcount
+            remaining = 0 if deleted else 1
+        self.db.commit()
+        return remaining
+
+    def get_transcode(self, object_key: str) -> Optional[dict]:
+        """Outputs of an earlier transcode of this source object"""
+        blob = self.db.query(MediaBlob).filter(MediaBlob.object_key == object_key).first()
+        return blob.transcode if blob else None
+
+    def set_transcode(self, object_key: str, outputs: dict) -> bool:
+        """Remember the transcode outputs of a source object so reposts can reuse them"""
+        result = self.db.execute(
+            update(MediaBlob).where(MediaBlob.object_key == object_key).values(transcode=outputs)
+        )
+        self.db.commit()
+        return result.rowcount > 0
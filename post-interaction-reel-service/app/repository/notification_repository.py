@@ -1,8 +1,9 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, func
+from sqlalchemy import and_, func
 from typing import List, Optional
 from app.model.notification_model import Notification
 from app.schema.notification_schema import MarkAsReadRequest
+from app.util.pagination import Cursor, paginate
 
 class NotificationRepository:
     def __init__(self, db: Session):
@@ -22,8 +23,9 @@ class NotificationRepository:
         self.db.refresh(db_notification)
         return db_notification
     
-    def get_user_notifications(self, user_id: int, skip: int = 0, limit: int = 20) -> List[Notification]:
-        return self.db.query(Notification).filter(Notification.user_id == user_id).order_by(desc(Notification.created_at)).offset(skip).limit(limit).all()
+    def get_user_notifications(self, user_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[Notification]:
+        query = self.db.query(Notification).filter(Notification.user_id == user_id)
+        return paginate(query, Notification, skip, limit, cursor).all()
     
     def get_unread_count(self, user_id: int) -> int:
         return self.db.query(Notification).filter(
@@ -1,8 +1,14 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+from sqlalchemy import and_
 from typing import List, Optional
 from app.model.post_model import Post
 from app.schema.post_schema import PostCreate, PostUpdate
+from app.util.pagination import Cursor, paginate
+
+def _variants_json(media_variants) -> Optional[dict]:
+    if media_variants is None:
+        return None
+    return {url: variants.dict() for url, variants in media_variants.items()}
 
 class PostRepository:
     def __init__(self, db: Session):
@@ -13,6 +19,7 @@ class PostRepository:
             user_id=user_id,
             content=post.content,
             media_url=post.media_url,
+            media_variants=_variants_json(post.media_variants),
             type=post.type
         )
         self.db.add(db_post)
@@ -23,14 +30,21 @@ class PostRepository:
     def get_post_by_id(self, post_id: int) -> Optional[Post]:
         return self.db.query(Post).filter(Post.id == post_id).first()
     
-    def get_user_posts(self, user_id: int, skip: int = 0, limit: int = 20) -> List[Post]:
-        return self.db.query(Post).filter(Post.user_id == user_id).order_by(desc(Post.created_at)).offset(skip).limit(limit).all()
+    def get_posts_by_ids(self, post_ids: List[int]) -> List[Post]:
+        if not post_ids:
+            return []
+        return self.db.query(Post).filter(Post.id.in_(post_ids)).all()
+    
+    def get_user_posts(self, user_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[Post]:
+        query = self.db.query(Post).filter(Post.user_id == user_id)
+        return paginate(query, Post, skip, limit, cursor).all()
     
-    def get_feed_posts(self, user_ids: List[int], skip: int = 0, limit: int = 20) -> List[Post]:
-        return self.db.query(Post).filter(Post.user_id.in_(user_ids)).order_by(desc(Post.created_at)).offset(skip).limit(limit).all()
+    def get_feed_posts(self, user_ids: List[int], skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[Post]:
+        query = self.db.query(Post).filter(Post.user_id.in_(user_ids))
+        return paginate(query, Post, skip, limit, cursor).all()
     
-    def get_global_feed(self, skip: int = 0, limit: int = 20) -> List[Post]:
-        return self.db.query(Post).order_by(desc(Post.created_at)).offset(skip).limit(limit).all()
+    def get_global_feed(self, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[Post]:
+        return paginate(self.db.query(Post), Post, skip, limit, cursor).all()
     
     def update_post(self, post_id: int, post_update: PostUpdate, user_id: int) -> Optional[Post]:
         db_post = self.db.query(Post).filter(and_(Post.id == post_id, Post.user_id == user_id)).first()
@@ -39,6 +53,8 @@ class PostRepository:
                 db_post.content = post_update.content
             if post_update.media_url is not None:
                 db_post.media_url = post_update.media_url
+            if post_update.media_variants is not None:
+                db_post.media_variants = _variants_json(post_update.media_variants)
             self.db.commit()
             self.db.refresh(db_post)
         return db_post
@@ -51,27 +67,33 @@ class PostRepository:
             return True
         return False
     
-    def increment_like_count(self, post_id: int) -> None:
+    def increment_like_count(self, post_id: int) -> Optional[int]:
         post = self.db.query(Post).filter(Post.id == post_id).first()
         if post:
             post.like_count += 1
             self.db.commit()
+            return post.like_count
+        return None
     
-    def decrement_like_count(self, post_id: int) -> None:
+    def decrement_like_count(self, post_id: int) -> Optional[int]:
         post = self.db.query(Post).filter(Post.id == post_id).first()
         if post and post.like_count > 0:
             post.like_count -= 1
             self.db.commit()
+        return post.like_count if post else None
     
-    def increment_comment_count(self, post_id: int) -> None:
+    def increment_comment_count(self, post_id: int) -> Optional[int]:
         post = self.db.query(Post).filter(Post.id == post_id).first()
         if post:
             post.comment_count += 1
             self.db.commit()
+            return post.comment_count
+        return None
     
-    def decrement_comment_count(self, post_id: int) -> None:
+    def decrement_comment_count(self, post_id: int) -> Optional[int]:
         post = self.db.query(Post).filter(Post.id == post_id).first()
         if post and post.comment_count > 0:
             post.comment_count -= 1
             self.db.commit()
+        return post.comment_count if post else None
 
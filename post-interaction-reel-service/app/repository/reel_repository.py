@@ -1,20 +1,22 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+from sqlalchemy import and_
 from typing import List, Optional
 from app.model import Reel, ReelComment
 from app.schema.reel_schema import ReelCreate, ReelUpdate, ReelCommentCreate
+from app.util.pagination import Cursor, paginate
 
 class ReelRepository:
     def __init__(self, db: Session):
         self.db = db
     
-    def create_reel(self, reel: ReelCreate, user_id: int) -> Reel:
+    def create_reel(self, reel: ReelCreate, user_id: int, status: str = "ready") -> Reel:
         db_reel = Reel(
             user_id=user_id,
             video_url=reel.video_url,
             thumbnail_url=reel.thumbnail_url,
             audio_url=reel.audio_url,
-            duration=reel.duration
+            duration=reel.duration,
+            status=status
         )
         self.db.add(db_reel)
         self.db.commit()
@@ -24,11 +26,41 @@ class ReelRepository:
     def get_reel_by_id(self, reel_id: int) -> Optional[Reel]:
         return self.db.query(Reel).filter(Reel.id == reel_id).first()
     
-    def get_user_reels(self, user_id: int, skip: int = 0, limit: int = 20) -> List[Reel]:
-        return self.db.query(Reel).filter(Reel.user_id == user_id).order_by(desc(Reel.created_at)).offset(skip).limit(limit).all()
+    def get_reels_by_ids(self, reel_ids: List[int]) -> List[Reel]:
+        if not reel_ids:
+            return []
+        return self.db.query(Reel).filter(Reel.id.in_(reel_ids)).all()
     
-    def get_reel_feed(self, skip: int = 0, limit: int = 20) -> List[Reel]:
-        return self.db.query(Reel).order_by(desc(Reel.created_at)).offset(skip).limit(limit).all()
+    def get_user_reels(self, user_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[Reel]:
+        query = self.db.query(Reel).filter(and_(Reel.user_id == user_id, Reel.status == "ready"))
+        return paginate(query, Reel, skip, limit, cursor).all()
+    
+    def get_reel_feed(self, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[Reel]:
+        return paginate(self.db.query(Reel).filter(Reel.status == "ready"), Reel, skip, limit, cursor).all()
+    
+    def finish_processing(self, reel_id: int, status: str, video_url: Optional[str] = None,
+                          thumbnail_url: Optional[str] = None, audio_url: Optional[str] = None,
+                          duration: Optional[int] = None, hls_manifest_url: Optional[str] = None,
+                          thumbnail_sprite: Optional[dict] = None) -> Optional[Reel]:
+        """Store the transcoder's output and move a reel out of processing"""
+        db_reel = self.db.query(Reel).filter(Reel.id == reel_id).first()
+        if db_reel:
+            db_reel.status = status
+            if video_url is not None:
+                db_reel.video_url = video_url
+            if thumbnail_url is not None:
+                db_reel.thumbnail_url = thumbnail_url
+            if audio_url is not None:
+                db_reel.audio_url = audio_url
+            if duration:
+                db_reel.duration = duration
+            if hls_manifest_url is not None:
+                db_reel.hls_manifest_url = hls_manifest_url
+            if thumbnail_sprite is not None:
+                db_reel.thumbnail_sprite = thumbnail_sprite
+            self.db.commit()
+            self.db.refresh(db_reel)
+        return db_reel
     
     def update_reel(self, reel_id: int, reel_update: ReelUpdate, user_id: int) -> Optional[Reel]:
         db_reel = self.db.query(Reel).filter(and_(Reel.id == reel_id, Reel.user_id == user_id)).first()
@@ -49,35 +81,43 @@ class ReelRepository:
             return True
         return False
     
-    def increment_view_count(self, reel_id: int) -> None:
+    def increment_view_count(self, reel_id: int) -> Optional[int]:
         reel = self.db.query(Reel).filter(Reel.id == reel_id).first()
         if reel:
             reel.view_count += 1
             self.db.commit()
+            return reel.view_count
+        return None
     
-    def increment_like_count(self, reel_id: int) -> None:
+    def increment_like_count(self, reel_id: int) -> Optional[int]:
         reel = self.db.query(Reel).filter(Reel.id == reel_id).first()
         if reel:
             reel.like_count += 1
             self.db.commit()
+            return reel.like_count
+        return None
     
-    def decrement_like_count(self, reel_id: int) -> None:
+    def decrement_like_count(self, reel_id: int) -> Optional[int]:
         reel = self.db.query(Reel).filter(Reel.id == reel_id).first()
         if reel and reel.like_count > 0:
             reel.like_count -= 1
             self.db.commit()
+        return reel.like_count if reel else None
     
-    def increment_comment_count(self, reel_id: int) -> None:
+    def increment_comment_count(self, reel_id: int) -> Optional[int]:
         reel = self.db.query(Reel).filter(Reel.id == reel_id).first()
         if reel:
             reel.comment_count += 1
             self.db.commit()
+            return reel.comment_count
+        return None
     
-    def decrement_comment_count(self, reel_id: int) -> None:
+    def decrement_comment_count(self, reel_id: int) -> Optional[int]:
         reel = self.db.query(Reel).filter(Reel.id == reel_id).first()
         if reel and reel.comment_count > 0:
             reel.comment_count -= 1
             self.db.commit()
+        return reel.comment_count if reel else None
 
 class ReelCommentRepository:
     def __init__(self, db: Session):
@@ -95,8 +135,9 @@ class ReelCommentRepository:
         self.db.refresh(db_comment)
         return db_comment
     
-    def get_reel_comments(self, reel_id: int, skip: int = 0, limit: int = 20) -> List[ReelComment]:
-        return self.db.query(ReelComment).filter(ReelComment.reel_id == reel_id).order_by(desc(ReelComment.created_at)).offset(skip).limit(limit).all()
+    def get_reel_comments(self, reel_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[ReelComment]:
+        query = self.db.query(ReelComment).filter(ReelComment.reel_id == reel_id)
+        return paginate(query, ReelComment, skip, limit, cursor).all()
     
     def delete_comment(self, comment_id: int, user_id: int) -> bool:
         db_comment = self.db.query(ReelComment).filter(and_(ReelComment.id == comment_id, ReelComment.user_id == user_id)).first()
@@ -22,6 +22,7 @@ class NotificationListResponse(BaseModel):
     size: int
     has_next: bool
     unread_count: int
+    next_cursor: Optional[str] = None
 
 class MarkAsReadRequest(BaseModel):
     notification_ids: List[int]
@@ -1,26 +1,43 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
+class MediaVariants(BaseModel):
+    """Resized encodings of one uploaded image; the post's media_url holds the full one"""
+    thumb: str
+    feed: str
+    full: str
+    format: str
+    width: int
+    height: int
+
 class PostCreate(BaseModel):
     content: Optional[str] = None
     media_url: Optional[List[str]] = None
+    media_variants: Optional[Dict[str, MediaVariants]] = None  # keyed by media URL
     type: str = "text"
 
+class PostUploadComplete(BaseModel):
+    content: Optional[str] = None
+    type: str = "image"
+
 class PostUpdate(BaseModel):
     content: Optional[str] = None
     media_url: Optional[List[str]] = None
+    media_variants: Optional[Dict[str, MediaVariants]] = None
 
 class PostResponse(BaseModel):
     id: int
     user_id: int
     content: Optional[str]
     media_url: Optional[List[str]]
+    media_variants: Optional[Dict[str, MediaVariants]] = None
     type: str
     like_count: int
     comment_count: int
     created_at: datetime
     updated_at: datetime
+    liked_by_me: bool = False
     
     class Config:
         from_attributes = True
@@ -31,3 +48,4 @@ class PostFeedResponse(BaseModel):
     page: int
     size: int
     has_next: bool
+    next_cursor: Optional[str] = None
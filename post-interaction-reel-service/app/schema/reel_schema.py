@@ -8,21 +8,37 @@ class ReelCreate(BaseModel):
     audio_url: Optional[str] = None
     duration: int
 
+class ReelUploadComplete(BaseModel):
+    duration: int
+
 class ReelUpdate(BaseModel):
     thumbnail_url: Optional[str] = None
     audio_url: Optional[str] = None
 
+class ThumbnailSprite(BaseModel):
+    """Sprite sheet of evenly spaced frames; tile i shows second i * interval"""
+    url: str
+    columns: int
+    rows: int
+    width: int
+    height: int
+    interval: float
+
 class ReelResponse(BaseModel):
     id: int
     user_id: int
     video_url: str
     thumbnail_url: Optional[str]
     audio_url: Optional[str]
+    hls_manifest_url: Optional[str] = None
+    thumbnail_sprite: Optional[ThumbnailSprite] = None
     duration: int
+    status: str = "ready"
     view_count: int
     like_count: int
     comment_count: int
     created_at: datetime
+    liked_by_me: bool = False
     
     class Config:
         from_attributes = True
@@ -33,6 +49,7 @@ class ReelFeedResponse(BaseModel):
     page: int
     size: int
     has_next: bool
+    next_cursor: Optional[str] = None
 
 class ReelCommentCreate(BaseModel):
     reel_id: int
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from datetime import datetime
+
+class UploadFileSpec(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+
+class UploadSessionCreate(BaseModel):
+    files: List[UploadFileSpec]
+
+class PresignedUpload(BaseModel):
+    key: str
+    filename: str
+    upload_url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = {}
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    expires_at: datetime
+    uploads: List[PresignedUpload]
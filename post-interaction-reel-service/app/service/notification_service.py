@@ -3,6 +3,7 @@ from typing import List, Optional
 from app.repository.notification_repository import NotificationRepository
 from app.schema.notification_schema import NotificationResponse, NotificationListResponse, MarkAsReadRequest
 from app.util.notification_helper import NotificationHelper
+from app.util.pagination import decode_cursor, next_cursor
 
 class NotificationService:
     def __init__(self, db: Session):
@@ -23,10 +24,12 @@ class NotificationService:
         
         return NotificationResponse.from_orm(db_notification)
     
-    def get_user_notifications(self, user_id: int, page: int = 1, size: int = 20) -> NotificationListResponse:
-        """Get user notifications with pagination"""
+    def get_user_notifications(self, user_id: int, page: int = 1, size: int = 20,
+                               cursor: Optional[str] = None) -> NotificationListResponse:
+        """Get user notifications with pagination (page/size or an opaque cursor)"""
         skip = (page - 1) * size
-        notifications = self.notification_repo.get_user_notifications(user_id, skip, size)
+        after = decode_cursor(cursor) if cursor else None
+        notifications = self.notification_repo.get_user_notifications(user_id, skip, size, after)
         unread_count = self.notification_repo.get_unread_count(user_id)
         
         notification_responses = [NotificationResponse.from_orm(notif) for notif in notifications]
@@ -37,7 +40,8 @@ class NotificationService:
             page=page,
             size=size,
             has_next=len(notification_responses) == size,
-            unread_count=unread_count
+            unread_count=unread_count,
+            next_cursor=next_cursor(notification_responses, size)
         )
     
     def mark_as_read(self, notification_ids: List[int], user_id: int) -> int:
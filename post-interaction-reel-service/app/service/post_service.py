@@ -1,24 +1,38 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from app.repository.post_repository import PostRepository
 from app.repository.comment_repository import CommentRepository, LikeRepository
-from app.schema.post_schema import PostCreate, PostUpdate, PostResponse, PostFeedResponse
+from app.schema.post_schema import PostCreate, PostUpdate, PostResponse, PostFeedResponse, PostUploadComplete
+from app.schema.upload_schema import UploadFileSpec, UploadSessionResponse
 from app.schema.comment_schema import CommentCreate, CommentUpdate, CommentResponse, LikeRequest, LikeResponse
-from app.util.s3_helper import S3Helper
-from app.util.cache_helper import CacheHelper
+from app.util.s3_helper import get_s3_helper
+from app.util.cache_helper import AsyncCacheHelper, CacheHelper
+from app.util.executor import run_sync
+from app.util.response_cache import get_or_render
+from app.config.settings import settings
 from app.util.notification_helper import NotificationHelper
+from app.util.pagination import Cursor, decode_cursor, next_cursor
+from app.util.timeline_helper import TimelineHelper
+from app.util.upload_session_helper import UploadSessionHelper
+from app.model.post_model import Post
 
 class PostService:
+    # Fields served live from the counters hash rather than the cached post
+    COUNTER_FIELDS = ("like_count", "comment_count")
+    
     def __init__(self, db: Session):
         self.db = db
         self.post_repo = PostRepository(db)
         self.comment_repo = CommentRepository(db)
         self.like_repo = LikeRepository(db)
-        self.s3_helper = S3Helper()
+        self.s3_helper = get_s3_helper()
         self.cache_helper = CacheHelper()
+        self.async_cache_helper = AsyncCacheHelper()
+        self.timeline_helper = TimelineHelper()
+        self.upload_session_helper = UploadSessionHelper()
         self.notification_helper = NotificationHelper()
     
-    def create_post(self, post: PostCreate, user_id: int) -> PostResponse:
+    def create_post(self, post: PostCreate, user_id: int, follower_ids: Optional[List[int]] = None) -> PostResponse:
         """Create a new post"""
         # Upload media files if provided
         media_urls = []
@@ -32,17 +46,40 @@ class PostService:
         post_data = PostCreate(
             content=post.content,
             media_url=media_urls,
+            # Only variants of media the post actually carries
+            media_variants={url: variants for url, variants in (post.media_variants or {}).items()
+                            if url in media_urls} or None,
             type=post.type
         )
         
         db_post = self.post_repo.create_post(post_data, user_id)
         
+        # Push into followers' home timelines
+        if follower_ids:
+            self.timeline_helper.push_post(db_post.id, user_id, db_post.created_at, follower_ids)
+        
         # Invalidate cache
-        self.cache_helper.invalidate_global_feed()
-        self.cache_helper.invalidate_user_feed(user_id)
+        namespaces = ["global_feed", f"user_posts:{user_id}", f"user_feed:{user_id}"]
+        if len(follower_ids or []) >= self.timeline_helper.celebrity_threshold:
+            # Pulled on read: one generation in every follower's feed key instead of one per follower
+            namespaces.append(f"author_posts:{user_id}")
+        else:
+            namespaces += [f"user_feed:{follower_id}" for follower_id in follower_ids or []]
+        self.cache_helper.invalidate_namespaces(namespaces)
         
         return PostResponse.from_orm(db_post)
     
+    def create_upload_session(self, files: List[UploadFileSpec], user_id: int) -> UploadSessionResponse:
+        """Hand out presigned URLs for uploading post media straight to storage"""
+        return self.upload_session_helper.create_session(user_id, "post", files, ("image/", "video/"))
+    
+    def complete_upload_session(self, session_id: str, completion: PostUploadComplete, user_id: int,
+                                follower_ids: Optional[List[int]] = None) -> PostResponse:
+        """Verify the uploaded media and create the post; raises ValueError if verification fails"""
+        files = self.upload_session_helper.complete_session(session_id, user_id, "post")
+        post = PostCreate(content=completion.content, media_url=[file["url"] for file in files], type=completion.type)
+        return self.create_post(post, user_id, follower_ids)
+    
     def get_post(self, post_id: int) -> Optional[PostResponse]:
         """Get post by ID"""
         db_post = self.post_repo.get_post_by_id(post_id)
@@ -50,94 +87,248 @@ class PostService:
             return PostResponse.from_orm(db_post)
         return None
     
-    def get_user_posts(self, user_id: int, page: int = 1, size: int = 20) -> PostFeedResponse:
-        """Get user's posts with pagination"""
+    def get_user_posts(self, user_id: int, page: int = 1, size: int = 20, viewer_id: Optional[int] = None,
+                       cursor: Optional[str] = None) -> PostFeedResponse:
+        """Get user's posts with pagination (page/size or an opaque cursor)"""
         skip = (page - 1) * size
+        after = decode_cursor(cursor) if cursor else None
+        built: Dict[int, PostResponse] = {}
+        load = lambda: self._build_page(self.post_repo.get_user_posts(user_id, skip, size, after), page, size, built)
         
-        # Try cache first
-        cache_key = f"user_posts:{user_id}:{page}:{size}"
-        cached_posts = self.cache_helper.get_cache(cache_key)
-        if cached_posts:
-            return PostFeedResponse(**cached_posts)
-        
-        posts = self.post_repo.get_user_posts(user_id, skip, size)
-        post_responses = [PostResponse.from_orm(post) for post in posts]
+        cache_key = self.cache_helper.versioned_key(f"user_posts:{user_id}", cursor or page, size)
+        page_data = self.cache_helper.get_or_load(cache_key, load, ttl=300)  # 5 minutes
         
-        # Cache the result
-        response_data = {
-            "posts": [post.dict() for post in post_responses],
-            "total": len(post_responses),
-            "page": page,
-            "size": size,
-            "has_next": len(post_responses) == size
-        }
-        self.cache_helper.set_cache(cache_key, response_data, ttl=300)  # 5 minutes
-        
-        return PostFeedResponse(**response_data)
+        posts = self._hydrate_posts(page_data["ids"], built)
+        return self._mark_liked_by_me(self._feed_from_page(page_data, posts), viewer_id)
+    
+    async def render_user_posts(self, user_id: int, page: int = 1, size: int = 20,
+                                cursor: Optional[str] = None) -> Tuple[str, bytes]:
+        """Pre-rendered (etag, body) of a page of user's posts as seen without a viewer"""
+        cache_key = await self.async_cache_helper.versioned_key(f"user_posts:{user_id}", cursor or page, size)
+        return await get_or_render(
+            self.async_cache_helper, cache_key,
+            lambda: run_sync(self.get_user_posts, user_id, page, size, None, cursor),
+            lambda feed: self._render_tags(feed.posts)
+        )
     
-    def get_feed(self, user_id: int, following_ids: List[int], page: int = 1, size: int = 20) -> PostFeedResponse:
+    def get_feed(self, user_id: int, following_ids: List[int], page: int = 1, size: int = 20,
+                 cursor: Optional[str] = None) -> PostFeedResponse:
         """Get personalized feed for user"""
         skip = (page - 1) * size
+        after = decode_cursor(cursor) if cursor else None
+        built: Dict[int, PostResponse] = {}
         
-        # Try cache first
-        cache_key = f"user_feed:{user_id}:{page}:{size}"
-        cached_feed = self.cache_helper.get_user_feed(cache_key)
-        if cached_feed:
-            return PostFeedResponse(**cached_feed)
+        def load():
+            if following_ids:
+                posts = self._get_timeline_posts(user_id, following_ids, skip, size, after)
+                if posts is None:
+                    posts = self.post_repo.get_feed_posts(following_ids, skip, size, after)
+            else:
+                posts = self.post_repo.get_global_feed(skip, size, after)
+            return self._build_page(posts, page, size, built)
         
-        if following_ids:
-            posts = self.post_repo.get_feed_posts(following_ids, skip, size)
-        else:
-            posts = self.post_repo.get_global_feed(skip, size)
+        # Personal pages are rarely re-read by the same worker, so they skip the local tier
+        celebrity_ids = self.timeline_helper.get_celebrity_authors(following_ids)
+        cache_key = self.cache_helper.user_feed_key(user_id, cursor or page, size, celebrity_ids)
+        page_data = self.cache_helper.get_or_load(cache_key, load, local=False)
         
-        post_responses = [PostResponse.from_orm(post) for post in posts]
+        posts = self._hydrate_posts(page_data["ids"], built)
+        return self._mark_liked_by_me(self._feed_from_page(page_data, posts), user_id)
+    
+    def get_global_feed(self, page: int = 1, size: int = 20, viewer_id: Optional[int] = None,
+                        cursor: Optional[str] = None) -> PostFeedResponse:
+        """Get global feed"""
+        after = decode_cursor(cursor) if cursor else None
+        built: Dict[int, PostResponse] = {}
+        load = lambda: self._build_page(self.post_repo.get_global_feed((page - 1) * size, size, after), page, size, built)
         
-        # Cache the result
-        response_data = {
-            "posts": [post.dict() for post in post_responses],
-            "total": len(post_responses),
-            "page": page,
-            "size": size,
-            "has_next": len(post_responses) == size
-        }
-        self.cache_helper.cache_user_feed(cache_key, response_data)
+        page_data = self.cache_helper.get_or_load(self.cache_helper.global_feed_key(cursor or page, size), load)
         
-        return PostFeedResponse(**response_data)
+        posts = self._hydrate_posts(page_data["ids"], built)
+        return self._mark_liked_by_me(self._feed_from_page(page_data, posts), viewer_id)
     
-    def get_global_feed(self, page: int = 1, size: int = 20) -> PostFeedResponse:
-        """Get global feed"""
-        skip = (page - 1) * size
+    def prewarm_global_feed(self, pages: int = settings.FEED_PREWARM_PAGES, size: int = settings.FEED_PAGE_SIZE) -> int:
+        """Rebuild the first pages of the global feed after an invalidation, before readers miss on them.
+
+        Follows the next_cursor chain the way clients scroll: page 1 under its page key,
+        later pages under their cursor keys. Returns the number of pages warmed.
+        """
+        cursor = None
+        for warmed in range(1, pages + 1):
+            cursor = self.get_global_feed(1, size, cursor=cursor).next_cursor
+            if not cursor:
+                return warmed
+        return pages
+    
+    async def get_global_feed_async(self, page: int = 1, size: int = 20, viewer_id: Optional[int] = None,
+                                    cursor: Optional[str] = None) -> PostFeedResponse:
+        """Get global feed without blocking the event loop: cache I/O is async, database work runs in the threadpool"""
+        after = decode_cursor(cursor) if cursor else None
+        built: Dict[int, PostResponse] = {}
         
-        # Try cache first
-        cache_key = f"global_feed:{page}:{size}"
-        cached_feed = self.cache_helper.get_global_feed()
-        if cached_feed and page == 1:
-            return PostFeedResponse(**cached_feed)
+        def build():
+            return self._build_page(self.post_repo.get_global_feed((page - 1) * size, size, after), page, size, built)
+        load = lambda: run_sync(build)
         
-        posts = self.post_repo.get_global_feed(skip, size)
-        post_responses = [PostResponse.from_orm(post) for post in posts]
+        cache_key = await self.async_cache_helper.global_feed_key(cursor or page, size)
+        page_data = await self.async_cache_helper.get_or_load(cache_key, load)
         
-        # Cache the result
-        response_data = {
-            "posts": [post.dict() for post in post_responses],
+        posts = await self._hydrate_posts_async(page_data["ids"], built)
+        feed = self._feed_from_page(page_data, posts)
+        if viewer_id is None:
+            return feed
+        return await run_sync(self._mark_liked_by_me, feed, viewer_id)
+    
+    async def render_global_feed(self, page: int = 1, size: int = 20, cursor: Optional[str] = None) -> Tuple[str, bytes]:
+        """Pre-rendered (etag, body) of a global feed page as seen without a viewer"""
+        cache_key = await self.async_cache_helper.global_feed_key(cursor or page, size)
+        return await get_or_render(
+            self.async_cache_helper, cache_key,
+            lambda: self.get_global_feed_async(page, size, None, cursor),
+            lambda feed: self._render_tags(feed.posts)
+        )
+    
+    def _build_page(self, posts: List[Post], page: int, size: int,
+                    built: Dict[int, PostResponse]) -> Tuple[dict, List[str]]:
+        """Turn one page of rows into an id-only page payload and its cache tags.
+
+        The posts themselves go to the object cache (and into built, so the request that
+        rebuilt the page does not read them straight back).
+        """
+        post_responses = [PostResponse.from_orm(post) for post in posts]
+        self.cache_helper.cache_objects("post", [self._cacheable(post) for post in post_responses], self.COUNTER_FIELDS)
+        built.update((post.id, post) for post in post_responses)
+        page_data = {
+            "ids": [post.id for post in post_responses],
             "total": len(post_responses),
             "page": page,
             "size": size,
-            "has_next": len(post_responses) == size
+            "has_next": len(post_responses) == size,
+            "next_cursor": next_cursor(post_responses, size)
         }
+        return page_data, self._post_tags(post_responses)
+    
+    @staticmethod
+    def _feed_from_page(page_data: dict, posts: List[PostResponse]) -> PostFeedResponse:
+        return PostFeedResponse(
+            posts=posts,
+            total=page_data["total"],
+            page=page_data["page"],
+            size=page_data["size"],
+            has_next=page_data["has_next"],
+            next_cursor=page_data["next_cursor"]
+        )
+    
+    def _hydrate_posts(self, post_ids: List[int], known: Dict[int, PostResponse]) -> List[PostResponse]:
+        """Resolve ordered ids with one MGET of the object cache and one IN query for the misses"""
+        wanted = [post_id for post_id in post_ids if post_id not in known]
+        found = self.cache_helper.get_objects("post", wanted)
+        missing = [post_id for post_id in wanted if post_id not in found]
+        if missing:
+            fresh = [PostResponse.from_orm(post) for post in self.post_repo.get_posts_by_ids(missing)]
+            self.cache_helper.cache_objects("post", [self._cacheable(post) for post in fresh], self.COUNTER_FIELDS)
+            known = {**known, **{post.id: post for post in fresh}}
+        return self._ordered_posts(post_ids, known, found)
+    
+    async def _hydrate_posts_async(self, post_ids: List[int], known: Dict[int, PostResponse]) -> List[PostResponse]:
+        """Async _hydrate_posts; the IN query for misses runs in the threadpool"""
+        wanted = [post_id for post_id in post_ids if post_id not in known]
+        found = await self.async_cache_helper.get_objects("post", wanted)
+        missing = [post_id for post_id in wanted if post_id not in found]
+        if missing:
+            rows = await run_sync(self.post_repo.get_posts_by_ids, missing)
+            fresh = [PostResponse.from_orm(post) for post in rows]
+            await self.async_cache_helper.cache_objects("post", [self._cacheable(post) for post in fresh],
+                                                        self.COUNTER_FIELDS)
+            known = {**known, **{post.id: post for post in fresh}}
+        return self._ordered_posts(post_ids, known, found)
+    
+    @staticmethod
+    def _ordered_posts(post_ids: List[int], known: Dict[int, PostResponse], found: Dict[int, dict]) -> List[PostResponse]:
+        posts = []
+        for post_id in post_ids:
+            if post_id in known:
+                posts.append(known[post_id])
+            elif post_id in found:
+                posts.append(PostResponse(**found[post_id]))
+            # ids that resolve to nothing were deleted since the page was cached
+        return posts
+    
+    @staticmethod
+    def _cacheable(post: PostResponse) -> dict:
+        """Object-cache payload of a post; liked_by_me depends on the viewer and is never cached"""
+        return post.dict(exclude={"liked_by_me"})
+    
+    @staticmethod
+    def _post_tags(posts: List[PostResponse]) -> List[str]:
+        """Cache tags linking a page to the posts it lists"""
+        return [f"post:{post.id}" for post in posts]
+    
+    @staticmethod
+    def _render_tags(posts: List[PostResponse]) -> List[str]:
+        """Cache tags linking a pre-rendered response to the posts whose counts it shows"""
+        return [f"render:post:{post.id}" for post in posts]
+    
+    def _get_timeline_posts(self, user_id: int, following_ids: List[int], skip: int, size: int,
+                            after: Optional[Cursor]) -> Optional[List[Post]]:
+        """Build a feed page from the fan-out timeline plus celebrity posts pulled on read.
+
+        Returns None when the timeline cannot serve the page, so the caller falls back
+        to the Post.user_id IN (...) query.
+        """
+        # Like paginate: a cursor replaces the offset
+        if after is not None:
+            skip = 0
+        window = skip + size
+        unseeded = self.timeline_helper.unseeded_authors(user_id, following_ids)
+        if unseeded is None:
+            return None
+        if unseeded:
+            # Cold timeline or newly followed authors: backfill their posts from SQL once
+            seed = self.post_repo.get_feed_posts(unseeded, 0, self.timeline_helper.max_length)
+            if not self.timeline_helper.rebuild(user_id, seed, unseeded):
+                return None
+        
+        entries = self.timeline_helper.get_entries(user_id, window, after)
+        if entries is None:
+            return None
+        
+        following = set(following_ids)
+        candidates = {post_id: (score, None) for post_id, author_id, score in entries if author_id in following}
+        
+        celebrity_ids = self.timeline_helper.get_celebrity_authors(following_ids)
+        if celebrity_ids:
+            for post in self.post_repo.get_feed_posts(celebrity_ids, 0, window, after):
+                candidates[post.id] = (post.created_at.timestamp(), post)
         
-        if page == 1:
-            self.cache_helper.cache_global_feed(response_data)
+        page = sorted(candidates.items(), key=lambda item: (item[1][0], item[0]), reverse=True)[skip:window]
         
-        return PostFeedResponse(**response_data)
+        # Hydrate every pushed id on the page with one batched query
+        missing = [post_id for post_id, (_, post) in page if post is None]
+        hydrated = {post.id: post for post in self.post_repo.get_posts_by_ids(missing)}
+        posts = []
+        for post_id, (_, post) in page:
+            post = post or hydrated.get(post_id)
+            if post is not None:  # deleted posts drop out here
+                posts.append(post)
+        return posts
+    
+    def _mark_liked_by_me(self, feed: PostFeedResponse, viewer_id: Optional[int]) -> PostFeedResponse:
+        """Fill liked_by_me for every post on the page with one extra query"""
+        if viewer_id is None or not feed.posts:
+            return feed
+        
+        liked_ids = self.like_repo.liked_by(viewer_id, post_ids=[post.id for post in feed.posts])
+        for post in feed.posts:
+            post.liked_by_me = post.id in liked_ids
+        return feed
     
     def update_post(self, post_id: int, post_update: PostUpdate, user_id: int) -> Optional[PostResponse]:
         """Update post"""
         db_post = self.post_repo.update_post(post_id, post_update, user_id)
         if db_post:
-            # Invalidate cache
-            self.cache_helper.invalidate_global_feed()
-            self.cache_helper.invalidate_user_feed(user_id)
+            # Pages only list ids, so dropping the cached post is enough
+            self.cache_helper.invalidate_object("post", post_id)
             return PostResponse.from_orm(db_post)
         return None
     
@@ -145,9 +336,10 @@ class PostService:
         """Delete post"""
         success = self.post_repo.delete_post(post_id, user_id)
         if success:
-            # Invalidate cache
-            self.cache_helper.invalidate_global_feed()
-            self.cache_helper.invalidate_user_feed(user_id)
+            # Invalidate cache (the post tag also reaches followers' feed pages)
+            self.cache_helper.invalidate_namespaces(["global_feed", f"user_posts:{user_id}", f"user_feed:{user_id}"])
+            self.cache_helper.invalidate_post(post_id)
+            self.cache_helper.invalidate_object("post", post_id)
         return success
     
     def like_post(self, post_id: int, user_id: int) -> bool:
@@ -159,15 +351,13 @@ class PostService:
         # Create like
         success = self.like_repo.create_like(user_id, post_id=post_id)
         if success:
-            # Update like count
-            self.post_repo.increment_like_count(post_id)
+            # Update like count (cached pages pick it up from the counters hash)
+            like_count = self.post_repo.increment_like_count(post_id)
+            self.cache_helper.set_counters("post", post_id, like_count=like_count)
             
             # Send notification (async)
             # This would typically be done via Celery task
             # self._send_like_notification(post_id, user_id)
-            
-            # Invalidate cache
-            self.cache_helper.invalidate_global_feed()
         
         return success
     
@@ -175,11 +365,9 @@ class PostService:
         """Unlike a post"""
         success = self.like_repo.remove_like(user_id, post_id=post_id)
         if success:
-            # Update like count
-            self.post_repo.decrement_like_count(post_id)
-            
-            # Invalidate cache
-            self.cache_helper.invalidate_global_feed()
+            # Update like count (cached pages pick it up from the counters hash)
+            like_count = self.post_repo.decrement_like_count(post_id)
+            self.cache_helper.set_counters("post", post_id, like_count=like_count)
         
         return success
     
@@ -187,22 +375,22 @@ class PostService:
         """Create a comment"""
         db_comment = self.comment_repo.create_comment(comment, user_id)
         if db_comment:
-            # Update comment count
-            self.post_repo.increment_comment_count(comment.post_id)
+            # Update comment count (cached pages pick it up from the counters hash)
+            comment_count = self.post_repo.increment_comment_count(comment.post_id)
+            self.cache_helper.set_counters("post", comment.post_id, comment_count=comment_count)
             
             # Send notification (async)
             # self._send_comment_notification(comment.post_id, user_id)
             
-            # Invalidate cache
-            self.cache_helper.invalidate_global_feed()
-            
             return CommentResponse.from_orm(db_comment)
         return None
     
-    def get_post_comments(self, post_id: int, page: int = 1, size: int = 20) -> List[CommentResponse]:
+    def get_post_comments(self, post_id: int, page: int = 1, size: int = 20,
+                          cursor: Optional[str] = None) -> List[CommentResponse]:
         """Get post comments"""
         skip = (page - 1) * size
-        comments = self.comment_repo.get_post_comments(post_id, skip, size)
+        after = decode_cursor(cursor) if cursor else None
+        comments = self.comment_repo.get_post_comments(post_id, skip, size, after)
         return [CommentResponse.from_orm(comment) for comment in comments]
     
     def update_comment(self, comment_id: int, comment_update: CommentUpdate, user_id: int) -> Optional[CommentResponse]:
@@ -221,11 +409,9 @@ class PostService:
         
         success = self.comment_repo.delete_comment(comment_id, user_id)
         if success:
-            # Update comment count
-            self.post_repo.decrement_comment_count(comment.post_id)
-            
-            # Invalidate cache
-            self.cache_helper.invalidate_global_feed()
+            # Update comment count (cached pages pick it up from the counters hash)
+            comment_count = self.post_repo.decrement_comment_count(comment.post_id)
+            self.cache_helper.set_counters("post", comment.post_id, comment_count=comment_count)
         
         return success
 
@@ -1,47 +1,140 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from app.repository.reel_repository import ReelRepository, ReelCommentRepository
 from app.repository.comment_repository import LikeRepository
-from app.schema.reel_schema import ReelCreate, ReelUpdate, ReelResponse, ReelFeedResponse, ReelCommentCreate, ReelCommentResponse
-from app.util.s3_helper import S3Helper
+from app.repository.media_repository import MediaBlobRepository
+from app.schema.reel_schema import ReelCreate, ReelUpdate, ReelResponse, ReelFeedResponse, ReelCommentCreate, ReelCommentResponse, ReelUploadComplete
+from app.schema.upload_schema import UploadFileSpec, UploadSessionResponse
+from app.util.s3_helper import get_s3_helper
 from app.util.ffmpeg_worker import FFmpegWorker
-from app.util.cache_helper import CacheHelper
+from app.util.cache_helper import AsyncCacheHelper, CacheHelper
+from app.util.executor import run_sync
+from app.util.response_cache import get_or_render
+from app.util.upload_session_helper import UploadSessionHelper
+from app.task.reel_task import check_transcode_admission, enqueue_transcode
+from app.util.transcode_scheduler import TranscodeQueueFullError
+from app.config.settings import settings
 from app.util.notification_helper import NotificationHelper
+from app.util.pagination import decode_cursor, next_cursor
+from app.model.reel_model import Reel
 
 class ReelService:
+    # Fields served live from the counters hash rather than the cached reel
+    COUNTER_FIELDS = ("like_count", "comment_count", "view_count")
+    
     def __init__(self, db: Session):
         self.db = db
         self.reel_repo = ReelRepository(db)
         self.reel_comment_repo = ReelCommentRepository(db)
         self.like_repo = LikeRepository(db)
-        self.s3_helper = S3Helper()
+        self.media_repo = MediaBlobRepository(db)
+        self.s3_helper = get_s3_helper()
         self.ffmpeg_worker = FFmpegWorker()
         self.cache_helper = CacheHelper()
+        self.async_cache_helper = AsyncCacheHelper()
+        self.upload_session_helper = UploadSessionHelper()
         self.notification_helper = NotificationHelper()
     
     def create_reel(self, reel: ReelCreate, user_id: int) -> Optional[ReelResponse]:
-        """Create a new reel"""
-        # Process video with FFmpeg
-        video_url, thumbnail_url, audio_url, video_info = self.ffmpeg_worker.process_reel_video(reel.video_url)
-        
-        if not video_url:
-            return None
+        """Create a reel in processing state and queue its transcode.
         
-        # Create reel data
-        reel_data = ReelCreate(
-            video_url=video_url,
-            thumbnail_url=thumbnail_url,
-            audio_url=audio_url,
-            duration=int(video_info.get('duration', 0))
-        )
+        Raises TranscodeQueueFullError before inserting anything when the transcode backlog is full.
+        """
+        check_transcode_admission()
+        # FFmpeg runs on a worker; the reel is listed once process_reel marks it ready
+        db_reel = self.reel_repo.create_reel(reel, user_id, status="processing")
+        try:
+            enqueue_transcode(db_reel.id, reel.video_url, reel.duration)
+        except TranscodeQueueFullError:
+            # Lost the race for the last queue slot
+            self.reel_repo.finish_processing(db_reel.id, "failed")
+            raise
+        return ReelResponse.from_orm(db_reel)
+    
+    def process_reel(self, reel_id: int, source_url: str) -> Optional[ReelResponse]:
+        """Transcode a queued reel (on a worker) and mark it ready, or failed"""
+        video_url, thumbnail_url, audio_url, hls_manifest_url, thumbnail_sprite, video_info = self._transcode(source_url)
         
-        db_reel = self.reel_repo.create_reel(reel_data, user_id)
+        if video_url:
+            db_reel = self.reel_repo.finish_processing(
+                reel_id, "ready", video_url, thumbnail_url, audio_url, int(video_info.get('duration', 0)),
+                hls_manifest_url=hls_manifest_url, thumbnail_sprite=thumbnail_sprite
+            )
+        else:
+            db_reel = self.reel_repo.finish_processing(reel_id, "failed")
+        if not db_reel:
+            return None
         
         # Invalidate cache
-        self.cache_helper.invalidate_reel_feed()
+        self.cache_helper.invalidate_object("reel", reel_id)
+        self.cache_helper.invalidate_namespaces(["reel_feed", f"user_reels:{db_reel.user_id}"])
+        if db_reel.status == "ready":
+            self.prewarm_reel_feed()
         
         return ReelResponse.from_orm(db_reel)
     
+    def fail_processing(self, reel_id: int) -> None:
+        """Mark a reel failed after its transcode job gave up, so clients polling it see a final state"""
+        db_reel = self.reel_repo.get_reel_by_id(reel_id)
+        # The job may have raised after storing its result (e.g. while invalidating); keep that
+        if not db_reel or db_reel.status != "processing":
+            return
+        db_reel = self.reel_repo.finish_processing(reel_id, "failed")
+        self.cache_helper.invalidate_object("reel", reel_id)
+        self.cache_helper.invalidate_namespaces(["reel_feed", f"user_reels:{db_reel.user_id}"])
+    
+    def _transcode(self, source_url: str) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str],
+                                                   Optional[dict], dict]:
+        """process_reel_video, or the outputs of an earlier transcode of the same stored source.
+        
+        Uploads are deduplicated by content hash, so a reposted video resolves to the same source
+        object; its outputs are reused (with a reference each) instead of running FFmpeg again.
+        """
+        source_key = self.s3_helper.key_from_url(source_url)
+        outputs = self.media_repo.get_transcode(source_key) if source_key else None
+        if outputs and self._reference_outputs(outputs):
+            return (outputs["video_url"], outputs["thumbnail_url"], outputs["audio_url"],
+                    outputs["hls_manifest_url"], outputs.get("thumbnail_sprite"), {"duration": outputs["duration"]})
+        
+        result = self.ffmpeg_worker.process_reel_video(source_url)
+        video_url, thumbnail_url, audio_url, hls_manifest_url, thumbnail_sprite, video_info = result
+        if source_key and video_url:
+            self.media_repo.set_transcode(source_key, {
+                "video_url": video_url, "thumbnail_url": thumbnail_url, "audio_url": audio_url,
+                "hls_manifest_url": hls_manifest_url, "thumbnail_sprite": thumbnail_sprite,
+                "duration": video_info.get("duration", 0)
+            })
+        return result
+    
+    def _reference_outputs(self, outputs: dict) -> bool:
+        """Add a reference to each stored output; False (and nothing referenced) if one is gone"""
+        sprite_url = (outputs.get("thumbnail_sprite") or {}).get("url")
+        keys = [self.s3_helper.key_from_url(url) for url in (outputs["video_url"], outputs["thumbnail_url"],
+                                                               outputs["audio_url"], sprite_url) if url]
+        referenced = []
+        for key in keys:
+            if not key or not self.media_repo.add_reference(key):
+                for done in referenced:
+                    self.media_repo.release(done)
+                return False
+            referenced.append(key)
+        return True
+    
+    def create_upload_session(self, files: List[UploadFileSpec], user_id: int) -> UploadSessionResponse:
+        """Hand out a presigned URL for uploading the reel video straight to storage"""
+        return self.upload_session_helper.create_session(user_id, "reel", files, ("video/",), max_files=1)
+    
+    def complete_upload_session(self, session_id: str, completion: ReelUploadComplete,
+                                user_id: int) -> ReelResponse:
+        """Verify the uploaded video and queue the reel's transcode; raises ValueError if verification fails"""
+        # Refuse before the session is claimed, so the client can complete it again later
+        check_transcode_admission()
+        files = self.upload_session_helper.complete_session(session_id, user_id, "reel")
+        # Queue the unsigned object URL: the bucket is private, but the worker presigns it when
+        # the job runs (a URL signed now could expire in the queue), and dedup can find its key
+        source_url = self.s3_helper.object_url(files[0]["key"])
+        return self.create_reel(ReelCreate(video_url=source_url, duration=completion.duration), user_id)
+    
     def get_reel(self, reel_id: int) -> Optional[ReelResponse]:
         """Get reel by ID"""
         db_reel = self.reel_repo.get_reel_by_id(reel_id)
@@ -49,64 +142,166 @@ class ReelService:
             return ReelResponse.from_orm(db_reel)
         return None
     
-    def get_user_reels(self, user_id: int, page: int = 1, size: int = 20) -> ReelFeedResponse:
-        """Get user's reels with pagination"""
+    def get_user_reels(self, user_id: int, page: int = 1, size: int = 20, viewer_id: Optional[int] = None,
+                       cursor: Optional[str] = None) -> ReelFeedResponse:
+        """Get user's reels with pagination (page/size or an opaque cursor)"""
         skip = (page - 1) * size
+        after = decode_cursor(cursor) if cursor else None
+        built: Dict[int, ReelResponse] = {}
+        load = lambda: self._build_page(self.reel_repo.get_user_reels(user_id, skip, size, after), page, size, built)
         
-        # Try cache first
-        cache_key = f"user_reels:{user_id}:{page}:{size}"
-        cached_reels = self.cache_helper.get_cache(cache_key)
-        if cached_reels:
-            return ReelFeedResponse(**cached_reels)
+        cache_key = self.cache_helper.versioned_key(f"user_reels:{user_id}", cursor or page, size)
+        page_data = self.cache_helper.get_or_load(cache_key, load, ttl=300)  # 5 minutes
         
-        reels = self.reel_repo.get_user_reels(user_id, skip, size)
-        reel_responses = [ReelResponse.from_orm(reel) for reel in reels]
+        reels = self._hydrate_reels(page_data["ids"], built)
+        return self._mark_liked_by_me(self._feed_from_page(page_data, reels), viewer_id)
+    
+    def get_reel_feed(self, page: int = 1, size: int = 20, viewer_id: Optional[int] = None,
+                      cursor: Optional[str] = None) -> ReelFeedResponse:
+        """Get reel feed"""
+        after = decode_cursor(cursor) if cursor else None
+        built: Dict[int, ReelResponse] = {}
+        load = lambda: self._build_page(self.reel_repo.get_reel_feed((page - 1) * size, size, after), page, size, built)
         
-        # Cache the result
-        response_data = {
-            "reels": [reel.dict() for reel in reel_responses],
-            "total": len(reel_responses),
-            "page": page,
-            "size": size,
-            "has_next": len(reel_responses) == size
-        }
-        self.cache_helper.set_cache(cache_key, response_data, ttl=300)  # 5 minutes
+        page_data = self.cache_helper.get_or_load(self.cache_helper.reel_feed_key(cursor or page, size), load)
         
-        return ReelFeedResponse(**response_data)
+        reels = self._hydrate_reels(page_data["ids"], built)
+        return self._mark_liked_by_me(self._feed_from_page(page_data, reels), viewer_id)
     
-    def get_reel_feed(self, page: int = 1, size: int = 20) -> ReelFeedResponse:
-        """Get reel feed"""
-        skip = (page - 1) * size
+    def prewarm_reel_feed(self, pages: int = settings.FEED_PREWARM_PAGES, size: int = settings.FEED_PAGE_SIZE) -> int:
+        """Rebuild the first pages of the reel feed after an invalidation, before readers miss on them.
+
+        Follows the next_cursor chain the way clients scroll: page 1 under its page key,
+        later pages under their cursor keys. Returns the number of pages warmed.
+        """
+        cursor = None
+        for warmed in range(1, pages + 1):
+            cursor = self.get_reel_feed(1, size, cursor=cursor).next_cursor
+            if not cursor:
+                return warmed
+        return pages
+    
+    async def get_reel_feed_async(self, page: int = 1, size: int = 20, viewer_id: Optional[int] = None,
+                                  cursor: Optional[str] = None) -> ReelFeedResponse:
+        """Get reel feed without blocking the event loop: cache I/O is async, database work runs in the threadpool"""
+        after = decode_cursor(cursor) if cursor else None
+        built: Dict[int, ReelResponse] = {}
         
-        # Try cache first
-        cache_key = f"reel_feed:{page}:{size}"
-        cached_feed = self.cache_helper.get_reel_feed()
-        if cached_feed and page == 1:
-            return ReelFeedResponse(**cached_feed)
+        def build():
+            return self._build_page(self.reel_repo.get_reel_feed((page - 1) * size, size, after), page, size, built)
+        load = lambda: run_sync(build)
         
-        reels = self.reel_repo.get_reel_feed(skip, size)
-        reel_responses = [ReelResponse.from_orm(reel) for reel in reels]
+        cache_key = await self.async_cache_helper.reel_feed_key(cursor or page, size)
+        page_data = await self.async_cache_helper.get_or_load(cache_key, load)
         
-        # Cache the result
-        response_data = {
-            "reels": [reel.dict() for reel in reel_responses],
+        reels = await self._hydrate_reels_async(page_data["ids"], built)
+        feed = self._feed_from_page(page_data, reels)
+        if viewer_id is None:
+            return feed
+        return await run_sync(self._mark_liked_by_me, feed, viewer_id)
+    
+    async def render_reel_feed(self, page: int = 1, size: int = 20, cursor: Optional[str] = None) -> Tuple[str, bytes]:
+        """Pre-rendered (etag, body) of a reel feed page as seen without a viewer"""
+        cache_key = await self.async_cache_helper.reel_feed_key(cursor or page, size)
+        return await get_or_render(
+            self.async_cache_helper, cache_key,
+            lambda: self.get_reel_feed_async(page, size, None, cursor),
+            lambda feed: self._render_tags(feed.reels)
+        )
+    
+    def _build_page(self, reels: List[Reel], page: int, size: int,
+                    built: Dict[int, ReelResponse]) -> Tuple[dict, List[str]]:
+        """Turn one page of rows into an id-only page payload and its cache tags; the reels go to the object cache"""
+        reel_responses = [ReelResponse.from_orm(reel) for reel in reels]
+        self.cache_helper.cache_objects("reel", [self._cacheable(reel) for reel in reel_responses], self.COUNTER_FIELDS)
+        built.update((reel.id, reel) for reel in reel_responses)
+        page_data = {
+            "ids": [reel.id for reel in reel_responses],
             "total": len(reel_responses),
             "page": page,
             "size": size,
-            "has_next": len(reel_responses) == size
+            "has_next": len(reel_responses) == size,
+            "next_cursor": next_cursor(reel_responses, size)
         }
+        return page_data, self._reel_tags(reel_responses)
+    
+    @staticmethod
+    def _feed_from_page(page_data: dict, reels: List[ReelResponse]) -> ReelFeedResponse:
+        return ReelFeedResponse(
+            reels=reels,
+            total=page_data["total"],
+            page=page_data["page"],
+            size=page_data["size"],
+            has_next=page_data["has_next"],
+            next_cursor=page_data["next_cursor"]
+        )
+    
+    def _hydrate_reels(self, reel_ids: List[int], known: Dict[int, ReelResponse]) -> List[ReelResponse]:
+        """Resolve ordered ids with one MGET of the object cache and one IN query for the misses"""
+        wanted = [reel_id for reel_id in reel_ids if reel_id not in known]
+        found = self.cache_helper.get_objects("reel", wanted)
+        missing = [reel_id for reel_id in wanted if reel_id not in found]
+        if missing:
+            fresh = [ReelResponse.from_orm(reel) for reel in self.reel_repo.get_reels_by_ids(missing)]
+            self.cache_helper.cache_objects("reel", [self._cacheable(reel) for reel in fresh], self.COUNTER_FIELDS)
+            known = {**known, **{reel.id: reel for reel in fresh}}
+        return self._ordered_reels(reel_ids, known, found)
+    
+    async def _hydrate_reels_async(self, reel_ids: List[int], known: Dict[int, ReelResponse]) -> List[ReelResponse]:
+        """Async _hydrate_reels; the IN query for misses runs in the threadpool"""
+        wanted = [reel_id for reel_id in reel_ids if reel_id not in known]
+        found = await self.async_cache_helper.get_objects("reel", wanted)
+        missing = [reel_id for reel_id in wanted if reel_id not in found]
+        if missing:
+            rows = await run_sync(self.reel_repo.get_reels_by_ids, missing)
+            fresh = [ReelResponse.from_orm(reel) for reel in rows]
+            await self.async_cache_helper.cache_objects("reel", [self._cacheable(reel) for reel in fresh],
+                                                        self.COUNTER_FIELDS)
+            known = {**known, **{reel.id: reel for reel in fresh}}
+        return self._ordered_reels(reel_ids, known, found)
+    
+    @staticmethod
+    def _ordered_reels(reel_ids: List[int], known: Dict[int, ReelResponse], found: Dict[int, dict]) -> List[ReelResponse]:
+        reels = []
+        for reel_id in reel_ids:
+            if reel_id in known:
+                reels.append(known[reel_id])
+            elif reel_id in found:
+                reels.append(ReelResponse(**found[reel_id]))
+            # ids that resolve to nothing were deleted since the page was cached
+        return reels
+    
+    @staticmethod
+    def _cacheable(reel: ReelResponse) -> dict:
+        """Object-cache payload of a reel; liked_by_me depends on the viewer and is never cached"""
+        return reel.dict(exclude={"liked_by_me"})
+    
+    @staticmethod
+    def _reel_tags(reels: List[ReelResponse]) -> List[str]:
+        """Cache tags linking a page to the reels it lists"""
+        return [f"reel:{reel.id}" for reel in reels]
+    
+    @staticmethod
+    def _render_tags(reels: List[ReelResponse]) -> List[str]:
+        """Cache tags linking a pre-rendered response to the reels whose counts it shows"""
+        return [f"render:reel:{reel.id}" for reel in reels]
+    
+    def _mark_liked_by_me(self, feed: ReelFeedResponse, viewer_id: Optional[int]) -> ReelFeedResponse:
+        """Fill liked_by_me for every reel on the page with one extra query"""
+        if viewer_id is None or not feed.reels:
+            return feed
         
-        if page == 1:
-            self.cache_helper.cache_reel_feed(response_data)
-        
-        return ReelFeedResponse(**response_data)
+        liked_ids = self.like_repo.liked_by(viewer_id, reel_ids=[reel.id for reel in feed.reels])
+        for reel in feed.reels:
+            reel.liked_by_me = reel.id in liked_ids
+        return feed
     
     def update_reel(self, reel_id: int, reel_update: ReelUpdate, user_id: int) -> Optional[ReelResponse]:
         """Update reel"""
         db_reel = self.reel_repo.update_reel(reel_id, reel_update, user_id)
         if db_reel:
-            # Invalidate cache
-            self.cache_helper.invalidate_reel_feed()
+            # Pages only list ids, so dropping the cached reel is enough
+            self.cache_helper.invalidate_object("reel", reel_id)
             return ReelResponse.from_orm(db_reel)
         return None
     
@@ -115,7 +310,9 @@ class ReelService:
         success = self.reel_repo.delete_reel(reel_id, user_id)
         if success:
             # Invalidate cache
-            self.cache_helper.invalidate_reel_feed()
+            self.cache_helper.invalidate_namespaces(["reel_feed", f"user_reels:{user_id}"])
+            self.cache_helper.invalidate_reel(reel_id)
+            self.cache_helper.invalidate_object("reel", reel_id)
         return success
     
     def like_reel(self, reel_id: int, user_id: int) -> bool:
@@ -127,14 +324,12 @@ class ReelService:
         # Create like
         success = self.like_repo.create_like(user_id, reel_id=reel_id)
         if success:
-            # Update like count
-            self.reel_repo.increment_like_count(reel_id)
+            # Update like count (cached pages pick it up from the counters hash)
+            like_count = self.reel_repo.increment_like_count(reel_id)
+            self.cache_helper.set_counters("reel", reel_id, like_count=like_count)
             
             # Send notification (async)
             # self._send_like_notification(reel_id, user_id, "reel")
-            
-            # Invalidate cache
-            self.cache_helper.invalidate_reel_feed()
         
         return success
     
@@ -142,39 +337,38 @@ class ReelService:
         """Unlike a reel"""
         success = self.like_repo.remove_like(user_id, reel_id=reel_id)
         if success:
-            # Update like count
-            self.reel_repo.decrement_like_count(reel_id)
-            
-            # Invalidate cache
-            self.cache_helper.invalidate_reel_feed()
+            # Update like count (cached pages pick it up from the counters hash)
+            like_count = self.reel_repo.decrement_like_count(reel_id)
+            self.cache_helper.set_counters("reel", reel_id, like_count=like_count)
         
         return success
     
     def view_reel(self, reel_id: int) -> bool:
         """Record reel view"""
-        self.reel_repo.increment_view_count(reel_id)
+        view_count = self.reel_repo.increment_view_count(reel_id)
+        self.cache_helper.set_counters("reel", reel_id, view_count=view_count)
         return True
     
     def create_reel_comment(self, comment: ReelCommentCreate, user_id: int) -> Optional[ReelCommentResponse]:
         """Create a reel comment"""
         db_comment = self.reel_comment_repo.create_comment(comment, user_id)
         if db_comment:
-            # Update comment count
-            self.reel_repo.increment_comment_count(comment.reel_id)
+            # Update comment count (cached pages pick it up from the counters hash)
+            comment_count = self.reel_repo.increment_comment_count(comment.reel_id)
+            self.cache_helper.set_counters("reel", comment.reel_id, comment_count=comment_count)
             
             # Send notification (async)
             # self._send_comment_notification(comment.reel_id, user_id, "reel")
             
-            # Invalidate cache
-            self.cache_helper.invalidate_reel_feed()
-            
             return ReelCommentResponse.from_orm(db_comment)
         return None
     
-    def get_reel_comments(self, reel_id: int, page: int = 1, size: int = 20) -> List[ReelCommentResponse]:
+    def get_reel_comments(self, reel_id: int, page: int = 1, size: int = 20,
+                          cursor: Optional[str] = None) -> List[ReelCommentResponse]:
         """Get reel comments"""
         skip = (page - 1) * size
-        comments = self.reel_comment_repo.get_reel_comments(reel_id, skip, size)
+        after = decode_cursor(cursor) if cursor else None
+        comments = self.reel_comment_repo.get_reel_comments(reel_id, skip, size, after)
         return [ReelCommentResponse.from_orm(comment) for comment in comments]
     
     def delete_reel_comment(self, comment_id: int, user_id: int) -> bool:
@@ -186,11 +380,9 @@ class ReelService:
         
         success = self.reel_comment_repo.delete_comment(comment_id, user_id)
         if success:
-            # Update comment count
-            self.reel_repo.decrement_comment_count(comment[0].reel_id)
-            
-            # Invalidate cache
-            self.cache_helper.invalidate_reel_feed()
+            # Update comment count (cached pages pick it up from the counters hash)
+            comment_count = self.reel_repo.decrement_comment_count(comment[0].reel_id)
+            self.cache_helper.set_counters("reel", comment[0].reel_id, comment_count=comment_count)
         
         return success
 
@@ -0,0 +1,71 @@
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.util.transcode_scheduler import TranscodeQueueFullError, transcode_scheduler
+
+try:
+    from app.celery import celery_app
+except ImportError:  # optional: without Celery, jobs run on an in-process pool
+    celery_app = None
+
+def process_reel_job(reel_id: int, source_url: str, last_attempt: bool = True) -> None:
+    """Transcode one reel with its own DB session (Celery worker or local pool).
+    
+    Re-raises errors; on the last attempt the reel is first marked failed, so it does not
+    stay in processing forever.
+    """
+    from app.service.reel_service import ReelService  # the service enqueues jobs from here
+    
+    db = SessionLocal()
+    try:
+        ReelService(db).process_reel(reel_id, source_url)
+    except Exception:
+        if last_attempt:
+            try:
+                db.rollback()
+                ReelService(db).fail_processing(reel_id)
+            except Exception as e:
+                print(f"Reel {reel_id} failure marking error: {e}")
+        raise
+    finally:
+        db.close()
+
+if celery_app is not None:
+    @celery_app.task(name="reels.transcode", bind=True, max_retries=settings.TRANSCODE_MAX_RETRIES,
+                     default_retry_delay=30)
+    def transcode_reel(self, reel_id: int, source_url: str) -> None:
+        """Celery task: transcode an uploaded reel, retrying on storage/DB errors"""
+        try:
+            process_reel_job(reel_id, source_url, last_attempt=self.request.retries >= self.max_retries)
+        except Exception as e:
+            raise self.retry(exc=e)
+
+def celery_priority(duration: float) -> int:
+    """Broker priority of a transcode, 0 (shortest clips, served first) to 9 (MAX_REEL_DURATION)"""
+    return max(0, min(9, int(duration * 9 / settings.MAX_REEL_DURATION)))
+
+def transcode_backlog() -> int:
+    """Transcodes waiting for a slot: the broker queue's depth with Celery, else the local scheduler's"""
+    if celery_app is None:
+        return transcode_scheduler.backlog()
+    try:
+        with celery_app.connection_for_read() as connection:
+            return connection.default_channel.queue_declare(
+                queue=celery_app.conf.task_default_queue, passive=True
+            ).message_count
+    except Exception as e:
+        print(f"Transcode backlog check error: {e}")
+        return 0
+
+def check_transcode_admission() -> None:
+    """Refuse new reels while TRANSCODE_MAX_QUEUE transcodes are already waiting"""
+    backlog = transcode_backlog()
+    if backlog >= settings.TRANSCODE_MAX_QUEUE:
+        raise TranscodeQueueFullError(f"{backlog} transcodes are already waiting")
+
+def enqueue_transcode(reel_id: int, source_url: str, duration: float) -> None:
+    """Queue the transcode of a reel created in processing state, short clips ahead of long ones"""
+    if celery_app is not None:
+        transcode_reel.apply_async((reel_id, source_url), priority=celery_priority(duration))
+        return
+    
+    transcode_scheduler.submit(duration, process_reel_job, reel_id, source_url)
@@ -0,0 +1,362 @@
+import asyncio
+import pytest
+import threading
+import time
+import fakeredis
+import fakeredis.aioredis
+from datetime import datetime
+from unittest.mock import patch
+from app.util import cache_helper as cache_module
+from app.util.cache_helper import AsyncCacheHelper, CacheHelper
+from app.schema.post_schema import PostFeedResponse
+from app.util.local_cache import LocalCache
+from app.util.response_cache import get_or_render, rendered_response
+from app.util.serializer import CacheCodec, codec
+
+@pytest.fixture
+def cache_helper():
+    server = fakeredis.FakeServer()
+    helper = CacheHelper()
+    helper.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    helper.binary_client = fakeredis.FakeRedis(server=server)
+    helper.local_cache = LocalCache(100, 1024 * 1024, 5.0)
+    return helper
+
+@pytest.fixture
+def async_cache_helper():
+    helper = AsyncCacheHelper()
+    helper.redis_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+    helper.local_cache = LocalCache(100, 1024 * 1024, 5.0)
+    return helper
+
+def feed_page(marker: str) -> dict:
+    return {"posts": [{"id": 1, "content": marker, "created_at": datetime(2024, 1, 1)}], "page": 1}
+
+def test_user_feed_keys_are_versioned_per_user(cache_helper):
+    """Test that feed keys are prefixed once and carry the namespace generation"""
+    cache_helper.cache_user_feed(1, 1, 20, feed_page("a"))
+    
+    assert cache_helper.redis_client.keys("user_feed:*") == ["user_feed:1:v0:1:20"]
+
+def test_pulled_author_generation_moves_every_follower_feed_key(cache_helper):
+    """Test that one author_posts bump changes the feed keys of all followers of that author"""
+    before = [cache_helper.user_feed_key(user_id, 1, 20, [9, 3]) for user_id in (1, 2)]
+    unrelated = cache_helper.user_feed_key(3, 1, 20, [4])
+    
+    cache_helper.invalidate_namespaces(["author_posts:9"])
+    
+    assert before == ["user_feed:1:v0:1:20:a0", "user_feed:2:v0:1:20:a0"]
+    assert [cache_helper.user_feed_key(user_id, 1, 20, [9, 3]) for user_id in (1, 2)] == [
+        "user_feed:1:v0:1:20:a1", "user_feed:2:v0:1:20:a1",
+    ]
+    assert cache_helper.user_feed_key(3, 1, 20, [4]) == unrelated
+    assert cache_helper.user_feed_key(1, 1, 20) == "user_feed:1:v0:1:20"
+
+def test_invalidate_user_feed_evicts_every_page(cache_helper):
+    """Test that one invalidation makes all of a user's pages stale, and only that user's"""
+    for page in (1, 2, 3):
+        cache_helper.cache_user_feed(1, page, 20, feed_page("old"))
+    cache_helper.cache_user_feed(2, 1, 20, feed_page("other"))
+    
+    cache_helper.invalidate_user_feed(1)
+    
+    assert all(cache_helper.get_user_feed(1, page, 20) is None for page in (1, 2, 3))
+    assert cache_helper.get_user_feed(2, 1, 20)["posts"][0]["content"] == "other"
+
+def test_global_feed_pages_are_keyed_by_page_and_size(cache_helper):
+    """Test that a cached page is never served for a different page or size"""
+    cache_helper.cache_global_feed(1, 10, feed_page("size 10"))
+    
+    assert cache_helper.get_global_feed(1, 10)["posts"][0]["content"] == "size 10"
+    assert cache_helper.get_global_feed(1, 20) is None
+    assert cache_helper.get_global_feed(2, 10) is None
+
+def test_new_post_keeps_unrelated_feeds_warm(cache_helper):
+    """Test hit rate: a post only invalidates its author's followers, not every feed"""
+    users = range(1, 51)
+    for user_id in users:
+        cache_helper.cache_user_feed(user_id, 1, 20, feed_page("warm"))
+    
+    # New post from an author followed by 5 of the 50 users
+    cache_helper.invalidate_user_feeds([1, 2, 3, 4, 5])
+    
+    hits = sum(cache_helper.get_user_feed(user_id, 1, 20) is not None for user_id in users)
+    assert hits / len(users) == 0.9
+
+def test_refilled_page_is_fresh_after_invalidation(cache_helper):
+    """Test staleness: after invalidation the next write is what readers see"""
+    cache_helper.cache_global_feed(1, 20, feed_page("before"))
+    cache_helper.invalidate_global_feed()
+    cache_helper.cache_global_feed(1, 20, feed_page("after"))
+    
+    assert cache_helper.get_global_feed(1, 20)["posts"][0]["content"] == "after"
+
+def test_invalidate_tag_deletes_only_tagged_entries(cache_helper):
+    """Test that liking a post drops just the pages that show it"""
+    cache_helper.cache_global_feed(1, 20, feed_page("page 1"), tags=["post:1", "post:2"])
+    cache_helper.cache_global_feed(2, 20, feed_page("page 2"), tags=["post:3"])
+    cache_helper.cache_user_feed(7, 1, 20, feed_page("follower"), tags=["post:2"])
+    
+    deleted = cache_helper.invalidate_post(2)
+    
+    assert deleted == 2
+    assert cache_helper.get_global_feed(1, 20) is None
+    assert cache_helper.get_user_feed(7, 1, 20) is None
+    assert cache_helper.get_global_feed(2, 20) is not None
+    assert not cache_helper.redis_client.exists("tag:post:2")
+
+def test_delete_pattern_scans_instead_of_keys(cache_helper, monkeypatch):
+    """Test that pattern deletes never issue the blocking KEYS command"""
+    def forbidden(*args, **kwargs):
+        raise AssertionError("KEYS must not be used")
+    
+    for i in range(1200):
+        cache_helper.redis_client.set(f"user_posts:{i}", "x")
+    cache_helper.redis_client.set("reel_feed:v0:1:20", "x")
+    monkeypatch.setattr(cache_helper.redis_client, "keys", forbidden)
+    
+    assert cache_helper.delete_pattern("user_posts:*") == 1200
+    assert cache_helper.redis_client.dbsize() == 1
+
+def test_get_or_load_serves_repeat_reads_from_local_tier(cache_helper):
+    """Test that a warm key is answered in-process without a Redis round trip"""
+    calls = []
+    def load():
+        calls.append(1)
+        return feed_page("hot"), ["post:1"]
+    
+    key = cache_helper.global_feed_key(1, 20)
+    first = cache_helper.get_or_load(key, load)
+    with patch.object(cache_helper.redis_client, 'get', side_effect=AssertionError("Redis must not be read")):
+        second = cache_helper.get_or_load(key, load)
+    
+    assert len(calls) == 1
+    assert second == first
+
+def test_get_or_load_coalesces_concurrent_misses(cache_helper):
+    """Test single-flight: many threads missing the same key run the loader once"""
+    calls = []
+    def load():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"posts": []}, []
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache_helper.get_or_load("global_feed:v0:1:20", load)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert results == [{"posts": []}] * 8
+
+def test_get_or_load_refreshes_early_near_expiry(cache_helper):
+    """Test XFetch: an entry about to expire is rebuilt before it actually does"""
+    key = "reel_feed:v0:1:20"
+    cache_helper.get_or_load(key, lambda: ({"reels": ["old"]}, []), local=False)
+    
+    # One second left on an entry that took 30s to build
+    entry = codec.decode(cache_helper.binary_client.get(key))
+    entry.update(d=30.0, x=time.time() + 1)
+    cache_helper.binary_client.set(key, codec.encode(entry))
+    
+    with patch.object(cache_module.random, 'random', return_value=0.5):
+        value = cache_helper.get_or_load(key, lambda: ({"reels": ["new"]}, []), local=False)
+    
+    assert value == {"reels": ["new"]}
+    assert codec.decode(cache_helper.binary_client.get(key))["v"] == {"reels": ["new"]}
+
+def test_invalidation_evicts_local_tier_and_is_published(cache_helper):
+    """Test that a tag invalidation drops the local copy here and notifies other workers"""
+    pubsub = cache_helper.redis_client.pubsub()
+    pubsub.subscribe(cache_module.INVALIDATION_CHANNEL)
+    assert pubsub.get_message(timeout=1)["type"] == "subscribe"
+    key = cache_helper.global_feed_key(1, 20)
+    cache_helper.get_or_load(key, lambda: (feed_page("before"), ["post:1"]))
+    
+    cache_helper.invalidate_post(1)
+    
+    assert cache_helper.local_cache.get(key) is None
+    message = pubsub.get_message(timeout=1)
+    assert key in cache_module.json.loads(message["data"])["keys"]
+    assert cache_helper.get_or_load(key, lambda: (feed_page("after"), []))["posts"][0]["content"] == "after"
+
+def test_remote_invalidation_message_evicts_local_tier(cache_helper):
+    """Test that a message published by another worker clears this worker's copy"""
+    cache_module.local_cache.set("global_feed:v0:1:20", {"posts": []}, 10, meta=(0.0, time.time() + 60))
+    
+    cache_module._handle_invalidation({"data": '{"keys": ["global_feed:v0:1:20"], "patterns": []}'})
+    
+    assert cache_module.local_cache.get("global_feed:v0:1:20") is None
+
+@pytest.mark.asyncio
+async def test_async_mset_and_mget_round_trip_in_one_pipeline(async_cache_helper):
+    """Test that feed hydration reads and writes many keys in one round trip each"""
+    posts = {f"post:{i}": {"id": i, "created_at": datetime(2024, 1, 1)} for i in range(1, 4)}
+    
+    with patch.object(async_cache_helper.redis_client, 'setex', side_effect=AssertionError("must be pipelined")):
+        assert await async_cache_helper.mset(posts, ttl=60, tags={"post:1": ["post:1"]})
+    values = await async_cache_helper.mget(["post:1", "post:4", "post:3"])
+    
+    assert [value and value["id"] for value in values] == [1, None, 3]
+    assert values[0]["created_at"] == "2024-01-01T00:00:00"
+    assert await async_cache_helper.redis_client.smembers("tag:post:1") == {b"post:1"}
+
+@pytest.mark.asyncio
+async def test_async_get_or_load_coalesces_concurrent_misses(async_cache_helper):
+    """Test that concurrent requests on the event loop share one rebuild"""
+    calls = []
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return feed_page("hot"), ["post:1"]
+    
+    key = await async_cache_helper.global_feed_key(1, 20)
+    results = await asyncio.gather(*[async_cache_helper.get_or_load(key, load) for _ in range(10)])
+    
+    assert len(calls) == 1
+    assert all(result["posts"][0]["content"] == "hot" for result in results)
+
+@pytest.mark.asyncio
+async def test_async_single_flight_holds_through_a_failed_rebuild(async_cache_helper):
+    """Test that a miss arriving while a waiter takes over a failed rebuild does not start a second one"""
+    calls, running, peak = [], [0], [0]
+    async def load():
+        calls.append(1)
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.1)
+        running[0] -= 1
+        if len(calls) == 1:
+            raise RuntimeError("database timeout")
+        return feed_page("hot"), []
+    
+    key = await async_cache_helper.global_feed_key(1, 20)
+    first = asyncio.ensure_future(async_cache_helper.get_or_load(key, load))
+    await asyncio.sleep(0.01)
+    second = asyncio.ensure_future(async_cache_helper.get_or_load(key, load))
+    await asyncio.sleep(0.15)  # first failed, second is rebuilding
+    third = await async_cache_helper.get_or_load(key, load)
+    
+    with pytest.raises(RuntimeError):
+        await first
+    assert (await second)["posts"][0]["content"] == third["posts"][0]["content"] == "hot"
+    assert len(calls) == 2 and peak[0] == 1
+    assert key not in cache_module._async_key_locks and key not in cache_module._async_key_waiters
+
+@pytest.mark.asyncio
+async def test_async_get_or_load_waits_for_another_workers_rebuild(async_cache_helper):
+    """Test that a miss on a key another process holds lock:<key> for is served that process's value"""
+    key = await async_cache_helper.global_feed_key(1, 20)
+    await async_cache_helper.redis_client.set(f"lock:{key}", "other-worker")
+    async def other_worker():
+        await asyncio.sleep(0.05)
+        entry = {"v": feed_page("theirs"), "d": 0.05, "x": time.time() + 60}
+        await async_cache_helper.redis_client.set(key, codec.encode(entry))
+    async def load():
+        raise AssertionError("rebuilt a key another worker was rebuilding")
+    
+    result, _ = await asyncio.gather(async_cache_helper.get_or_load(key, load), other_worker())
+    
+    assert result["posts"][0]["content"] == "theirs"
+
+def test_rebuild_cost_is_recorded_per_namespace(cache_helper):
+    """Test that each rebuild is timed under its namespace, not its full key"""
+    def slow_load():
+        time.sleep(0.01)
+        return feed_page("page"), []
+    
+    before = cache_module.rebuild_stats().get("user_feed", {}).get("count", 0)
+    cache_helper.get_or_load(cache_helper.user_feed_key(42, 1, 20), slow_load, local=False)
+    cache_helper.get_or_load(cache_helper.user_feed_key(43, 1, 20), slow_load, local=False)
+    
+    stats = cache_module.rebuild_stats()["user_feed"]
+    assert stats["count"] == before + 2
+    assert stats["max_ms"] >= 10
+    assert stats["avg_bytes"] > 0
+
+@pytest.mark.parametrize("serializer", ["json", "orjson", "msgpack"])
+def test_codec_round_trips_feed_pages(serializer):
+    """Test that every serializer stores datetimes as ISO 8601 and reads its own frames"""
+    page_codec = CacheCodec(serializer, "none")
+    
+    decoded = page_codec.decode(page_codec.encode(feed_page("a")))
+    
+    assert decoded["posts"][0]["created_at"] == "2024-01-01T00:00:00"
+    assert decoded["posts"][0]["content"] == "a"
+
+def test_codec_compresses_only_above_threshold():
+    """Test that small payloads skip compression and large ones shrink"""
+    page_codec = CacheCodec("msgpack", "zlib", threshold=256)
+    small = feed_page("short")
+    large = {"posts": [feed_page("x" * 50)["posts"][0] for _ in range(50)]}
+    
+    assert page_codec.encode(small)[1:2] == CacheCodec.NO_COMPRESSION
+    encoded = page_codec.encode(large)
+    assert encoded[1:2] == CacheCodec.ZLIB
+    assert len(encoded) < len(CacheCodec("msgpack", "none").encode(large)) / 4
+    assert page_codec.decode(encoded) == CacheCodec("json", "none").decode(CacheCodec("json", "none").encode(large))
+
+def test_codec_reads_legacy_json_entries():
+    """Test that values cached as plain JSON before framing are still served"""
+    assert codec.decode(b'{"posts": [], "page": 1}') == {"posts": [], "page": 1}
+
+@pytest.mark.asyncio
+async def test_rendered_response_hit_skips_build_and_honours_etag(async_cache_helper):
+    """Test that a rendered page is built once, then served as raw bytes or a 304"""
+    builds = []
+    async def build():
+        builds.append(1)
+        return PostFeedResponse(posts=[], total=0, page=1, size=20, has_next=False)
+    
+    etag, body = await get_or_render(async_cache_helper, "global_feed:v0:1:20", build, lambda feed: [])
+    async_cache_helper.local_cache.clear()
+    assert await get_or_render(async_cache_helper, "global_feed:v0:1:20", build, lambda feed: []) == (etag, body)
+    assert len(builds) == 1
+    
+    response = rendered_response(etag, body)
+    assert response.body == body and response.headers["etag"] == etag
+    assert rendered_response(etag, body, f'W/{etag}, "other"').status_code == 304
+
+@pytest.mark.asyncio
+async def test_counter_update_drops_rendered_responses_listing_the_object():
+    """Test that a like invalidates pre-rendered bodies that froze the old count"""
+    server = fakeredis.FakeServer()
+    local = LocalCache(100, 1024 * 1024, 5.0)
+    helper = CacheHelper()
+    helper.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    helper.binary_client = fakeredis.FakeRedis(server=server)
+    helper.local_cache = local
+    async_helper = AsyncCacheHelper()
+    async_helper.redis_client = fakeredis.aioredis.FakeRedis(server=server)
+    async_helper.local_cache = local
+    
+    await async_helper.set_rendered("global_feed:v0:1:20", '"a"', b"{}", tags=["render:post:1"])
+    await async_helper.set_rendered("global_feed:v0:2:20", '"b"', b"{}", tags=["render:post:2"])
+    helper.set_counters("post", 1, like_count=5)
+    
+    assert await async_helper.get_rendered("global_feed:v0:1:20") is None
+    assert await async_helper.get_rendered("global_feed:v0:2:20") == ('"b"', b"{}")
+
+@pytest.mark.asyncio
+async def test_view_count_update_keeps_rendered_responses():
+    """Test that views, the hottest counter write, leave pre-rendered bodies (and their ETags) alone"""
+    server = fakeredis.FakeServer()
+    local = LocalCache(100, 1024 * 1024, 5.0)
+    helper = CacheHelper()
+    helper.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    helper.binary_client = fakeredis.FakeRedis(server=server)
+    helper.local_cache = local
+    async_helper = AsyncCacheHelper()
+    async_helper.redis_client = fakeredis.aioredis.FakeRedis(server=server)
+    async_helper.local_cache = local
+    
+    await async_helper.set_rendered("reel_feed:v0:1:20", '"a"', b"{}", tags=["render:reel:1"])
+    with patch.object(helper, "invalidate_tag") as invalidate_tag:
+        helper.set_counters("reel", 1, view_count=100)
+    
+    invalidate_tag.assert_not_called()
+    assert helper.redis_client.hget("counters:reel:1", "view_count") == "100"
+    assert await async_helper.get_rendered("reel_feed:v0:1:20") == ('"a"', b"{}")
@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+import threading
+import time
+from app.util.executor import ServiceExecutor
+
+@pytest.fixture
+def executor():
+    executor = ServiceExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_blocking_calls_do_not_block_the_event_loop(executor):
+    """Test that a sync call runs on a pool thread while the loop keeps serving"""
+    release = threading.Event()
+    call = asyncio.ensure_future(executor.run(release.wait, 5))
+    
+    await asyncio.sleep(0.01)  # the loop is free while the call blocks
+    assert not call.done()
+    release.set()
+    
+    assert await call is True
+    assert executor.stats()["completed"] == 1
+
+@pytest.mark.asyncio
+async def test_queue_time_is_recorded_when_pool_is_saturated(executor):
+    """Test that calls beyond max_workers wait, and that the wait shows up as queue time"""
+    calls = [executor.run(time.sleep, 0.05) for _ in range(4)]
+    
+    await asyncio.gather(*calls)
+    
+    stats = executor.stats()
+    assert stats["submitted"] == stats["completed"] == 4
+    assert stats["active"] == stats["queued"] == 0
+    assert stats["queue_ms"]["max"] >= 40
+    assert stats["run_ms"]["p50"] >= 40
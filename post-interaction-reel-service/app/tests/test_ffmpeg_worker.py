@@ -0,0 +1,177 @@
+import functools
+import io
+import os
+import re
+import shutil
+import subprocess
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from PIL import Image, ImageStat
+from app.util.ffmpeg_worker import FFmpegWorker
+
+pytestmark = pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+                                reason="ffmpeg/ffprobe not installed")
+
+def make_clip(path: str, seconds: float, audio: bool = True, size: str = "360x640") -> str:
+    """Synthetic test clip generated with lavfi"""
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds}"]
+    if audio:
+        command += ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", "-shortest"]
+    subprocess.run(command + ["-c:v", "libx264", "-preset", "ultrafast", path], check=True)
+    return path
+
+@pytest.mark.parametrize("audio", [True, False])
+def test_transcode_reel_writes_all_outputs_in_one_run(tmp_path, audio):
+    """Test that one FFmpeg run yields the MP4, the thumbnail and (when present) the audio"""
+    worker = FFmpegWorker()
+    source = make_clip(str(tmp_path / "source.mp4"), 2, audio)
+    outputs = [str(tmp_path / name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3")]
+    
+    assert worker.transcode_reel(source, *outputs, worker.get_video_info(source))
+    
+    assert worker.get_video_info(outputs[0])["has_audio"] is audio
+    assert os.path.getsize(outputs[1]) > 0
+    assert os.path.exists(outputs[2]) is audio
+
+def test_thumbnail_of_clip_shorter_than_offset(tmp_path):
+    """Test that a clip shorter than the thumbnail offset still gets a thumbnail"""
+    worker = FFmpegWorker()
+    source = make_clip(str(tmp_path / "source.mp4"), 0.5)
+    outputs = [str(tmp_path / name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3")]
+    
+    assert worker.transcode_reel(source, *outputs, worker.get_video_info(source))
+    assert os.path.getsize(outputs[1]) > 0
+
+@pytest.mark.parametrize("audio", [True, False])
+def test_hls_ladder_is_encoded_in_the_same_run(tmp_path, audio):
+    """Test that the HLS ladder stops at the source size and the master playlist lists every rung"""
+    worker = FFmpegWorker()
+    source = make_clip(str(tmp_path / "source.mp4"), 2, audio, size="480x854")
+    outputs = [str(tmp_path / name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3")]
+    hls_dir = tmp_path / "hls"
+    
+    assert worker.transcode_reel(source, *outputs, worker.get_video_info(source), hls_dir=str(hls_dir))
+    
+    master = (hls_dir / "master.m3u8").read_text()
+    assert "240p/index.m3u8" in master and "480p/index.m3u8" in master
+    assert "720p" not in master
+    assert "RESOLUTION=240x" in master and "RESOLUTION=480x854" in master
+    assert ("mp4a" in master) is audio
+    for rung in ("240p", "480p"):
+        segment = (hls_dir / rung / "segment_000.ts").read_bytes()
+        # MPEG-TS: 188-byte packets, each starting with the 0x47 sync byte
+        assert segment and len(segment) % 188 == 0 and segment[::188] == b"\x47" * (len(segment) // 188)
+
+def test_thumbnail_is_the_best_keyframe_and_sprite_covers_the_clip(tmp_path):
+    """Test that a fade-in clip gets a thumbnail past its black start, plus the scrubbing sprite"""
+    worker = FFmpegWorker()
+    source = str(tmp_path / "source.mp4")
+    # 2s of black (where the fixed 1s offset lands), then picture; a keyframe every second
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", "color=black:size=360x640:rate=30:duration=2",
+                    "-f", "lavfi", "-i", "testsrc2=size=360x640:rate=30:duration=3",
+                    "-filter_complex", "[0][1]concat=n=2:v=1:a=0", "-c:v", "libx264", "-preset", "ultrafast",
+                    "-g", "30", source], check=True)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    outputs = [str(out_dir / name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3")]
+    video_info = worker.get_video_info(source)
+    
+    assert worker.transcode_reel(source, *outputs, video_info, sprite_output=str(out_dir / "sprite.jpg"))
+    
+    with Image.open(outputs[1]) as thumbnail:
+        assert thumbnail.size == (360, 640)
+        assert ImageStat.Stat(thumbnail.convert("L")).mean[0] > 40
+    assert worker.sprite_layout(str(out_dir / "sprite.jpg"), video_info) == {
+        "columns": 5, "rows": 5, "width": 160, "height": 284, "interval": 0.2
+    }
+    # The candidate frames are cleaned up
+    assert sorted(os.listdir(out_dir)) == ["sprite.jpg", "thumbnail.jpg", "video.mp4"]
+
+class CollectingStorage:
+    """S3Helper stand-in that writes the streamed upload to a local file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.deleted = []
+    
+    def upload_stream(self, stream, file_name: str, content_type: str) -> str:
+        with open(self.path, "wb") as f:
+            while chunk := stream.read(64 * 1024):
+                f.write(chunk)
+        return f"https://storage.example.com/{file_name}"
+    
+    def delete_file(self, file_url: str) -> bool:
+        self.deleted.append(file_url)
+        return True
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static files with single byte-range GETs, which FFmpeg uses to seek in MP4 like on S3"""
+    
+    def send_head(self):
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        path = self.translate_path(self.path)
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        start, end = int(match.group(1)), int(match.group(2) or size - 1)
+        with open(path, "rb") as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+        self.send_response(206)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return io.BytesIO(body)
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def http_root(tmp_path):
+    """Serve tmp_path/www over HTTP, like a presigned storage URL"""
+    root = tmp_path / "www"
+    root.mkdir()
+    handler = functools.partial(RangeRequestHandler, directory=str(root))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield root, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+def test_stream_transcode_reads_url_and_pipes_fragmented_mp4(tmp_path, http_root):
+    """Test that the source is read over HTTP and the MP4 reaches the upload without a local file"""
+    root, base_url = http_root
+    make_clip(str(root / "source.mp4"), 2)
+    worker = FFmpegWorker()
+    video_info = worker.get_video_info(f"{base_url}/source.mp4")
+    storage = CollectingStorage(str(tmp_path / "uploaded.mp4"))
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    
+    url = worker.stream_transcode_reel(f"{base_url}/source.mp4", str(out_dir / "thumbnail.jpg"),
+                                       str(out_dir / "audio.mp3"), video_info, storage)
+    
+    assert url == "https://storage.example.com/processed_video.mp4"
+    assert sorted(os.listdir(out_dir)) == ["audio.mp3", "thumbnail.jpg"]
+    with open(storage.path, "rb") as f:
+        uploaded = f.read()
+    assert b"ftyp" in uploaded[:64] and b"moov" in uploaded[:64]  # moov up front: playable while it streams
+    assert b"moof" in uploaded
+    assert worker.get_video_info(storage.path)["has_audio"] is True
+
+def test_stream_transcode_failure_deletes_partial_upload(tmp_path, http_root):
+    """Test that a failed FFmpeg run returns None and removes what was already uploaded"""
+    root, base_url = http_root
+    (root / "broken.mp4").write_bytes(b"not a video" * 100)
+    worker = FFmpegWorker()
+    storage = CollectingStorage(str(tmp_path / "uploaded.mp4"))
+    video_info = {"duration": 2.0, "width": 360, "height": 640, "has_audio": True}
+    
+    url = worker.stream_transcode_reel(f"{base_url}/broken.mp4", str(tmp_path / "thumbnail.jpg"),
+                                       str(tmp_path / "audio.mp3"), video_info, storage)
+    
+    assert url is None
+    assert storage.deleted == ["https://storage.example.com/processed_video.mp4"]
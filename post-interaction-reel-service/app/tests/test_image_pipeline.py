@@ -0,0 +1,151 @@
+import io
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+from app.config.settings import settings
+from app.util import image_pipeline
+from app.util.image_pipeline import make_variants, process_image, shutdown_image_pool
+from app.util.s3_helper import UploadTooLargeError
+from app.util.upload_helper import spool_to_file, upload_files
+
+def make_jpeg(width: int, height: int, orientation: int = 1) -> bytes:
+    exif = Image.Exif()
+    exif[0x0112] = orientation  # Orientation
+    exif[0x010F] = "TestCam"  # Make
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+class VariantStorage:
+    """S3Helper stand-in recording what was stored and deleted"""
+
+    def __init__(self, fail: str = None):
+        self.fail = fail
+        self.stored = {}
+        self.deleted = []
+
+    def upload_file(self, file_data, file_name, content_type):
+        self.stored[file_name] = (file_data, content_type)
+        return f"http://storage/{file_name}"
+
+    def upload_stream(self, stream, file_name, content_type, max_size=None):
+        if file_name == self.fail:
+            raise Exception("S3 upload error: connection reset")
+        self.stored[file_name] = (stream.read(), content_type)
+        return f"http://storage/{file_name}"
+
+    def delete_file(self, file_url):
+        self.deleted.append(file_url)
+        return True
+
+@pytest.fixture
+def image_pool():
+    shutdown_image_pool()
+    yield
+    shutdown_image_pool()
+
+def test_variants_are_resized_by_long_edge():
+    """Test that each variant fits its long edge and keeps the aspect ratio"""
+    processed = make_variants(io.BytesIO(make_jpeg(3000, 2000)), "webp", 80)
+
+    sizes = {name: Image.open(io.BytesIO(data)).size for name, data in processed["variants"].items()}
+    assert sizes == {"full": (2048, 1365), "feed": (1080, 720), "thumb": (320, 213)}
+    assert (processed["width"], processed["height"]) == (2048, 1365)
+    assert all(Image.open(io.BytesIO(data)).format == "WEBP" for data in processed["variants"].values())
+
+def test_variants_apply_orientation_strip_exif_and_never_upscale():
+    """Test that a rotated phone photo comes out upright, without EXIF, at its own size"""
+    processed = make_variants(io.BytesIO(make_jpeg(600, 400, orientation=6)), "webp", 80)
+
+    full = Image.open(io.BytesIO(processed["variants"]["full"]))
+    assert full.size == (400, 600)
+    assert "exif" not in full.info
+    assert Image.open(io.BytesIO(processed["variants"]["feed"])).size == (400, 600)
+    assert Image.open(io.BytesIO(processed["variants"]["thumb"])).size == (213, 320)
+
+def test_animated_images_get_no_variants():
+    """Test that animations are left to be stored as uploaded instead of losing their frames"""
+    buffer = io.BytesIO()
+    frames = [Image.new("RGB", (50, 50), color) for color in ("red", "blue")]
+    frames[0].save(buffer, format="WEBP", save_all=True, append_images=frames[1:])
+
+    assert make_variants(io.BytesIO(buffer.getvalue()), "webp", 80) is None
+
+@pytest.mark.asyncio
+async def test_upload_files_stores_variant_sets_for_images(image_pool):
+    """Test that images are stored as their variants only, and other media as uploaded"""
+    storage = VariantStorage()
+    files = [
+        UploadFile(io.BytesIO(make_jpeg(1600, 1200)), filename="photo.jpg",
+                   headers=Headers({"content-type": "image/jpeg"})),
+        UploadFile(io.BytesIO(b"video"), filename="clip.mp4", headers=Headers({"content-type": "video/mp4"})),
+    ]
+
+    results = await upload_files(storage, files, image_variants=True)
+
+    photo, clip = results
+    assert photo["variants"] == {
+        "full": "http://storage/photo_full.webp", "feed": "http://storage/photo_feed.webp",
+        "thumb": "http://storage/photo_thumb.webp", "format": "webp", "width": 1600, "height": 1200,
+    }
+    assert photo["url"] == "http://storage/photo_full.webp"
+    assert storage.stored["photo_feed.webp"][1] == "image/webp"
+    assert clip["variants"] is None and clip["url"] == "http://storage/clip.mp4"
+    assert sorted(storage.stored) == ["clip.mp4", "photo_feed.webp", "photo_full.webp", "photo_thumb.webp"]
+
+@pytest.mark.asyncio
+async def test_upload_files_rolls_back_every_variant(image_pool):
+    """Test that a failed file deletes all variants of the images already stored"""
+    storage = VariantStorage(fail="clip.mp4")
+    files = [
+        UploadFile(io.BytesIO(make_jpeg(400, 300)), filename="photo.jpg",
+                   headers=Headers({"content-type": "image/jpeg"})),
+        UploadFile(io.BytesIO(b"video"), filename="clip.mp4", headers=Headers({"content-type": "video/mp4"})),
+    ]
+
+    results = await upload_files(storage, files, concurrency=1, image_variants=True)
+
+    assert [result["status"] for result in results] == ["rolled_back", "failed"]
+    assert sorted(storage.deleted) == [
+        "http://storage/photo_feed.webp", "http://storage/photo_full.webp", "http://storage/photo_thumb.webp",
+    ]
+
+@pytest.mark.asyncio
+async def test_oversized_image_is_refused_before_it_is_read(image_pool, monkeypatch):
+    """Test that images past IMAGE_MAX_SIZE never reach memory, the pool or storage"""
+    monkeypatch.setattr(settings, "IMAGE_MAX_SIZE", 1024)
+    storage = VariantStorage()
+    stream = io.BytesIO(make_jpeg(1600, 1200))
+    files = [UploadFile(stream, size=len(stream.getvalue()), filename="photo.jpg",
+                        headers=Headers({"content-type": "image/jpeg"}))]
+
+    results = await upload_files(storage, files, image_variants=True)
+
+    assert results[0]["status"] == "too_large"
+    assert stream.tell() == 0
+    assert storage.stored == {}
+
+@pytest.mark.asyncio
+async def test_output_format_is_resolved_once_per_pool(image_pool, tmp_path, monkeypatch):
+    """Test that the format check (and its AVIF fallback warning) runs when the pool starts, not per image"""
+    calls = []
+    monkeypatch.setattr(image_pipeline, "image_format", lambda: calls.append(1) or "webp")
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(make_jpeg(400, 300))
+
+    results = [await process_image(str(path)) for _ in range(3)]
+
+    assert [result["format"] for result in results] == ["webp"] * 3
+    assert len(calls) == 1
+
+def test_spool_stops_at_the_limit_and_leaves_no_file(tmp_path, monkeypatch):
+    """Test that an upload of unknown size is cut off while spooling and its temp file removed"""
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+    with pytest.raises(UploadTooLargeError):
+        spool_to_file(io.BytesIO(bytes(3 * 1024 * 1024)), 2 * 1024 * 1024)
+    assert list(tmp_path.iterdir()) == []
+
+    path = spool_to_file(io.BytesIO(b"image"), 1024)
+    assert open(path, "rb").read() == b"image"
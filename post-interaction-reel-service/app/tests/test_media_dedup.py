@@ -0,0 +1,84 @@
+import io
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.model import MediaBlob
+from app.util.dedup_index import DedupIndex
+from app.util.s3_helper import S3Helper
+
+class MemoryS3Client:
+    """boto3 S3 client stand-in keeping small objects in a dict"""
+    
+    def __init__(self):
+        self.objects = {}
+    
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = bytes(Body)
+    
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'media.db'}", connect_args={"check_same_thread": False})
+    MediaBlob.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def s3_helper(session_factory):
+    helper = S3Helper.__new__(S3Helper)
+    helper.s3_client = MemoryS3Client()
+    helper.bucket_name = "test-bucket"
+    helper.use_minio = False
+    helper.dedup_index = DedupIndex(session_factory)
+    return helper
+
+def ref_count(session_factory, url: str) -> int:
+    db = session_factory()
+    try:
+        blob = db.query(MediaBlob).filter(MediaBlob.object_key == url.rsplit("/", 1)[-1]).first()
+        return blob.ref_count if blob else 0
+    finally:
+        db.close()
+
+def test_identical_uploads_share_one_object(s3_helper, session_factory):
+    """Test that re-uploaded bytes resolve to the stored object and the duplicate is dropped"""
+    first = s3_helper.upload_stream(io.BytesIO(b"same image"), "a.jpg", "image/jpeg")
+    second = s3_helper.upload_stream(io.BytesIO(b"same image"), "repost.jpg", "image/jpeg")
+    other = s3_helper.upload_stream(io.BytesIO(b"other image"), "b.jpg", "image/jpeg")
+    
+    assert first == second != other
+    assert sorted(s3_helper.s3_client.objects.values()) == [b"other image", b"same image"]
+    assert ref_count(session_factory, first) == 2
+
+def test_delete_removes_object_with_its_last_reference(s3_helper, session_factory):
+    """Test that delete_file keeps a shared object until every upload of it is deleted"""
+    url = s3_helper.upload_stream(io.BytesIO(b"clip"), "a.mp4", "video/mp4")
+    s3_helper.upload_stream(io.BytesIO(b"clip"), "b.mp4", "video/mp4")
+    
+    assert s3_helper.delete_file(url)
+    assert list(s3_helper.s3_client.objects.values()) == [b"clip"]
+    assert ref_count(session_factory, url) == 1
+    
+    assert s3_helper.delete_file(url)
+    assert s3_helper.s3_client.objects == {}
+    assert ref_count(session_factory, url) == 0
+
+def test_objects_outside_the_index_are_deleted_directly(s3_helper):
+    """Test that objects stored before deduplication (or PUT directly) are still deletable"""
+    url = s3_helper.upload_object(io.BytesIO(b"legacy"), "legacy.jpg", "image/jpeg")
+    
+    assert s3_helper.delete_file(url)
+    assert s3_helper.s3_client.objects == {}
+
+def test_concurrent_uploads_of_the_same_bytes_agree_on_one_object(s3_helper, session_factory):
+    """Test that racing uploads of identical bytes end up referencing a single stored object"""
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        urls = list(pool.map(lambda i: s3_helper.upload_stream(io.BytesIO(b"viral"), f"{i}.jpg", "image/jpeg"),
+                             range(8)))
+    
+    assert len(set(urls)) == 1
+    assert list(s3_helper.s3_client.objects.values()) == [b"viral"]
+    assert ref_count(session_factory, urls[0]) == 8
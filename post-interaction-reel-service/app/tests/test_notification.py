@@ -202,5 +202,38 @@ def test_send_notification_error_handling(notification_service, mock_db):
         
         assert result is False
 
-
-
+def test_get_user_notifications_cursor_pages_are_stable():
+    """Test that cursor pages neither skip nor repeat rows when new ones arrive"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.model.notification_model import Notification
+    from app.repository.notification_repository import NotificationRepository
+    from app.util.pagination import decode_cursor, next_cursor
+    
+    engine = create_engine("sqlite://")
+    Notification.__table__.create(bind=engine)
+    db = sessionmaker(bind=engine)()
+    
+    base_time = datetime(2024, 1, 1)
+    for i in range(25):
+        # Pairs share a timestamp so the id tie-breaker is exercised
+        db.add(Notification(id=i + 1, user_id=1, actor_id=2, type="like", message=f"n{i}",
+                            created_at=base_time + timedelta(minutes=i // 2)))
+    db.commit()
+    
+    repo = NotificationRepository(db)
+    seen = []
+    late_id = 100
+    page = repo.get_user_notifications(1, limit=10)
+    while page:
+        seen.extend(n.id for n in page)
+        # A new notification arriving mid-scroll must not shift later pages
+        late_id += 1
+        db.add(Notification(id=late_id, user_id=1, actor_id=2, type="like", message="late",
+                            created_at=base_time + timedelta(days=1)))
+        db.commit()
+        cursor = next_cursor(page, 10)
+        page = repo.get_user_notifications(1, limit=10, cursor=decode_cursor(cursor)) if cursor else []
+    
+    assert seen == list(range(25, 0, -1))
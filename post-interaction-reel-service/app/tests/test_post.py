@@ -1,9 +1,12 @@
+import fakeredis
 import pytest
+from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 from sqlalchemy.orm import Session
 from app.service.post_service import PostService
 from app.schema.post_schema import PostCreate, PostUpdate
 from app.repository.post_repository import PostRepository
+from app.util.local_cache import LocalCache
 
 @pytest.fixture
 def mock_db():
@@ -13,6 +16,65 @@ def mock_db():
 def post_service(mock_db):
     return PostService(mock_db)
 
+@pytest.fixture
+def fake_redis(post_service):
+    """Point the service's cache and timelines at one fakeredis server, with a fresh local tier"""
+    server = fakeredis.FakeServer()
+    post_service.cache_helper.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    post_service.cache_helper.binary_client = fakeredis.FakeRedis(server=server)
+    post_service.cache_helper.local_cache = LocalCache(100, 1024 * 1024, 5.0)
+    post_service.timeline_helper.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    return server
+
+@pytest.fixture
+def make_mock_posts():
+    """Factory of mock posts with ids 1.. one minute apart, newest first unless ascending"""
+    def make(count, user_ids=None, ascending=False):
+        step = timedelta(minutes=1 if ascending else -1)
+        mock_posts = []
+        for i in range(count):
+            mock_post = Mock()
+            mock_post.id = i + 1
+            mock_post.user_id = user_ids[i] if user_ids else 1
+            mock_post.content = f"Post {i + 1}"
+            mock_post.media_url = None
+            mock_post.media_variants = None
+            mock_post.type = "text"
+            mock_post.like_count = 5
+            mock_post.comment_count = 0
+            mock_post.created_at = datetime(2024, 1, 1) + step * i
+            mock_post.updated_at = mock_post.created_at
+            mock_post.liked_by_me = False
+            mock_posts.append(mock_post)
+        return mock_posts
+    return make
+
+@pytest.fixture
+def timeline_posts(post_service, fake_redis, make_mock_posts):
+    """Factory of mock posts by the given author ids, oldest first, with patches of the
+    SQL feed query and the batched hydration over them"""
+    def make(authors):
+        mock_posts = make_mock_posts(len(authors), user_ids=authors, ascending=True)
+        
+        def get_feed_posts(user_ids, skip, limit, cursor=None):
+            rows = sorted((post for post in mock_posts if post.user_id in user_ids
+                           and (cursor is None or (post.created_at, post.id) < cursor)),
+                          key=lambda post: (post.created_at, post.id), reverse=True)
+            return rows[skip if cursor is None else 0:][:limit]
+        
+        by_id = {post.id: post for post in mock_posts}
+        feed_query = patch.object(post_service.post_repo, 'get_feed_posts', side_effect=get_feed_posts)
+        hydrate = patch.object(post_service.post_repo, 'get_posts_by_ids',
+                               side_effect=lambda ids: [by_id[post_id] for post_id in ids])
+        return mock_posts, feed_query, hydrate
+    return make
+
+def fake_global_feed(mock_posts):
+    def get_global_feed(skip, limit, cursor=None):
+        rows = [post for post in mock_posts if cursor is None or (post.created_at, post.id) < cursor]
+        return rows[skip if cursor is None else 0:][:limit]
+    return get_global_feed
+
 def test_create_post(post_service, mock_db):
     """Test creating a post"""
     post_data = PostCreate(
@@ -165,5 +227,161 @@ def test_delete_post_not_found(post_service, mock_db):
         
         assert result is False
 
+def test_get_global_feed_marks_liked_by_me(post_service, mock_db, make_mock_posts):
+    """Test that the viewer's like state is filled in with one batched lookup"""
+    mock_posts = make_mock_posts(3)
+    
+    with patch.object(post_service.cache_helper, 'get_or_load', side_effect=lambda key, load, **kwargs: load()[0]), \
+         patch.object(post_service.post_repo, 'get_global_feed', return_value=mock_posts), \
+         patch.object(post_service.like_repo, 'liked_by', return_value={2}) as mock_liked_by:
+        
+        result = post_service.get_global_feed(1, 20, viewer_id=7)
+        
+        mock_liked_by.assert_called_once_with(7, post_ids=[1, 2, 3])
+        assert [post.liked_by_me for post in result.posts] == [False, True, False]
+
+def test_get_feed_hydrates_timeline_ids_in_one_query(post_service, mock_db, fake_redis, make_mock_posts):
+    """Test that the fan-out timeline feeds get_feed and is hydrated with one batched query"""
+    # A timeline that was already seeded for both authors (fan-out skips unseeded ones)
+    post_service.timeline_helper.rebuild(1, [], [2, 3])
+    
+    mock_posts = {}
+    for mock_post in make_mock_posts(5, user_ids=[3, 2, 3, 2, 3], ascending=True):
+        mock_posts[mock_post.id] = mock_post
+        post_service.timeline_helper.push_post(mock_post.id, mock_post.user_id, mock_post.created_at, [1])
+    
+    with patch.object(post_service.cache_helper, 'get_or_load', side_effect=lambda key, load, **kwargs: load()[0]), \
+         patch.object(post_service.like_repo, 'liked_by', return_value=set()), \
+         patch.object(post_service.post_repo, 'get_feed_posts') as mock_feed_query, \
+         patch.object(post_service.post_repo, 'get_posts_by_ids',
+                      side_effect=lambda ids: [mock_posts[post_id] for post_id in ids]) as mock_hydrate:
+        
+        # Only authors the user still follows are kept
+        result = post_service.get_feed(1, [2], 1, 20)
+        
+        mock_feed_query.assert_not_called()
+        mock_hydrate.assert_called_once_with([4, 2])
+        assert [post.id for post in result.posts] == [4, 2]
+
+def test_push_before_first_read_keeps_older_feed_history(post_service, mock_db, timeline_posts):
+    """Test that fan-out to a never-read timeline does not hide the posts seeded from SQL"""
+    mock_posts, feed_query, hydrate = timeline_posts([2, 2, 2, 2, 2])
+    later_post = mock_posts.pop()
+    
+    with feed_query as mock_feed_query, hydrate:
+        post_service.timeline_helper.push_post(4, 2, mock_posts[3].created_at, [7])
+        assert [post.id for post in post_service._get_timeline_posts(7, [2], 0, 20, None)] == [4, 3, 2, 1]
+        
+        # Seeded now: the next post is fanned out and served without another SQL seed
+        mock_posts.append(later_post)
+        post_service.timeline_helper.push_post(5, 2, later_post.created_at, [7])
+        assert [post.id for post in post_service._get_timeline_posts(7, [2], 0, 20, None)] == [5, 4, 3, 2, 1]
+        assert mock_feed_query.call_count == 1
+
+def test_newly_followed_author_is_backfilled_into_timeline(post_service, mock_db, timeline_posts):
+    """Test that following an author brings their older posts into an existing timeline"""
+    _, feed_query, hydrate = timeline_posts([2, 3, 2, 3])
+    
+    with feed_query, hydrate:
+        assert [post.id for post in post_service._get_timeline_posts(7, [2], 0, 20, None)] == [3, 1]
+        assert [post.id for post in post_service._get_timeline_posts(7, [2, 3], 0, 20, None)] == [4, 3, 2, 1]
+
+def test_timeline_cursor_page_ignores_offset_like_sql(post_service, mock_db, timeline_posts):
+    """Test that ?cursor=...&page=N gives the same page from the timeline as from SQL"""
+    mock_posts, feed_query, hydrate = timeline_posts([2, 2, 2, 2, 2, 2])
+    after = (mock_posts[4].created_at, mock_posts[4].id)
+    
+    with feed_query, hydrate:
+        timeline_page = post_service._get_timeline_posts(7, [2], 4, 2, after)
+        sql_page = post_service.post_repo.get_feed_posts([2], 4, 2, after)
+    
+    assert [post.id for post in timeline_page] == [post.id for post in sql_page] == [4, 3]
+
+def test_create_post_invalidates_follower_feeds(post_service, mock_db, fake_redis, make_mock_posts):
+    """Test that a follower's cached feed is rebuilt after the author posts, per follower
+    for regular authors and through one author generation for celebrities"""
+    post_service.timeline_helper.celebrity_threshold = 2
+    mock_post = make_mock_posts(1, user_ids=[2])[0]
+    
+    with patch.object(post_service, '_get_timeline_posts', return_value=[]) as mock_timeline, \
+         patch.object(post_service.timeline_helper, 'push_post'), \
+         patch.object(post_service.post_repo, 'create_post', return_value=mock_post):
+        
+        post_service.get_feed(1, [2], 1, 20)
+        post_service.get_feed(1, [2], 1, 20)
+        assert mock_timeline.call_count == 1  # second read is a cache hit
+        
+        post_service.create_post(PostCreate(content="New post"), 2, follower_ids=[1])
+        post_service.get_feed(1, [2], 1, 20)
+        assert mock_timeline.call_count == 2  # stale page was not served
+    
+    post_service.timeline_helper.redis_client.sadd(post_service.timeline_helper.CELEBRITY_KEY, 3)
+    redis_client = post_service.cache_helper.redis_client
+    with patch.object(post_service, '_get_timeline_posts', return_value=[]) as mock_timeline, \
+         patch.object(post_service.post_repo, 'create_post', return_value=mock_post):
+        
+        post_service.get_feed(5, [3], 1, 20)
+        post_service.get_feed(5, [3], 1, 20)
+        assert mock_timeline.call_count == 1
+        
+        post_service.create_post(PostCreate(content="New post"), 3, follower_ids=[5, 6])
+        post_service.get_feed(5, [3], 1, 20)
+        assert mock_timeline.call_count == 2
+        assert not redis_client.exists("cache_gen:user_feed:5", "cache_gen:user_feed:6")
+
+def test_like_keeps_cached_page_and_shows_live_count(post_service, mock_db, fake_redis, make_mock_posts):
+    """Test that a like updates the counters hash instead of evicting the feed page"""
+    with patch.object(post_service.post_repo, 'get_global_feed', return_value=make_mock_posts(3)) as mock_feed_query, \
+         patch.object(post_service.like_repo, 'is_liked', return_value=False), \
+         patch.object(post_service.like_repo, 'create_like', return_value=True), \
+         patch.object(post_service.post_repo, 'increment_like_count', return_value=6):
+        
+        post_service.get_global_feed(1, 20)
+        post_service.like_post(2, 7)
+        result = post_service.get_global_feed(1, 20)
+        
+        assert mock_feed_query.call_count == 1
+        assert [post.like_count for post in result.posts] == [5, 6, 5]
 
+def test_cached_page_backfills_missing_posts_with_one_query(post_service, mock_db, fake_redis, make_mock_posts):
+    """Test that ids whose object expired are hydrated with one IN query, the rest from MGET"""
+    mock_posts = make_mock_posts(3)
+    
+    with patch.object(post_service.post_repo, 'get_global_feed', return_value=mock_posts), \
+         patch.object(post_service.post_repo, 'get_posts_by_ids', return_value=[mock_posts[1]]) as mock_hydrate:
+        
+        post_service.get_global_feed(1, 20)
+        post_service.cache_helper.redis_client.unlink("post_obj:2")
+        result = post_service.get_global_feed(1, 20)
+        
+        mock_hydrate.assert_called_once_with([2])
+        assert [post.id for post in result.posts] == [1, 2, 3]
+        assert post_service.cache_helper.redis_client.exists("post_obj:2")
 
+def test_global_feed_cursor_pages_are_cached_per_cursor_and_size(post_service, mock_db, fake_redis, make_mock_posts):
+    """Test that cursor pages are cached under their own key and never served for another size"""
+    with patch.object(post_service.post_repo, 'get_global_feed',
+                      side_effect=fake_global_feed(make_mock_posts(6))) as mock_feed_query:
+        
+        first = post_service.get_global_feed(1, 2)
+        second = post_service.get_global_feed(1, 2, cursor=first.next_cursor)
+        cached = post_service.get_global_feed(1, 2, cursor=first.next_cursor)
+        assert cached == second
+        assert mock_feed_query.call_count == 2
+        
+        assert [post.id for post in post_service.get_global_feed(1, 3).posts] == [1, 2, 3]
+        assert [post.id for post in second.posts] == [3, 4]
+
+def test_prewarm_global_feed_fills_first_pages(post_service, mock_db, fake_redis, make_mock_posts):
+    """Test that readers scrolling the first K pages after an invalidation all hit the cache"""
+    with patch.object(post_service.post_repo, 'get_global_feed',
+                      side_effect=fake_global_feed(make_mock_posts(10))) as mock_feed_query:
+        
+        post_service.cache_helper.invalidate_global_feed()
+        assert post_service.prewarm_global_feed(pages=3, size=2) == 3
+        assert mock_feed_query.call_count == 3
+        
+        cursor = None
+        for _ in range(3):
+            cursor = post_service.get_global_feed(1, 2, cursor=cursor).next_cursor
+        assert mock_feed_query.call_count == 3
@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.model.notification_model import Notification
+from app.model.reel_model import Reel
+from app.repository.notification_repository import NotificationRepository
+from app.repository.reel_repository import ReelRepository
+
+@pytest.fixture
+def engine():
+    # posts use a PostgreSQL ARRAY column, so the plan checks run on SQLite-compatible tables
+    engine = create_engine("sqlite://")
+    Notification.__table__.create(bind=engine)
+    Reel.__table__.create(bind=engine)
+    return engine
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def query_plan(engine, run_query) -> str:
+    """Capture the SQL a repository call executes and return its EXPLAIN QUERY PLAN"""
+    captured = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+    
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run_query()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    
+    statement, parameters = captured[-1]
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+def test_notification_listing_uses_composite_index(engine, db):
+    """Test that the notification listing seeks on (user_id, created_at, id) without sorting"""
+    repo = NotificationRepository(db)
+    
+    plan = query_plan(engine, lambda: repo.get_user_notifications(1, limit=20))
+    
+    assert "ix_notifications_user_id_created_at_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_notification_cursor_page_uses_composite_index(engine, db):
+    """Test that a cursor page is an index range scan rather than an offset walk"""
+    repo = NotificationRepository(db)
+    
+    plan = query_plan(engine, lambda: repo.get_user_notifications(1, limit=20, cursor=(datetime(2024, 1, 1), 10)))
+    
+    assert "ix_notifications_user_id_created_at_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_unread_count_uses_is_read_index(engine, db):
+    """Test that the unread badge count is answered from (user_id, is_read)"""
+    repo = NotificationRepository(db)
+    
+    plan = query_plan(engine, lambda: repo.get_unread_count(1))
+    
+    assert "ix_notifications_user_id_is_read" in plan
+
+def test_reel_feed_uses_created_at_index(engine, db):
+    """Test that the global reel feed walks (created_at, id) instead of sorting the table"""
+    repo = ReelRepository(db)
+    
+    plan = query_plan(engine, lambda: repo.get_reel_feed(0, 20))
+    
+    assert "ix_reels_created_at_id" in plan
+    assert "TEMP B-TREE" not in plan
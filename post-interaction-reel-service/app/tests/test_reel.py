@@ -1,8 +1,11 @@
+from datetime import datetime
 import pytest
 from unittest.mock import Mock, patch
 from sqlalchemy.orm import Session
 from app.service.reel_service import ReelService
-from app.schema.reel_schema import ReelCreate, ReelUpdate
+from app.task.reel_task import process_reel_job
+from app.schema.reel_schema import ReelCreate, ReelUpdate, ReelUploadComplete
+from app.util.transcode_scheduler import TranscodeQueueFullError
 
 @pytest.fixture
 def mock_db():
@@ -12,56 +15,178 @@ def mock_db():
 def reel_service(mock_db):
     return ReelService(mock_db)
 
+def make_mock_reel(reel_id: int = 1, user_id: int = 1, status: str = "ready", video_url: str = "https://example.com/video.mp4"):
+    mock_reel = Mock()
+    mock_reel.id = reel_id
+    mock_reel.user_id = user_id
+    mock_reel.video_url = video_url
+    mock_reel.thumbnail_url = None
+    mock_reel.audio_url = None
+    mock_reel.hls_manifest_url = None
+    mock_reel.thumbnail_sprite = None
+    mock_reel.duration = 30
+    mock_reel.status = status
+    mock_reel.view_count = 0
+    mock_reel.like_count = 0
+    mock_reel.comment_count = 0
+    mock_reel.created_at = datetime(2024, 1, 1)
+    mock_reel.liked_by_me = False
+    return mock_reel
+
 def test_create_reel(reel_service, mock_db):
-    """Test creating a reel"""
+    """Test that creating a reel returns at once in processing state and queues the transcode"""
     reel_data = ReelCreate(
         video_url="https://example.com/video.mp4",
         duration=30
     )
     user_id = 1
     
-    # Mock FFmpeg processing
+    with patch.object(reel_service.ffmpeg_worker, 'process_reel_video') as process_reel_video, \
+         patch.object(reel_service.reel_repo, 'create_reel', return_value=make_mock_reel(status="processing")) as create_reel, \
+         patch("app.service.reel_service.check_transcode_admission"), \
+         patch("app.service.reel_service.enqueue_transcode") as enqueue_transcode:
+        
+        result = reel_service.create_reel(reel_data, user_id)
+        
+        assert result.status == "processing"
+        create_reel.assert_called_once_with(reel_data, user_id, status="processing")
+        enqueue_transcode.assert_called_once_with(1, "https://example.com/video.mp4", 30)
+        process_reel_video.assert_not_called()
+
+def test_completed_upload_session_queues_unsigned_object_url(reel_service, mock_db):
+    """Test that the queued source is the object URL, signed by the worker when the job runs"""
+    files = [{"key": "uploads/clip.mp4", "url": "unused"}]
+    
+    with patch.object(reel_service.upload_session_helper, 'complete_session', return_value=files), \
+         patch.object(reel_service.s3_helper, 'get_presigned_url') as get_presigned_url, \
+         patch.object(reel_service.reel_repo, 'create_reel', return_value=make_mock_reel(status="processing")), \
+         patch("app.service.reel_service.check_transcode_admission"), \
+         patch("app.service.reel_service.enqueue_transcode") as enqueue_transcode:
+        
+        reel_service.complete_upload_session("session", ReelUploadComplete(duration=30), 1)
+        
+        source_url = reel_service.s3_helper.object_url("uploads/clip.mp4")
+        enqueue_transcode.assert_called_once_with(1, source_url, 30)
+        assert reel_service.s3_helper.key_from_url(source_url) == "uploads/clip.mp4"
+        get_presigned_url.assert_not_called()
+
+def test_create_reel_refused_when_transcode_queue_is_full(reel_service, mock_db):
+    """Test that admission control refuses a reel before anything is stored or queued"""
+    reel_data = ReelCreate(video_url="https://example.com/video.mp4", duration=30)
+    
+    with patch("app.service.reel_service.check_transcode_admission",
+               side_effect=TranscodeQueueFullError("50 transcodes are already waiting")), \
+         patch.object(reel_service.reel_repo, 'create_reel') as create_reel, \
+         patch("app.service.reel_service.enqueue_transcode") as enqueue_transcode:
+        
+        with pytest.raises(TranscodeQueueFullError):
+            reel_service.create_reel(reel_data, 1)
+        
+        create_reel.assert_not_called()
+        enqueue_transcode.assert_not_called()
+
+def test_process_reel_marks_reel_ready(reel_service, mock_db):
+    """Test that the worker stores the transcoded outputs and lists the reel"""
     mock_video_url = "https://processed.com/video.mp4"
     mock_thumbnail_url = "https://processed.com/thumbnail.jpg"
     mock_audio_url = "https://processed.com/audio.mp3"
+    mock_manifest_url = "https://processed.com/hls/master.m3u8"
+    mock_sprite = {"url": "https://processed.com/sprite.jpg", "columns": 5, "rows": 5,
+                   "width": 160, "height": 284, "interval": 1.2}
     mock_video_info = {"duration": 30, "width": 720, "height": 1280}
     
-    mock_reel = Mock()
-    mock_reel.id = 1
-    mock_reel.user_id = user_id
-    mock_reel.video_url = mock_video_url
-    mock_reel.thumbnail_url = mock_thumbnail_url
-    mock_reel.audio_url = mock_audio_url
-    mock_reel.duration = 30
-    mock_reel.view_count = 0
-    mock_reel.like_count = 0
-    mock_reel.comment_count = 0
-    
-    with patch.object(reel_service.ffmpeg_worker, 'process_reel_video', 
-                      return_value=(mock_video_url, mock_thumbnail_url, mock_audio_url, mock_video_info)), \
-         patch.object(reel_service.reel_repo, 'create_reel', return_value=mock_reel):
+    with patch.object(reel_service.ffmpeg_worker, 'process_reel_video',
+                      return_value=(mock_video_url, mock_thumbnail_url, mock_audio_url, mock_manifest_url,
+                                    mock_sprite, mock_video_info)), \
+         patch.object(reel_service.reel_repo, 'finish_processing',
+                      return_value=make_mock_reel(video_url=mock_video_url)) as finish_processing, \
+         patch.object(reel_service.cache_helper, 'invalidate_namespaces') as invalidate_namespaces, \
+         patch.object(reel_service.cache_helper, 'invalidate_object'), \
+         patch.object(reel_service, 'prewarm_reel_feed') as prewarm_reel_feed:
         
-        result = reel_service.create_reel(reel_data, user_id)
+        result = reel_service.process_reel(1, "https://example.com/video.mp4")
         
-        assert result is not None
-        assert result.user_id == user_id
+        assert result.status == "ready"
         assert result.video_url == mock_video_url
-        assert result.duration == 30
+        finish_processing.assert_called_once_with(1, "ready", mock_video_url, mock_thumbnail_url, mock_audio_url, 30,
+                                                  hls_manifest_url=mock_manifest_url,
+                                                  thumbnail_sprite=mock_sprite)
+        invalidate_namespaces.assert_called_once_with(["reel_feed", "user_reels:1"])
+        prewarm_reel_feed.assert_called_once()
 
-def test_create_reel_processing_failed(reel_service, mock_db):
-    """Test creating a reel when FFmpeg processing fails"""
-    reel_data = ReelCreate(
-        video_url="https://example.com/video.mp4",
-        duration=30
-    )
-    user_id = 1
+def test_process_reel_reuses_transcode_of_deduplicated_source(reel_service, mock_db):
+    """Test that a repost of stored bytes reuses the earlier outputs instead of running FFmpeg"""
+    outputs = {"video_url": "https://storage/video.mp4", "thumbnail_url": "https://storage/thumbnail.jpg",
+               "audio_url": None, "hls_manifest_url": "https://storage/hls/master.m3u8", "duration": 30}
     
+    with patch.object(reel_service.s3_helper, 'key_from_url', side_effect=lambda url: url.rsplit("/", 1)[-1]), \
+         patch.object(reel_service.media_repo, 'get_transcode', return_value=outputs), \
+         patch.object(reel_service.media_repo, 'add_reference', return_value=True) as add_reference, \
+         patch.object(reel_service.ffmpeg_worker, 'process_reel_video') as process_reel_video, \
+         patch.object(reel_service.reel_repo, 'finish_processing',
+                      return_value=make_mock_reel(video_url=outputs["video_url"])) as finish_processing, \
+         patch.object(reel_service.cache_helper, 'invalidate_namespaces'), \
+         patch.object(reel_service.cache_helper, 'invalidate_object'), \
+         patch.object(reel_service, 'prewarm_reel_feed'):
+        
+        result = reel_service.process_reel(1, "https://storage/source.mp4")
+        
+        assert result.status == "ready"
+        process_reel_video.assert_not_called()
+        assert [call.args[0] for call in add_reference.call_args_list] == ["video.mp4", "thumbnail.jpg"]
+        finish_processing.assert_called_once_with(1, "ready", outputs["video_url"], outputs["thumbnail_url"], None, 30,
+                                                  hls_manifest_url=outputs["hls_manifest_url"],
+                                                  thumbnail_sprite=None)
+
+def test_create_reel_processing_failed(reel_service, mock_db):
+    """Test that a failed transcode marks the reel failed instead of listing it"""
     with patch.object(reel_service.ffmpeg_worker, 'process_reel_video', 
-                      return_value=(None, None, None, {})):
+                      return_value=(None, None, None, None, None, {})), \
+         patch.object(reel_service.reel_repo, 'finish_processing',
+                      return_value=make_mock_reel(status="failed")) as finish_processing, \
+         patch.object(reel_service.cache_helper, 'invalidate_namespaces'), \
+         patch.object(reel_service.cache_helper, 'invalidate_object'), \
+         patch.object(reel_service, 'prewarm_reel_feed') as prewarm_reel_feed:
         
-        result = reel_service.create_reel(reel_data, user_id)
+        result = reel_service.process_reel(1, "https://example.com/video.mp4")
         
-        assert result is None
+        assert result.status == "failed"
+        finish_processing.assert_called_once_with(1, "failed")
+        prewarm_reel_feed.assert_not_called()
+
+@pytest.mark.parametrize("last_attempt", [True, False])
+def test_raising_transcode_job_marks_reel_failed_on_last_attempt(mock_db, last_attempt):
+    """Test that a job failing on a DB/Redis error leaves processing only once it will not be retried"""
+    with patch("app.task.reel_task.SessionLocal", return_value=mock_db), \
+         patch.object(ReelService, 'process_reel', side_effect=Exception("connection reset")), \
+         patch("app.repository.reel_repository.ReelRepository.get_reel_by_id",
+               return_value=make_mock_reel(user_id=7, status="processing")), \
+         patch("app.repository.reel_repository.ReelRepository.finish_processing",
+               return_value=make_mock_reel(user_id=7, status="failed")) as finish_processing, \
+         patch("app.util.cache_helper.CacheHelper.invalidate_object") as invalidate_object, \
+         patch("app.util.cache_helper.CacheHelper.invalidate_namespaces") as invalidate_namespaces:
+        
+        with pytest.raises(Exception, match="connection reset"):
+            process_reel_job(1, "https://storage/source.mp4", last_attempt=last_attempt)
+        
+        mock_db.close.assert_called_once()
+        if last_attempt:
+            mock_db.rollback.assert_called_once()
+            finish_processing.assert_called_once_with(1, "failed")
+            invalidate_object.assert_called_once_with("reel", 1)
+            invalidate_namespaces.assert_called_once_with(["reel_feed", "user_reels:7"])
+        else:
+            finish_processing.assert_not_called()
+            invalidate_namespaces.assert_not_called()
+
+def test_fail_processing_keeps_a_reel_that_finished(reel_service, mock_db):
+    """Test that a job raising after it stored its result does not overwrite the final status"""
+    with patch.object(reel_service.reel_repo, 'get_reel_by_id', return_value=make_mock_reel(status="ready")), \
+         patch.object(reel_service.reel_repo, 'finish_processing') as finish_processing:
+        
+        reel_service.fail_processing(1)
+        
+        finish_processing.assert_not_called()
 
 def test_get_reel(reel_service, mock_db):
     """Test getting a reel"""
@@ -0,0 +1,194 @@
+import io
+import pytest
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import UploadFile
+from minio import Minio
+from unittest.mock import patch
+from starlette.datastructures import Headers
+from app.config.settings import settings
+from app.util import s3_helper as s3_module
+from app.util.s3_helper import S3Helper, UploadTooLargeError
+from app.util.upload_helper import upload_files
+
+MB = 1024 * 1024
+
+class ZeroStream:
+    """File-like stream of size zero bytes that never holds more than one read in memory"""
+    
+    def __init__(self, size: int):
+        self.remaining = size
+    
+    def read(self, size: int = -1) -> bytes:
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        return bytes(size)
+
+class DiscardingS3Client:
+    """boto3 S3 client stand-in that counts calls but drops the bytes (a Mock would keep every part)"""
+    
+    def __init__(self):
+        self.calls = Counter()
+    
+    def put_object(self, **kwargs):
+        self.calls["put_object"] += 1
+    
+    def create_multipart_upload(self, **kwargs):
+        self.calls["create_multipart_upload"] += 1
+        return {"UploadId": "upload-1"}
+    
+    def upload_part(self, **kwargs):
+        self.calls["upload_part"] += 1
+        return {"ETag": '"%d"' % kwargs["PartNumber"]}
+    
+    def complete_multipart_upload(self, **kwargs):
+        self.calls["complete_multipart_upload"] += 1
+    
+    def abort_multipart_upload(self, **kwargs):
+        self.calls["abort_multipart_upload"] += 1
+
+@pytest.fixture
+def s3_helper():
+    helper = S3Helper.__new__(S3Helper)
+    helper.s3_client = DiscardingS3Client()
+    helper.bucket_name = "test-bucket"
+    helper.use_minio = False
+    return helper
+
+def test_small_stream_is_sent_in_one_put(s3_helper):
+    """Test that a file smaller than one part skips the multipart round trips"""
+    url = s3_helper.upload_stream(ZeroStream(1024), "photo.jpg", "image/jpeg")
+    
+    assert url.endswith(".jpg")
+    assert s3_helper.s3_client.calls == {"put_object": 1}
+
+def test_stream_over_max_size_aborts_multipart_upload(s3_helper):
+    """Test that the size limit is enforced while streaming and the partial upload is aborted"""
+    with pytest.raises(UploadTooLargeError):
+        s3_helper.upload_stream(ZeroStream(3 * settings.UPLOAD_PART_SIZE), "clip.mp4", "video/mp4",
+                                max_size=2 * settings.UPLOAD_PART_SIZE)
+    
+    calls = s3_helper.s3_client.calls
+    assert calls["upload_part"] == 2
+    assert calls["abort_multipart_upload"] == 1
+    assert calls["complete_multipart_upload"] == 0
+
+def test_upload_directory_keeps_relative_keys(s3_helper, tmp_path):
+    """Test that a directory is uploaded under one prefix with its layout and content types"""
+    (tmp_path / "480p").mkdir()
+    (tmp_path / "master.m3u8").write_text("#EXTM3U\n480p/index.m3u8\n")
+    (tmp_path / "480p" / "index.m3u8").write_text("#EXTM3U\nsegment_000.ts\n")
+    (tmp_path / "480p" / "segment_000.ts").write_bytes(bytes(188))
+    
+    with patch.object(s3_helper.s3_client, "put_object") as put_object:
+        url = s3_helper.upload_directory(str(tmp_path), "hls/reel-1")
+    
+    assert url.endswith("/hls/reel-1")
+    uploaded = {call.kwargs["Key"]: call.kwargs["ContentType"] for call in put_object.call_args_list}
+    assert uploaded == {
+        "hls/reel-1/master.m3u8": "application/vnd.apple.mpegurl",
+        "hls/reel-1/480p/index.m3u8": "application/vnd.apple.mpegurl",
+        "hls/reel-1/480p/segment_000.ts": "video/mp2t",
+    }
+
+def test_concurrent_100mb_uploads_hold_one_part_each(s3_helper):
+    """Test memory profile: four concurrent 100MB uploads peak at a few parts, not 400MB"""
+    uploads = 4
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(max_workers=uploads) as pool:
+            urls = list(pool.map(
+                lambda i: s3_helper.upload_stream(ZeroStream(100 * MB), f"video{i}.mp4", "video/mp4", 100 * MB),
+                range(uploads)
+            ))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    assert len(urls) == uploads
+    assert s3_helper.s3_client.calls["complete_multipart_upload"] == uploads
+    # per upload: the part being sent plus the buffer filling the next one
+    assert peak < uploads * 3 * settings.UPLOAD_PART_SIZE
+
+class SlowStorage:
+    """S3Helper stand-in with a fixed upload latency that tracks peak concurrency"""
+    
+    def __init__(self, fail: str = None):
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.deleted = []
+    
+    def upload_stream(self, stream, file_name, content_type, max_size=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            if file_name == self.fail:
+                raise Exception("S3 upload error: connection reset")
+            time.sleep(0.02)
+            return f"http://storage/{file_name}"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+    
+    def delete_file(self, file_url):
+        self.deleted.append(file_url)
+        return True
+
+def make_upload(name: str) -> UploadFile:
+    return UploadFile(io.BytesIO(b"data"), size=4, filename=name, headers=Headers({"content-type": "image/jpeg"}))
+
+@pytest.mark.asyncio
+async def test_upload_files_runs_concurrently_up_to_request_cap():
+    """Test that a multi-file upload overlaps transfers but never exceeds its per-request cap"""
+    storage = SlowStorage()
+    
+    results = await upload_files(storage, [make_upload(f"{i}.jpg") for i in range(6)], concurrency=3)
+    
+    assert [result["url"] for result in results] == [f"http://storage/{i}.jpg" for i in range(6)]
+    assert all(result["status"] == "uploaded" for result in results)
+    assert storage.peak == 3
+
+@pytest.mark.asyncio
+async def test_upload_files_rolls_back_stored_files_on_failure():
+    """Test all-or-nothing: one failed file deletes the files already stored"""
+    storage = SlowStorage(fail="1.jpg")
+    
+    results = await upload_files(storage, [make_upload(f"{i}.jpg") for i in range(4)], concurrency=2)
+    
+    statuses = {result["filename"]: result["status"] for result in results}
+    assert statuses == {"0.jpg": "rolled_back", "1.jpg": "failed", "2.jpg": "skipped", "3.jpg": "skipped"}
+    assert storage.deleted == ["http://storage/0.jpg"]
+
+def test_helpers_share_one_pooled_client_without_network_calls():
+    """Test that constructing S3Helper reuses the registry client and sends no request"""
+    with patch.object(Minio, "bucket_exists") as bucket_exists:
+        first, second = S3Helper(), S3Helper()
+    
+    assert first.minio_client is second.minio_client
+    bucket_exists.assert_not_called()
+
+def test_bucket_is_checked_once_per_process(monkeypatch):
+    """Test that ensure_bucket hits storage on the first call only"""
+    monkeypatch.setattr(s3_module, "_bucket_ready", False)
+    with patch.object(Minio, "bucket_exists", return_value=True) as bucket_exists:
+        assert s3_module.ensure_bucket()
+        assert s3_module.ensure_bucket()
+    
+    bucket_exists.assert_called_once()
+
+def test_readable_url_signs_only_unsigned_urls_of_the_bucket(s3_helper):
+    """Test that FFmpeg gets a presigned GET for our objects and other URLs untouched"""
+    with patch.object(s3_helper, "get_presigned_url", return_value="https://signed") as get_presigned_url:
+        assert s3_helper.readable_url(s3_helper.object_url("hls/reel-1/clip.mp4")) == "https://signed"
+        get_presigned_url.assert_called_once_with("hls/reel-1/clip.mp4", 3600)
+        
+        assert s3_helper.readable_url("https://cdn.example.com/clip.mp4") == "https://cdn.example.com/clip.mp4"
+        signed = s3_helper.object_url("clip.mp4") + "?X-Amz-Signature=abc"
+        assert s3_helper.readable_url(signed) == signed
+        assert get_presigned_url.call_count == 1
@@ -0,0 +1,50 @@
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+from app.util import thumbnail_selector
+from app.util.thumbnail_selector import best_frame, frame_score
+
+@pytest.fixture
+def frames(tmp_path):
+    """Black, blurred and sharp versions of the same frame"""
+    sharp = Image.new("RGB", (320, 568), "white")
+    draw = ImageDraw.Draw(sharp)
+    for i in range(0, 320, 16):
+        draw.rectangle([i, 0, i + 7, 568], fill=(i % 256, 60, 200 - i % 200))
+        draw.line([0, i * 2, 320, i * 2 + 40], fill="black", width=2)
+    paths = {}
+    for name, image in (("black", Image.new("RGB", (320, 568))), ("blurred", sharp.filter(ImageFilter.GaussianBlur(8))),
+                        ("sharp", sharp)):
+        paths[name] = str(tmp_path / f"{name}.jpg")
+        image.save(paths[name], quality=90)
+    return paths
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_frame_score_prefers_detailed_sharp_frames(frames, monkeypatch, use_numpy):
+    """Test that black scores lowest and blur scores below the sharp frame, with and without NumPy"""
+    if use_numpy and thumbnail_selector.np is None:
+        pytest.skip("numpy not installed")
+    if not use_numpy:
+        monkeypatch.setattr(thumbnail_selector, "np", None)
+    
+    scores = {name: frame_score(path) for name, path in frames.items()}
+    
+    assert scores["black"] < scores["blurred"] < scores["sharp"]
+
+def test_pillow_fallback_picks_the_same_frame_as_numpy(frames, monkeypatch):
+    """Test that the Pillow path, whose sharpness runs lower, still picks the same candidate as NumPy"""
+    if thumbnail_selector.np is None:
+        pytest.skip("numpy not installed")
+    paths = [frames["black"], frames["sharp"], frames["blurred"]]
+    with_numpy = best_frame(paths)
+
+    monkeypatch.setattr(thumbnail_selector, "np", None)
+
+    assert best_frame(paths) == with_numpy == frames["sharp"]
+
+def test_best_frame_skips_unreadable_candidates(frames, tmp_path):
+    """Test that a truncated candidate is ignored instead of failing the pick"""
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"\xff\xd8\xff")
+    
+    assert best_frame([frames["black"], str(broken), frames["blurred"], frames["sharp"]]) == frames["sharp"]
+    assert best_frame([str(broken)]) is None
@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from app.util.transcode_scheduler import TranscodeQueueFullError, TranscodeScheduler
+
+@pytest.fixture
+def scheduler():
+    scheduler = TranscodeScheduler(slots=1, max_queue=3)
+    yield scheduler
+    scheduler.shutdown()
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def test_short_clips_run_first(scheduler):
+    """Test that queued jobs start shortest clip first once a slot frees up"""
+    release = threading.Event()
+    order = []
+    scheduler.submit(60, release.wait, 5)
+    wait_for(lambda: scheduler.stats()["running"] == 1)
+    
+    for duration in (45, 5, 20):
+        scheduler.submit(duration, order.append, duration)
+    release.set()
+    wait_for(lambda: scheduler.stats()["completed"] == 4)
+    
+    assert order == [5, 20, 45]
+
+def test_long_clip_ages_ahead_of_later_short_clips(scheduler, monkeypatch):
+    """Test that a long clip is not starved by short clips submitted long after it"""
+    monkeypatch.setattr("app.config.settings.settings.TRANSCODE_DURATION_WEIGHT", 0.001)
+    release = threading.Event()
+    order = []
+    scheduler.submit(60, release.wait, 5)
+    wait_for(lambda: scheduler.stats()["running"] == 1)
+    
+    scheduler.submit(60, order.append, "long")
+    time.sleep(0.1)  # longer than 60s x 0.001
+    scheduler.submit(5, order.append, "short")
+    release.set()
+    wait_for(lambda: scheduler.stats()["completed"] == 3)
+    
+    assert order == ["long", "short"]
+
+def test_admission_control_and_queue_time_metrics(scheduler):
+    """Test that jobs past max_queue are refused and that waiting shows up as queue time"""
+    release = threading.Event()
+    scheduler.submit(10, release.wait, 5)
+    wait_for(lambda: scheduler.stats()["running"] == 1)
+    for _ in range(3):
+        scheduler.submit(10, time.sleep, 0)
+    
+    assert not scheduler.has_capacity()
+    with pytest.raises(TranscodeQueueFullError):
+        scheduler.submit(10, time.sleep, 0)
+    
+    time.sleep(0.05)
+    release.set()
+    wait_for(lambda: scheduler.stats()["completed"] == 4)
+    stats = scheduler.stats()
+    assert stats["submitted"] == 4 and stats["rejected"] == 1
+    assert stats["queued"] == stats["running"] == 0
+    assert stats["queue_ms"]["max"] >= 40
+
+def test_failed_job_frees_its_slot(scheduler):
+    """Test that an exception in a job is counted and the slot keeps serving"""
+    def fail():
+        raise RuntimeError("ffmpeg crashed")
+    done = threading.Event()
+    
+    scheduler.submit(10, fail)
+    scheduler.submit(10, done.set)
+    
+    assert done.wait(5)
+    wait_for(lambda: scheduler.stats()["completed"] == 2)
+    assert scheduler.stats()["failed"] == 1
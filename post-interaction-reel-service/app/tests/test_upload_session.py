@@ -0,0 +1,88 @@
+import fakeredis
+import httpx
+import pytest
+import socket
+from minio import Minio
+from app.schema.upload_schema import UploadFileSpec
+from app.util.s3_helper import S3Helper
+from app.util.upload_session_helper import UploadSessionHelper
+
+moto_server = pytest.importorskip("moto.server")
+
+BUCKET = "upload-sessions"
+
+@pytest.fixture(scope="module")
+def storage_endpoint():
+    """Local S3-compatible server standing in for MinIO"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    yield f"127.0.0.1:{port}"
+    server.stop()
+
+@pytest.fixture
+def session_helper(storage_endpoint):
+    s3_helper = S3Helper.__new__(S3Helper)
+    s3_helper.use_minio = True
+    s3_helper.bucket_name = BUCKET
+    s3_helper.minio_client = Minio(storage_endpoint, access_key="test", secret_key="test",
+                                   secure=False, region="us-east-1")
+    if not s3_helper.minio_client.bucket_exists(BUCKET):
+        s3_helper.minio_client.make_bucket(BUCKET)
+    
+    helper = UploadSessionHelper()
+    helper.redis_client = fakeredis.FakeRedis(decode_responses=True)
+    helper.s3_helper = s3_helper
+    return helper
+
+def put(upload, body: bytes, content_type: str = None):
+    headers = {"Content-Type": content_type or upload.headers["Content-Type"]}
+    response = httpx.put(upload.upload_url, content=body, headers=headers)
+    assert response.status_code == 200
+
+def test_presigned_uploads_are_verified_and_returned_once(session_helper):
+    """Test the direct flow: PUT to the presigned URLs, then complete with a HEAD check"""
+    session = session_helper.create_session(1, "post", [
+        UploadFileSpec(filename="a.jpg", content_type="image/jpeg", size=4),
+        UploadFileSpec(filename="b.png", content_type="image/png", size=3),
+    ], ("image/", "video/"))
+    put(session.uploads[0], b"jpeg")
+    put(session.uploads[1], b"png")
+    
+    files = session_helper.complete_session(session.session_id, 1, "post")
+    
+    assert [file["url"].rsplit("/", 1)[-1] for file in files] == [upload.key for upload in session.uploads]
+    with pytest.raises(ValueError, match="not found"):
+        session_helper.complete_session(session.session_id, 1, "post")
+
+def test_completion_rejects_missing_or_mismatched_objects(session_helper):
+    """Test that size/type mismatches are deleted and reported, and the session can be retried"""
+    session = session_helper.create_session(1, "reel", [
+        UploadFileSpec(filename="clip.mp4", content_type="video/mp4", size=5),
+    ], ("video/",))
+    
+    with pytest.raises(ValueError, match="was not uploaded"):
+        session_helper.complete_session(session.session_id, 1, "reel")
+    
+    put(session.uploads[0], b"too long")
+    with pytest.raises(ValueError, match="expected 5"):
+        session_helper.complete_session(session.session_id, 1, "reel")
+    assert session_helper.s3_helper.head_file(session.uploads[0].key) is None
+    
+    put(session.uploads[0], b"video")
+    assert len(session_helper.complete_session(session.session_id, 1, "reel")) == 1
+
+def test_session_rejects_unsupported_files_and_other_users(session_helper):
+    """Test validation before any URL is signed, and that sessions are bound to their user"""
+    with pytest.raises(ValueError, match="not supported"):
+        session_helper.create_session(1, "reel", [
+            UploadFileSpec(filename="a.jpg", content_type="image/jpeg", size=4),
+        ], ("video/",))
+    
+    session = session_helper.create_session(1, "post", [
+        UploadFileSpec(filename="a.jpg", content_type="image/jpeg", size=4),
+    ], ("image/",))
+    with pytest.raises(ValueError, match="not found"):
+        session_helper.complete_session(session.session_id, 2, "post")
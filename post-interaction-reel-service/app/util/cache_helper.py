@@ -1,21 +1,170 @@
+import asyncio
 import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
 import redis
-from typing import List, Optional, Any
-from app.config.redis_config import get_redis
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Tuple
+from app.config.redis_config import get_redis, get_redis_binary, get_async_redis
 from app.config.settings import settings
+from app.util.local_cache import LocalCache
+from app.util.serializer import codec
+
+# Channel on which every process announces evicted keys to the other processes' local tiers
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+# Counters written on nearly every read (views): pre-rendered bodies keep showing the count
+# they were rendered with, at most RESPONSE_CACHE_TTL old, instead of being re-rendered per view
+LAGGING_COUNTERS = frozenset({"view_count"})
+
+# In-process tier shared by every CacheHelper of this worker
+local_cache = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_MAX_BYTES, settings.LOCAL_CACHE_TTL)
+
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "early_refreshes": 0, "coalesced": 0}
+_stats_lock = threading.Lock()
+_key_locks: Dict[str, threading.Lock] = {}
+_key_locks_guard = threading.Lock()
+_async_key_locks: Dict[str, asyncio.Lock] = {}
+# Coroutines holding or waiting on each async key lock; the lock is dropped when this reaches zero
+_async_key_waiters: Dict[str, int] = {}
+_rebuilds: Dict[str, Dict[str, float]] = {}
+_listener = None
+
+def _object_key(kind: str, object_id: int) -> str:
+    return f"{kind}_obj:{object_id}"
+
+def _counters_key(kind: str, object_id: int) -> str:
+    return f"counters:{kind}:{object_id}"
+
+def _merge_objects(object_ids: List[int], raw_objects: List[Optional[bytes]], raw_counters: List[dict]) -> Dict[int, dict]:
+    """Decode cached objects and overlay their live counters; ids without a cached object are left out"""
+    objects = {}
+    for object_id, raw, counters in zip(object_ids, raw_objects, raw_counters):
+        if not raw:
+            continue
+        obj = codec.decode(raw)
+        for field, count in (counters or {}).items():
+            obj[field.decode() if isinstance(field, bytes) else field] = int(count)
+        objects[object_id] = obj
+    return objects
+
+def _record(counter: str) -> None:
+    with _stats_lock:
+        _stats[counter] += 1
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _key_namespace(key: str) -> str:
+    """Metric label of a key: "user_feed:42:v3:1:20" -> "user_feed" """
+    namespace = key.split(":v", 1)[0]
+    return re.sub(r"(:\d+)+$", "", namespace)
+
+def _record_rebuild(key: str, seconds: float, size: int) -> None:
+    namespace = _key_namespace(key)
+    with _stats_lock:
+        rebuild = _rebuilds.setdefault(namespace, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0})
+        rebuild["count"] += 1
+        rebuild["seconds"] += seconds
+        rebuild["max_seconds"] = max(rebuild["max_seconds"], seconds)
+        rebuild["bytes"] += size
+
+def rebuild_stats() -> dict:
+    """Per-namespace cost of cache rebuilds (loader time and payload size) since process start.
+
+    Compare avg_ms with the namespace's hit rate to size its TTL: expensive, often-read
+    pages deserve longer TTLs and prewarming.
+    """
+    with _stats_lock:
+        return {
+            namespace: {
+                "count": rebuild["count"],
+                "avg_ms": rebuild["seconds"] * 1000 / rebuild["count"],
+                "max_ms": rebuild["max_seconds"] * 1000,
+                "avg_bytes": rebuild["bytes"] // rebuild["count"]
+            }
+            for namespace, rebuild in _rebuilds.items()
+        }
+
+def cache_stats() -> dict:
+    """Per-tier hit rates of get_or_load since process start"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"] + stats["early_refreshes"]
+    stats["lookups"] = lookups
+    stats["local_hit_rate"] = stats["local_hits"] / lookups if lookups else 0.0
+    stats["redis_hit_rate"] = stats["redis_hits"] / lookups if lookups else 0.0
+    stats["miss_rate"] = (stats["misses"] + stats["early_refreshes"]) / lookups if lookups else 0.0
+    stats["local"] = local_cache.usage()
+    stats["rebuilds"] = rebuild_stats()
+    return stats
+
+def _handle_invalidation(message: dict) -> None:
+    try:
+        payload = json.loads(message["data"])
+    except (TypeError, ValueError):
+        return
+    local_cache.delete(payload.get("keys", []))
+    for pattern in payload.get("patterns", []):
+        local_cache.delete_pattern(pattern)
+
+def start_invalidation_listener() -> None:
+    """Subscribe this process's local tier to evictions published by other processes"""
+    global _listener
+    if _listener is not None:
+        return
+    try:
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: _handle_invalidation})
+        _listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        # Anything cached before subscribing may have missed its eviction
+        local_cache.clear()
+    except Exception as e:
+        print(f"Cache invalidation listener error: {e}")
+
+def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is None:
+        return
+    try:
+        _listener.stop()
+    except Exception as e:
+        print(f"Cache invalidation listener error: {e}")
+    _listener = None
+    local_cache.clear()
 
 class CacheHelper:
+    # Keys unlinked per round trip by SCAN/SSCAN based invalidation
+    DELETE_BATCH_SIZE = 500
+    
     def __init__(self):
         self.redis_client = get_redis()
+        # Cached values are codec-framed bytes (msgpack/orjson, optionally compressed)
+        self.binary_client = get_redis_binary()
+        self.local_cache = local_cache
         self.default_ttl = settings.CACHE_TTL
     
-    def set_cache(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set cache value with TTL"""
+    def set_cache(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None) -> bool:
+        """Set cache value with TTL, registering the key under each tag for invalidate_tag"""
         try:
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value)
+            payload = value if isinstance(value, bytes) else codec.encode(value)
             ttl = ttl or self.default_ttl
-            self.redis_client.setex(key, ttl, value)
+            if not tags:
+                self.binary_client.setex(key, ttl, payload)
+                return True
+            
+            pipe = self.binary_client.pipeline(transaction=False)
+            pipe.setex(key, ttl, payload)
+            for tag in tags:
+                tag_key = f"tag:{tag}"
+                pipe.sadd(tag_key, key)
+                # The tag set lives as long as its newest member
+                pipe.expire(tag_key, ttl)
+            pipe.execute()
             return True
         except Exception as e:
             print(f"Cache set error: {e}")
@@ -24,81 +173,414 @@ class CacheHelper:
     def get_cache(self, key: str) -> Optional[Any]:
         """Get cache value"""
         try:
-            value = self.redis_client.get(key)
-            if value:
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value
+            return codec.decode(self.binary_client.get(key))
+        except Exception as e:
+            print(f"Cache get error: {e}")
             return None
+    
+    def get_or_load(self, key: str, loader: Callable[[], Tuple[Any, List[str]]], ttl: Optional[int] = None,
+                    local: bool = True) -> Any:
+        """Read key through the local tier and Redis, rebuilding it with loader() -> (value, tags) on a miss.
+
+        Concurrent misses for the same key are coalesced so only one caller per process (and,
+        through a short Redis lock, per cluster) runs the loader. Entries record how long they
+        took to build so a caller can refresh them shortly before expiry (XFetch) instead of
+        every worker rebuilding a hot key the moment it expires.
+        """
+        ttl = ttl or self.default_ttl
+        if local:
+            hit = self.local_cache.get(key)
+            if hit is not None:
+                value, (delta, expires_at) = hit
+                if not self._should_refresh_early(delta, expires_at):
+                    _record("local_hits")
+                    return value
+        
+        try:
+            raw = self.binary_client.get(key)
         except Exception as e:
             print(f"Cache get error: {e}")
+            _record("misses")
+            return loader()[0]
+        
+        stale = self._decode_entry(raw)
+        if stale is not None:
+            if not self._should_refresh_early(stale["d"], stale["x"]):
+                _record("redis_hits")
+                if local:
+                    self._set_local(key, stale, len(raw))
+                return stale["v"]
+            _record("early_refreshes")
+        else:
+            _record("misses")
+        return self._load_single_flight(key, loader, ttl, local, stale)
+    
+    def _load_single_flight(self, key: str, loader: Callable[[], Tuple[Any, List[str]]], ttl: int, local: bool,
+                            stale: Optional[dict]) -> Any:
+        """Run loader for key unless another caller already is; early refreshes serve the stale value meanwhile"""
+        key_lock = _key_lock(key)
+        acquired = key_lock.acquire(blocking=False) if stale is not None else key_lock.acquire(timeout=settings.CACHE_LOCK_WAIT)
+        if not acquired and stale is not None:
+            return stale["v"]
+        
+        lock_key = f"lock:{key}"
+        token = None
+        try:
+            if stale is None:
+                # Another thread of this process may have filled the key while we waited
+                entry = self._read_entry(key)
+                if entry is not None:
+                    _record("coalesced")
+                    return entry["v"]
+            
+            token = uuid.uuid4().hex
+            if not self.redis_client.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT * 1000)):
+                token = None
+                if stale is not None:
+                    return stale["v"]
+                entry = self._wait_for_entry(key)
+                if entry is not None:
+                    _record("coalesced")
+                    return entry["v"]
+            
+            return self._rebuild(key, loader, ttl, local)
+        except redis.RedisError as e:
+            print(f"Cache lock error: {e}")
+            return self._rebuild(key, loader, ttl, local)
+        finally:
+            if token is not None:
+                try:
+                    if self.redis_client.get(lock_key) == token:
+                        self.redis_client.delete(lock_key)
+                except Exception as e:
+                    print(f"Cache lock error: {e}")
+            if acquired:
+                key_lock.release()
+                with _key_locks_guard:
+                    if not key_lock.locked():
+                        _key_locks.pop(key, None)
+    
+    def _rebuild(self, key: str, loader: Callable[[], Tuple[Any, List[str]]], ttl: int, local: bool) -> Any:
+        start = time.perf_counter()
+        value, tags = loader()
+        entry = {"v": value, "d": time.perf_counter() - start, "x": time.time() + ttl}
+        payload = codec.encode(entry)
+        _record_rebuild(key, entry["d"], len(payload))
+        # Only values that also reached Redis go local: their evictions are published through it
+        if self.set_cache(key, payload, ttl, tags) and local:
+            self._set_local(key, entry, len(payload))
+        return value
+    
+    def _read_entry(self, key: str) -> Optional[dict]:
+        hit = self.local_cache.get(key)
+        if hit is not None:
+            return {"v": hit[0]}
+        return self._decode_entry(self.binary_client.get(key))
+    
+    def _wait_for_entry(self, key: str) -> Optional[dict]:
+        """Poll Redis while another process rebuilds key, up to CACHE_LOCK_WAIT seconds"""
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+            entry = self._decode_entry(self.binary_client.get(key))
+            if entry is not None:
+                return entry
+        return None
+    
+    def _set_local(self, key: str, entry: dict, size: int) -> None:
+        self.local_cache.set(key, entry["v"], size, ttl=entry["x"] - time.time(), meta=(entry["d"], entry["x"]))
+    
+    @staticmethod
+    def _decode_entry(raw: Optional[bytes]) -> Optional[dict]:
+        if not raw:
             return None
+        try:
+            entry = codec.decode(raw)
+        except Exception:
+            return None
+        return entry if isinstance(entry, dict) and {"v", "d", "x"} <= entry.keys() else None
+    
+    @staticmethod
+    def _should_refresh_early(delta: float, expires_at: float) -> bool:
+        """XFetch: refresh ahead of expiry with a probability that grows as expiry nears"""
+        beta = settings.CACHE_EARLY_REFRESH_BETA
+        return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+    
+    def _evict_local(self, keys: Optional[List[str]] = None, patterns: Optional[List[str]] = None) -> None:
+        """Drop keys from this process's local tier and tell the other processes to do the same"""
+        keys = keys or []
+        patterns = patterns or []
+        self.local_cache.delete(keys)
+        for pattern in patterns:
+            self.local_cache.delete_pattern(pattern)
+        try:
+            self.redis_client.publish(INVALIDATION_CHANNEL, json.dumps({"keys": keys, "patterns": patterns}))
+        except Exception as e:
+            print(f"Cache publish error: {e}")
     
     def delete_cache(self, key: str) -> bool:
         """Delete cache key"""
         try:
             self.redis_client.delete(key)
+            self._evict_local([key])
             return True
         except Exception as e:
             print(f"Cache delete error: {e}")
             return False
     
+    def _unlink_batched(self, keys) -> int:
+        """UNLINK keys from an iterator in fixed-size batches (memory is freed off the main thread)"""
+        deleted = 0
+        batch = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= self.DELETE_BATCH_SIZE:
+                deleted += self.redis_client.unlink(*batch)
+                self._evict_local(batch)
+                batch = []
+        if batch:
+            deleted += self.redis_client.unlink(*batch)
+            self._evict_local(batch)
+        return deleted
+    
     def delete_pattern(self, pattern: str) -> int:
-        """Delete all keys matching pattern"""
+        """Delete all keys matching pattern.
+
+        Uses incremental SCAN instead of KEYS so Redis is never blocked for the whole
+        keyspace; prefer invalidate_tag, which touches only the tagged keys.
+        """
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            self._evict_local(patterns=[pattern])
+            return self._unlink_batched(self.redis_client.scan_iter(match=pattern, count=1000))
         except Exception as e:
             print(f"Cache pattern delete error: {e}")
             return 0
     
-    def cache_user_feed(self, user_id: int, posts: List[dict], ttl: Optional[int] = None) -> bool:
-        """Cache user's personalized feed"""
-        key = f"user_feed:{user_id}"
-        return self.set_cache(key, posts, ttl)
+    def invalidate_tag(self, tag: str) -> int:
+        """Delete every entry registered under tag (e.g. "post:42"), then the tag set itself"""
+        tag_key = f"tag:{tag}"
+        try:
+            deleted = self._unlink_batched(self.redis_client.sscan_iter(tag_key, count=self.DELETE_BATCH_SIZE))
+            self.redis_client.unlink(tag_key)
+            return deleted
+        except Exception as e:
+            print(f"Cache tag invalidate error: {e}")
+            return 0
+    
+    def _generation(self, namespace: str) -> int:
+        """Current generation of a cache namespace (0 until first invalidation)"""
+        gen_key = f"cache_gen:{namespace}"
+        hit = self.local_cache.get(gen_key)
+        if hit is not None:
+            return hit[0]
+        try:
+            value = self.redis_client.get(gen_key)
+            generation = int(value) if value else 0
+            self.local_cache.set(gen_key, generation, len(gen_key))
+            return generation
+        except Exception as e:
+            print(f"Cache generation error: {e}")
+            return 0
+    
+    def _generations(self, namespaces: List[str]) -> List[int]:
+        """_generation of several namespaces, with one MGET for those not in the local tier"""
+        gen_keys = [f"cache_gen:{namespace}" for namespace in namespaces]
+        generations = {}
+        for gen_key in gen_keys:
+            hit = self.local_cache.get(gen_key)
+            if hit is not None:
+                generations[gen_key] = hit[0]
+        missing = [gen_key for gen_key in gen_keys if gen_key not in generations]
+        if missing:
+            try:
+                for gen_key, value in zip(missing, self.redis_client.mget(missing)):
+                    generations[gen_key] = int(value) if value else 0
+                    self.local_cache.set(gen_key, generations[gen_key], len(gen_key))
+            except Exception as e:
+                print(f"Cache generation error: {e}")
+        return [generations.get(gen_key, 0) for gen_key in gen_keys]
+    
+    def versioned_key(self, namespace: str, *parts: Any) -> str:
+        """Build a key inside the namespace's current generation"""
+        suffix = ":".join(str(part) for part in parts)
+        return f"{namespace}:v{self._generation(namespace)}:{suffix}"
+    
+    def invalidate_namespace(self, namespace: str) -> bool:
+        """Invalidate every key of a namespace in O(1) by moving to a new generation.
+
+        Entries of the old generation are never read again and expire through their TTL.
+        """
+        try:
+            self.redis_client.incr(f"cache_gen:{namespace}")
+            self._evict_local([f"cache_gen:{namespace}"])
+            return True
+        except Exception as e:
+            print(f"Cache invalidate error: {e}")
+            return False
     
-    def get_user_feed(self, user_id: int) -> Optional[List[dict]]:
-        """Get user's cached feed"""
-        key = f"user_feed:{user_id}"
+    def invalidate_namespaces(self, namespaces: List[str]) -> bool:
+        """Invalidate several namespaces in one round trip"""
+        if not namespaces:
+            return True
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for namespace in namespaces:
+                pipe.incr(f"cache_gen:{namespace}")
+            pipe.execute()
+            self._evict_local([f"cache_gen:{namespace}" for namespace in namespaces])
+            return True
+        except Exception as e:
+            print(f"Cache invalidate error: {e}")
+            return False
+    
+    def user_feed_key(self, user_id: int, page_key: Any, size: int, pulled_author_ids: Optional[List[int]] = None) -> str:
+        """Key of one page of user's personalized feed; page_key is the cursor, or the page number without one.
+
+        pulled_author_ids are followed authors whose posts are pulled on read: their posts bump
+        author_posts:<id> instead of every follower's user_feed generation, so those
+        generations are part of the key (they only grow, so their sum changes on every post).
+        """
+        key = self.versioned_key(f"user_feed:{user_id}", page_key, size)
+        if not pulled_author_ids:
+            return key
+        generations = self._generations([f"author_posts:{author_id}" for author_id in sorted(pulled_author_ids)])
+        return f"{key}:a{sum(generations)}"
+    
+    def global_feed_key(self, page_key: Any, size: int) -> str:
+        """Key of one page of the global feed; page_key is the cursor, or the page number without one"""
+        return self.versioned_key("global_feed", page_key, size)
+    
+    def reel_feed_key(self, page_key: Any, size: int) -> str:
+        """Key of one page of the reel feed; page_key is the cursor, or the page number without one"""
+        return self.versioned_key("reel_feed", page_key, size)
+    
+    def cache_user_feed(self, user_id: int, page_key: Any, size: int, feed: dict, ttl: Optional[int] = None,
+                        tags: Optional[List[str]] = None) -> bool:
+        """Cache one page of user's personalized feed"""
+        key = self.user_feed_key(user_id, page_key, size)
+        return self.set_cache(key, feed, ttl, tags)
+    
+    def get_user_feed(self, user_id: int, page_key: Any, size: int) -> Optional[dict]:
+        """Get one cached page of user's feed"""
+        key = self.user_feed_key(user_id, page_key, size)
         return self.get_cache(key)
     
-    def cache_global_feed(self, posts: List[dict], ttl: Optional[int] = None) -> bool:
-        """Cache global feed"""
-        key = "global_feed"
-        return self.set_cache(key, posts, ttl)
+    def cache_global_feed(self, page_key: Any, size: int, feed: dict, ttl: Optional[int] = None,
+                          tags: Optional[List[str]] = None) -> bool:
+        """Cache one page of the global feed"""
+        key = self.global_feed_key(page_key, size)
+        return self.set_cache(key, feed, ttl, tags)
     
-    def get_global_feed(self) -> Optional[List[dict]]:
-        """Get cached global feed"""
-        key = "global_feed"
+    def get_global_feed(self, page_key: Any, size: int) -> Optional[dict]:
+        """Get one cached page of the global feed"""
+        key = self.global_feed_key(page_key, size)
         return self.get_cache(key)
     
-    def cache_reel_feed(self, reels: List[dict], ttl: Optional[int] = None) -> bool:
-        """Cache reel feed"""
-        key = "reel_feed"
-        return self.set_cache(key, reels, ttl)
+    def cache_reel_feed(self, page_key: Any, size: int, feed: dict, ttl: Optional[int] = None,
+                        tags: Optional[List[str]] = None) -> bool:
+        """Cache one page of the reel feed"""
+        key = self.reel_feed_key(page_key, size)
+        return self.set_cache(key, feed, ttl, tags)
     
-    def get_reel_feed(self) -> Optional[List[dict]]:
-        """Get cached reel feed"""
-        key = "reel_feed"
+    def get_reel_feed(self, page_key: Any, size: int) -> Optional[dict]:
+        """Get one cached page of the reel feed"""
+        key = self.reel_feed_key(page_key, size)
         return self.get_cache(key)
     
     def invalidate_user_feed(self, user_id: int) -> bool:
-        """Invalidate user's feed cache"""
-        key = f"user_feed:{user_id}"
-        return self.delete_cache(key)
+        """Invalidate every cached page of user's feed"""
+        return self.invalidate_namespace(f"user_feed:{user_id}")
+    
+    def invalidate_user_feeds(self, user_ids: List[int]) -> bool:
+        """Invalidate the feeds of many users (e.g. all followers of a new post's author)"""
+        return self.invalidate_namespaces([f"user_feed:{user_id}" for user_id in user_ids])
     
     def invalidate_global_feed(self) -> bool:
-        """Invalidate global feed cache"""
-        key = "global_feed"
-        return self.delete_cache(key)
+        """Invalidate every cached page of the global feed"""
+        return self.invalidate_namespace("global_feed")
     
     def invalidate_reel_feed(self) -> bool:
-        """Invalidate reel feed cache"""
-        key = "reel_feed"
-        return self.delete_cache(key)
+        """Invalidate every cached page of the reel feed"""
+        return self.invalidate_namespace("reel_feed")
+    
+    def invalidate_user_posts(self, user_id: int) -> bool:
+        """Invalidate every cached page of user's own posts"""
+        return self.invalidate_namespace(f"user_posts:{user_id}")
+    
+    def invalidate_post(self, post_id: int) -> int:
+        """Drop every cached page that lists post (e.g. after it was deleted)"""
+        return self.invalidate_tag(f"post:{post_id}")
+    
+    def invalidate_reel(self, reel_id: int) -> int:
+        """Drop every cached page that lists reel (e.g. after it was deleted)"""
+        return self.invalidate_tag(f"reel:{reel_id}")
+    
+    def invalidate_user_reels(self, user_id: int) -> bool:
+        """Invalidate every cached page of user's own reels"""
+        return self.invalidate_namespace(f"user_reels:{user_id}")
+    
+    def get_objects(self, kind: str, object_ids: List[int]) -> Dict[int, dict]:
+        """MGET cached objects (e.g. kind="post") with their counters hashes in one pipelined round trip"""
+        if not object_ids:
+            return {}
+        try:
+            pipe = self.binary_client.pipeline(transaction=False)
+            pipe.mget([_object_key(kind, object_id) for object_id in object_ids])
+            for object_id in object_ids:
+                pipe.hgetall(_counters_key(kind, object_id))
+            results = pipe.execute()
+            return _merge_objects(object_ids, results[0], results[1:])
+        except Exception as e:
+            print(f"Cache get objects error: {e}")
+            return {}
+    
+    def cache_objects(self, kind: str, objects: List[dict], counter_fields: Tuple[str, ...],
+                      ttl: Optional[int] = None) -> bool:
+        """Cache objects individually; their counter_fields also seed the live counters hash"""
+        if not objects:
+            return True
+        ttl = ttl or self.default_ttl
+        try:
+            pipe = self.binary_client.pipeline(transaction=False)
+            for obj in objects:
+                pipe.setex(_object_key(kind, obj["id"]), ttl, codec.encode(obj))
+                counters_key = _counters_key(kind, obj["id"])
+                pipe.hset(counters_key, mapping={field: obj[field] for field in counter_fields})
+                pipe.expire(counters_key, ttl)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache set objects error: {e}")
+            return False
+    
+    def set_counters(self, kind: str, object_id: int, **counters: Optional[int]) -> bool:
+        """Write the current counts of an object so cached pages show them without invalidation"""
+        counters = {field: count for field, count in counters.items() if count is not None}
+        if not counters:
+            return True
+        counters_key = _counters_key(kind, object_id)
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(counters_key, mapping=counters)
+            pipe.expire(counters_key, self.default_ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"Cache set counters error: {e}")
+            return False
+        # Pre-rendered responses froze the old count into their bytes
+        if not counters.keys() <= LAGGING_COUNTERS:
+            self.invalidate_tag(f"render:{kind}:{object_id}")
+        return True
+    
+    def invalidate_object(self, kind: str, object_id: int) -> bool:
+        """Drop a cached object and its counters after its content changed"""
+        try:
+            self.redis_client.unlink(_object_key(kind, object_id), _counters_key(kind, object_id))
+        except Exception as e:
+            print(f"Cache invalidate object error: {e}")
+            return False
+        self.invalidate_tag(f"render:{kind}:{object_id}")
+        return True
     
     def cache_post_stats(self, post_id: int, stats: dict, ttl: Optional[int] = None) -> bool:
         """Cache post statistics"""
@@ -148,3 +630,270 @@ class CacheHelper:
             print(f"Cache get count error: {e}")
             return 0
 
+class AsyncCacheHelper:
+    """Event-loop counterpart of CacheHelper for async endpoints.
+
+    Shares the local tier, entry format and hit-rate counters with CacheHelper, so entries
+    written by either are readable by the other. Its pool returns raw bytes, which the
+    codec decodes.
+    """
+    
+    def __init__(self):
+        self.redis_client = get_async_redis()
+        self.local_cache = local_cache
+        self.default_ttl = settings.CACHE_TTL
+    
+    async def set_cache(self, key: str, value: Any, ttl: Optional[int] = None, tags: Optional[List[str]] = None) -> bool:
+        """Set cache value with TTL, registering the key under each tag"""
+        return await self.mset({key: value}, ttl, {key: tags} if tags else None)
+    
+    async def get_cache(self, key: str) -> Optional[Any]:
+        """Get cache value"""
+        return (await self.mget([key]))[0]
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get many cache values in one round trip; missing keys come back as None"""
+        if not keys:
+            return []
+        try:
+            values = await self.redis_client.mget(keys)
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return [None] * len(keys)
+        return [codec.decode(value) for value in values]
+    
+    async def mset(self, values: Dict[str, Any], ttl: Optional[int] = None,
+                   tags: Optional[Dict[str, List[str]]] = None) -> bool:
+        """Set many cache values (and their tags) with TTL in one pipelined round trip"""
+        if not values:
+            return True
+        ttl = ttl or self.default_ttl
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.setex(key, ttl, value if isinstance(value, bytes) else codec.encode(value))
+            for key, key_tags in (tags or {}).items():
+                for tag in key_tags:
+                    pipe.sadd(f"tag:{tag}", key)
+                    pipe.expire(f"tag:{tag}", ttl)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache set error: {e}")
+            return False
+    
+    async def get_objects(self, kind: str, object_ids: List[int]) -> Dict[int, dict]:
+        """MGET cached objects with their counters hashes in one pipelined round trip"""
+        if not object_ids:
+            return {}
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.mget([_object_key(kind, object_id) for object_id in object_ids])
+            for object_id in object_ids:
+                pipe.hgetall(_counters_key(kind, object_id))
+            results = await pipe.execute()
+            return _merge_objects(object_ids, results[0], results[1:])
+        except Exception as e:
+            print(f"Cache get objects error: {e}")
+            return {}
+    
+    async def cache_objects(self, kind: str, objects: List[dict], counter_fields: Tuple[str, ...],
+                            ttl: Optional[int] = None) -> bool:
+        """Cache objects individually; their counter_fields also seed the live counters hash"""
+        if not objects:
+            return True
+        ttl = ttl or self.default_ttl
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for obj in objects:
+                pipe.setex(_object_key(kind, obj["id"]), ttl, codec.encode(obj))
+                counters_key = _counters_key(kind, obj["id"])
+                pipe.hset(counters_key, mapping={field: obj[field] for field in counter_fields})
+                pipe.expire(counters_key, ttl)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache set objects error: {e}")
+            return False
+    
+    async def get_rendered(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """(etag, body) of the response pre-rendered for key, from the local tier or Redis"""
+        rendered_key = f"rendered:{key}"
+        hit = self.local_cache.get(rendered_key)
+        if hit is not None:
+            _record("local_hits")
+            return hit[0]
+        try:
+            raw = await self.redis_client.get(rendered_key)
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return None
+        if not raw:
+            _record("misses")
+            return None
+        _record("redis_hits")
+        etag, body = raw.split(b"\n", 1)
+        rendered = (etag.decode(), body)
+        self.local_cache.set(rendered_key, rendered, len(raw))
+        return rendered
+    
+    async def set_rendered(self, key: str, etag: str, body: bytes, ttl: Optional[int] = None,
+                           tags: Optional[List[str]] = None) -> bool:
+        """Store a pre-rendered response body and its ETag for key.
+
+        Use "render:{kind}:{id}" tags: set_counters and invalidate_object drop those bodies.
+        """
+        rendered_key = f"rendered:{key}"
+        if not await self.set_cache(rendered_key, etag.encode() + b"\n" + body, ttl, tags):
+            return False
+        self.local_cache.set(rendered_key, (etag, body), len(body), ttl=ttl)
+        return True
+    
+    async def delete_cache(self, key: str) -> bool:
+        """Delete cache key"""
+        try:
+            await self.redis_client.delete(key)
+            self.local_cache.delete([key])
+            await self.redis_client.publish(INVALIDATION_CHANNEL, json.dumps({"keys": [key], "patterns": []}))
+            return True
+        except Exception as e:
+            print(f"Cache delete error: {e}")
+            return False
+    
+    async def _generation(self, namespace: str) -> int:
+        """Current generation of a cache namespace (0 until first invalidation)"""
+        gen_key = f"cache_gen:{namespace}"
+        hit = self.local_cache.get(gen_key)
+        if hit is not None:
+            return hit[0]
+        try:
+            value = await self.redis_client.get(gen_key)
+            generation = int(value) if value else 0
+            self.local_cache.set(gen_key, generation, len(gen_key))
+            return generation
+        except Exception as e:
+            print(f"Cache generation error: {e}")
+            return 0
+    
+    async def versioned_key(self, namespace: str, *parts: Any) -> str:
+        """Build a key inside the namespace's current generation"""
+        suffix = ":".join(str(part) for part in parts)
+        return f"{namespace}:v{await self._generation(namespace)}:{suffix}"
+    
+    async def user_feed_key(self, user_id: int, page_key: Any, size: int) -> str:
+        """Key of one page of user's personalized feed"""
+        return await self.versioned_key(f"user_feed:{user_id}", page_key, size)
+    
+    async def global_feed_key(self, page_key: Any, size: int) -> str:
+        """Key of one page of the global feed"""
+        return await self.versioned_key("global_feed", page_key, size)
+    
+    async def reel_feed_key(self, page_key: Any, size: int) -> str:
+        """Key of one page of the reel feed"""
+        return await self.versioned_key("reel_feed", page_key, size)
+    
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Tuple[Any, List[str]]]],
+                          ttl: Optional[int] = None, local: bool = True) -> Any:
+        """Async get_or_load: local tier, then Redis, then one awaited loader per key per process and cluster"""
+        ttl = ttl or self.default_ttl
+        if local:
+            hit = self.local_cache.get(key)
+            if hit is not None:
+                value, (delta, expires_at) = hit
+                if not CacheHelper._should_refresh_early(delta, expires_at):
+                    _record("local_hits")
+                    return value
+        
+        try:
+            raw = await self.redis_client.get(key)
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            _record("misses")
+            return (await loader())[0]
+        
+        stale = CacheHelper._decode_entry(raw)
+        if stale is not None:
+            if not CacheHelper._should_refresh_early(stale["d"], stale["x"]):
+                _record("redis_hits")
+                if local:
+                    self._set_local(key, stale, len(raw))
+                return stale["v"]
+            _record("early_refreshes")
+        else:
+            _record("misses")
+        return await self._load_single_flight(key, loader, ttl, local, stale)
+    
+    async def _load_single_flight(self, key: str, loader: Callable[[], Awaitable[Tuple[Any, List[str]]]], ttl: int,
+                                  local: bool, stale: Optional[dict]) -> Any:
+        """Async _load_single_flight: one awaited loader per key per process, and per cluster through lock:<key>"""
+        key_lock = _async_key_locks.setdefault(key, asyncio.Lock())
+        if key_lock.locked() and stale is not None:
+            return stale["v"]
+        # A released lock reads unlocked until its next waiter wakes, so count waiters instead
+        _async_key_waiters[key] = _async_key_waiters.get(key, 0) + 1
+        try:
+            async with key_lock:
+                return await self._load_with_redis_lock(key, loader, ttl, local, stale)
+        finally:
+            _async_key_waiters[key] -= 1
+            if not _async_key_waiters[key]:
+                del _async_key_waiters[key]
+                _async_key_locks.pop(key, None)
+    
+    async def _load_with_redis_lock(self, key: str, loader: Callable[[], Awaitable[Tuple[Any, List[str]]]], ttl: int,
+                                    local: bool, stale: Optional[dict]) -> Any:
+        lock_key = f"lock:{key}"
+        token = None
+        try:
+            if stale is None:
+                # Another coroutine of this process may have filled the key while we waited
+                entry = CacheHelper._decode_entry(await self.redis_client.get(key))
+                if entry is not None:
+                    _record("coalesced")
+                    return entry["v"]
+            
+            token = uuid.uuid4().hex
+            if not await self.redis_client.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TIMEOUT * 1000)):
+                token = None
+                if stale is not None:
+                    return stale["v"]
+                entry = await self._wait_for_entry(key)
+                if entry is not None:
+                    _record("coalesced")
+                    return entry["v"]
+            
+            return await self._rebuild(key, loader, ttl, local)
+        except redis.RedisError as e:
+            print(f"Cache lock error: {e}")
+            return await self._rebuild(key, loader, ttl, local)
+        finally:
+            if token is not None:
+                try:
+                    if await self.redis_client.get(lock_key) == token.encode():
+                        await self.redis_client.delete(lock_key)
+                except Exception as e:
+                    print(f"Cache lock error: {e}")
+    
+    async def _wait_for_entry(self, key: str) -> Optional[dict]:
+        """Poll Redis while another process rebuilds key, up to CACHE_LOCK_WAIT seconds"""
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+            entry = CacheHelper._decode_entry(await self.redis_client.get(key))
+            if entry is not None:
+                return entry
+        return None
+    
+    async def _rebuild(self, key: str, loader: Callable[[], Awaitable[Tuple[Any, List[str]]]], ttl: int,
+                       local: bool) -> Any:
+        start = time.perf_counter()
+        value, tags = await loader()
+        entry = {"v": value, "d": time.perf_counter() - start, "x": time.time() + ttl}
+        payload = codec.encode(entry)
+        _record_rebuild(key, entry["d"], len(payload))
+        if await self.set_cache(key, payload, ttl, tags) and local:
+            self._set_local(key, entry, len(payload))
+        return value
+    
+    def _set_local(self, key: str, entry: dict, size: int) -> None:
+        self.local_cache.set(key, entry["v"], size, ttl=entry["x"] - time.time(), meta=(entry["d"], entry["x"]))
@@ -0,0 +1,30 @@
+from typing import Callable, Optional
+from app.config.database import SessionLocal
+from app.repository.media_repository import MediaBlobRepository
+
+class DedupIndex:
+    """Content-hash index of stored media with reference counts (the media_blobs table).
+
+    Storage helpers run outside any request's session, so every call uses a short session of its own.
+    """
+    
+    def __init__(self, session_factory: Callable = SessionLocal):
+        self.session_factory = session_factory
+    
+    def claim(self, content_hash: str, object_key: str, size: int, content_type: str) -> str:
+        """Key of the object to use for these bytes (object_key if they are new)"""
+        return self._call("claim", content_hash, object_key, size, content_type)
+    
+    def add_reference(self, object_key: str) -> bool:
+        return self._call("add_reference", object_key)
+    
+    def release(self, object_key: str) -> Optional[int]:
+        """References left after dropping one; 0 means the object can go, None that it is not indexed"""
+        return self._call("release", object_key)
+    
+    def _call(self, method: str, *args):
+        db = self.session_factory()
+        try:
+            return getattr(MediaBlobRepository(db), method)(*args)
+        finally:
+            db.close()
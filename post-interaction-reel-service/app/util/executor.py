@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from app.config.settings import settings
+
+class ServiceExecutor:
+    """Bounded thread pool for the blocking service calls (SQLAlchemy, redis, boto3) of async routes.
+
+    Each call records how long it waited for a free thread (queue time) and how long it ran,
+    so a saturated pool shows up in the metrics instead of as unexplained latency.
+    """
+
+    def __init__(self, max_workers: int, name: str = "service", samples: int = 1024):
+        self.max_workers = max_workers
+        self.name = name
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queue_times = deque(maxlen=samples)
+        self._run_times = deque(maxlen=samples)
+        self._submitted = 0
+        self._completed = 0
+        self._active = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the pool and await its result"""
+        # Carry contextvars over like Starlette's run_in_threadpool does
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._submitted += 1
+
+        def timed_call():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._active += 1
+                self._queue_times.append(started_at - submitted_at)
+            try:
+                return call()
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._run_times.append(time.perf_counter() - started_at)
+
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), timed_call)
+
+    def stats(self) -> dict:
+        with self._lock:
+            queue_times = sorted(self._queue_times)
+            run_times = sorted(self._run_times)
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._submitted - self._completed - self._active,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "queue_ms": _percentiles(queue_times),
+                "run_ms": _percentiles(run_times),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._pool
+
+def _percentiles(samples: list) -> dict:
+    """p50/p95/max in milliseconds of sorted samples in seconds"""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "p50": round(samples[len(samples) // 2] * 1000, 3),
+        "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        "max": round(samples[-1] * 1000, 3),
+    }
+
+service_executor = ServiceExecutor(settings.SERVICE_POOL_SIZE)
+# Uploads get their own pool: its size is the worker-wide cap on concurrent storage transfers,
+# and long uploads never take the threads DB calls are waiting for
+upload_executor = ServiceExecutor(settings.UPLOAD_MAX_CONCURRENCY, name="upload")
+
+async def run_sync(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking service call on the shared service pool"""
+    return await service_executor.run(func, *args, **kwargs)
+
+async def run_upload(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking storage transfer on the upload pool"""
+    return await upload_executor.run(func, *args, **kwargs)
+
+def executor_stats() -> dict:
+    """Size, backlog and recent queue/run times of this worker's service and upload pools"""
+    return {"service": service_executor.stats(), "upload": upload_executor.stats()}
+
+def shutdown_executor() -> None:
+    """Wait for in-flight calls and stop the pools' threads"""
+    service_executor.shutdown()
+    upload_executor.shutdown()
@@ -1,12 +1,30 @@
 import ffmpeg
 import os
+import shutil
 import tempfile
-from typing import Tuple, Optional
+import threading
+import uuid
+from typing import List, Tuple, Optional
+from PIL import Image
 from app.config.settings import settings
+from app.util.s3_helper import get_s3_helper
+from app.util.thumbnail_selector import best_frame
+
+# HLS rendition ladder; size is the short side, so portrait reels get 240x426, 480x854, 720x1280
+HLS_LADDER = [
+    {'name': '240p', 'size': 240, 'video_bitrate': '400k', 'maxrate': '600k', 'audio_bitrate': '64k'},
+    {'name': '480p', 'size': 480, 'video_bitrate': '1000k', 'maxrate': '1500k', 'audio_bitrate': '96k'},
+    {'name': '720p', 'size': 720, 'video_bitrate': '2000k', 'maxrate': '3000k', 'audio_bitrate': '128k'},
+]
+HLS_MASTER_PLAYLIST = "master.m3u8"
+# Scrubbing sprite sheet: columns x rows frames evenly spread over the reel, tile_width pixels wide each
+THUMBNAIL_SPRITE = {'columns': 5, 'rows': 5, 'tile_width': 160}
 
 class FFmpegWorker:
-    def __init__(self):
+    def __init__(self, threads: Optional[int] = None):
         self.max_duration = settings.MAX_REEL_DURATION
+        # -threads cap for the decoder, filter graph and each encoder of a transcode (0: FFmpeg picks)
+        self.threads = settings.TRANSCODE_THREADS if threads is None else threads
     
     def process_video(self, input_path: str, output_path: str) -> bool:
         """Process video: compress, convert format, and generate thumbnail"""
@@ -23,7 +41,7 @@ class FFmpegWorker:
             # Process video: compress and convert to MP4
             (
                 ffmpeg
-                .input(input_path)
+                .input(input_path, threads=self.threads)
                 .output(
                     output_path,
                     vcodec='libx264',
@@ -32,7 +50,8 @@ class FFmpegWorker:
                     crf=23,
                     maxrate='2M',
                     bufsize='4M',
-                    pix_fmt='yuv420p'
+                    pix_fmt='yuv420p',
+                    threads=self.threads
                 )
                 .overwrite_output()
                 .run(quiet=True)
@@ -73,6 +92,215 @@ class FFmpegWorker:
             print(f"Audio extraction error: {e}")
             return False
     
+    def hls_renditions(self, video_info: dict) -> List[dict]:
+        """Ladder rungs that do not upscale the source (at least the smallest one)"""
+        short_side = min(video_info['width'], video_info['height'])
+        return [rung for rung in HLS_LADDER if rung['size'] <= short_side] or HLS_LADDER[:1]
+    
+    def transcode_reel(self, input_path: str, video_output: str, thumbnail_output: str, audio_output: str,
+                       video_info: dict, time_offset: float = 1.0, hls_dir: Optional[str] = None,
+                       sprite_output: Optional[str] = None) -> bool:
+        """Produce the MP4, thumbnail, audio track and (with hls_dir / sprite_output) the HLS ladder
+        and sprite sheet in one FFmpeg run.
+        
+        The source is decoded once: a split filter feeds the decoded video to the x264
+        encoders and the thumbnail branches, and the decoded audio goes to the AAC and MP3 encoders.
+        """
+        try:
+            (
+                self._reel_graph(input_path, video_output, thumbnail_output, audio_output, video_info,
+                                 time_offset, hls_dir, sprite_output=sprite_output)
+                .overwrite_output()
+                .run(quiet=True)
+            )
+            self._choose_thumbnail(thumbnail_output)
+            return True
+        except Exception as e:
+            print(f"FFmpeg processing error: {e}")
+            return False
+    
+    def stream_transcode_reel(self, input_url: str, thumbnail_output: str, audio_output: str, video_info: dict,
+                              s3_helper, time_offset: float = 1.0, hls_dir: Optional[str] = None,
+                              sprite_output: Optional[str] = None) -> Optional[str]:
+        """Like transcode_reel, but the MP4 goes from FFmpeg's stdout straight into a multipart upload.
+        
+        The MP4 is fragmented (moov up front, one fragment per keyframe) since a pipe cannot be
+        seeked back to write the index; it never touches local disk. Returns its URL, or None.
+        """
+        process = (
+            self._reel_graph(input_url, 'pipe:1', thumbnail_output, audio_output, video_info,
+                             time_offset, hls_dir, fragmented=True, sprite_output=sprite_output)
+            .global_args('-loglevel', 'error')
+            .overwrite_output()
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        # Drain stderr on the side so a chatty FFmpeg never blocks on a full pipe
+        errors = []
+        drain = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+        drain.start()
+        
+        video_url = None
+        try:
+            video_url = s3_helper.upload_stream(process.stdout, "processed_video.mp4", "video/mp4")
+        except Exception as e:
+            print(f"Streaming upload error: {e}")
+            process.kill()
+        finally:
+            process.stdout.close()
+            process.wait()
+            drain.join()
+        
+        if process.returncode != 0:
+            print(f"FFmpeg processing error: {b''.join(errors).decode(errors='replace').strip()}")
+            if video_url:
+                s3_helper.delete_file(video_url)
+            return None
+        self._choose_thumbnail(thumbnail_output)
+        return video_url
+    
+    def _reel_graph(self, input_path: str, video_output: str, thumbnail_output: str, audio_output: str,
+                    video_info: dict, time_offset: float, hls_dir: Optional[str], fragmented: bool = False,
+                    sprite_output: Optional[str] = None):
+        """Single-decode filter graph with every output of a reel"""
+        input_options = {'threads': self.threads}
+        if input_path.startswith(('http://', 'https://')):
+            # Read storage URLs directly; resume the GET if the connection drops mid-file
+            input_options.update(reconnect=1, reconnect_streamed=1, reconnect_delay_max=5)
+        source = ffmpeg.input(input_path, **input_options)
+        renditions = self.hls_renditions(video_info) if hls_dir else []
+        video = source.video.split()
+        
+        container = {'format': 'mp4', 'movflags': 'frag_keyframe+empty_moov+default_base_moof'} if fragmented else {}
+        main_streams = [video[0], source.audio] if video_info['has_audio'] else [video[0]]
+        outputs = [
+            ffmpeg.output(
+                *main_streams,
+                video_output,
+                vcodec='libx264',
+                acodec='aac',
+                preset='medium',
+                crf=23,
+                maxrate='2M',
+                bufsize='4M',
+                pix_fmt='yuv420p',
+                threads=self.threads,
+                **container
+            ),
+        ]
+        thumbnails = self._thumbnail_outputs(video, 1 + len(renditions), thumbnail_output, sprite_output,
+                                             video_info, time_offset)
+        outputs.extend(thumbnails)
+        if video_info['has_audio']:
+            outputs.append(ffmpeg.output(source.audio, audio_output, acodec='mp3', ac=2, ar='44100'))
+        if renditions:
+            outputs.append(self._hls_output(source, [video[1 + i] for i in range(len(renditions))],
+                                            renditions, video_info, hls_dir))
+        
+        return ffmpeg.merge_outputs(*outputs).global_args('-filter_complex_threads', str(self.threads))
+    
+    def _thumbnail_outputs(self, video, first: int, thumbnail_output: str, sprite_output: Optional[str],
+                           video_info: dict, time_offset: float) -> list:
+        """Thumbnail branches, fed from split outputs video[first], video[first + 1], ...
+        
+        The frame at time_offset, plus with REEL_THUMBNAIL_CANDIDATES up to that many keyframes
+        spread over the clip, land in a candidates directory for _choose_thumbnail to score;
+        with sprite_output, a tile filter lays out evenly spaced frames as the scrubbing sprite.
+        """
+        duration = video_info['duration']
+        candidates = settings.REEL_THUMBNAIL_CANDIDATES
+        # Short clips: take the frame from the middle rather than past the end. The bounded
+        # window ends this branch early instead of carrying every frame to the end
+        offset = min(time_offset, duration / 2)
+        thumbnail = video[first].trim(start=offset, end=offset + 1).setpts('PTS-STARTPTS')
+        if not candidates:
+            outputs = [ffmpeg.output(thumbnail, thumbnail_output, vframes=1, format='image2')]
+        else:
+            candidates_dir = self._candidates_dir(thumbnail_output)
+            os.makedirs(candidates_dir, exist_ok=True)
+            # I-frames at least duration / candidates apart, so they cover the clip rather than its start
+            keyframes = video[first + 1].filter(
+                'select', f'eq(pict_type,I)*(isnan(prev_selected_t)+gte(t-prev_selected_t,{duration / candidates:.3f}))'
+            )
+            outputs = [
+                ffmpeg.output(thumbnail, os.path.join(candidates_dir, 'offset.jpg'), vframes=1, format='image2'),
+                ffmpeg.output(keyframes, os.path.join(candidates_dir, 'key_%03d.jpg'), vframes=candidates,
+                              vsync='vfr', format='image2'),
+            ]
+        if sprite_output:
+            columns, rows = THUMBNAIL_SPRITE['columns'], THUMBNAIL_SPRITE['rows']
+            sprite = (
+                video[first + len(outputs)]
+                .filter('fps', fps=f'{columns * rows}/{duration:.3f}')
+                .filter('scale', THUMBNAIL_SPRITE['tile_width'], -2)
+                .filter('tile', f'{columns}x{rows}')
+            )
+            outputs.append(ffmpeg.output(sprite, sprite_output, vframes=1, format='image2'))
+        return outputs
+    
+    def _candidates_dir(self, thumbnail_output: str) -> str:
+        return os.path.splitext(thumbnail_output)[0] + '_candidates'
+    
+    def _choose_thumbnail(self, thumbnail_output: str) -> bool:
+        """Move the best scoring candidate frame to thumbnail_output (no-op without candidates)"""
+        candidates_dir = self._candidates_dir(thumbnail_output)
+        if not os.path.isdir(candidates_dir):
+            return os.path.exists(thumbnail_output)
+        try:
+            best = best_frame(sorted(os.path.join(candidates_dir, name) for name in os.listdir(candidates_dir)))
+            if best:
+                os.replace(best, thumbnail_output)
+            return best is not None
+        finally:
+            shutil.rmtree(candidates_dir, ignore_errors=True)
+    
+    def sprite_layout(self, sprite_path: str, video_info: dict) -> dict:
+        """Grid of a sprite sheet for clients: tile size, columns x rows, seconds between tiles"""
+        columns, rows = THUMBNAIL_SPRITE['columns'], THUMBNAIL_SPRITE['rows']
+        with Image.open(sprite_path) as sprite:
+            width, height = sprite.size
+        return {'columns': columns, 'rows': rows, 'width': width // columns, 'height': height // rows,
+                'interval': video_info['duration'] / (columns * rows)}
+    
+    def _hls_output(self, source, videos: list, renditions: List[dict], video_info: dict, hls_dir: str):
+        """One HLS output carrying every rung: <hls_dir>/<name>/index.m3u8 + segments, and the master playlist.
+        
+        The rungs are separate x264 encoders fed from the shared decode; x264 encodes
+        asynchronously on its own threads, so the encoders run side by side. Keyframes are
+        forced on segment boundaries so players can switch rungs at any segment.
+        """
+        streams, stream_map, options = [], [], {}
+        portrait = video_info['width'] <= video_info['height']
+        for i, (video, rung) in enumerate(zip(videos, renditions)):
+            size = (rung['size'], -2) if portrait else (-2, rung['size'])
+            streams.append(video.filter('scale', *size))
+            options.update({f'b:v:{i}': rung['video_bitrate'], f'maxrate:v:{i}': rung['maxrate'],
+                            f'bufsize:v:{i}': rung['maxrate']})
+            if video_info['has_audio']:
+                streams.append(source.audio)
+                options[f'b:a:{i}'] = rung['audio_bitrate']
+                stream_map.append(f"v:{i},a:{i},name:{rung['name']}")
+            else:
+                stream_map.append(f"v:{i},name:{rung['name']}")
+        
+        segment_seconds = settings.REEL_HLS_SEGMENT_SECONDS
+        return ffmpeg.output(
+            *streams,
+            os.path.join(hls_dir, '%v', 'index.m3u8'),
+            format='hls',
+            vcodec='libx264',
+            acodec='aac',
+            preset='veryfast',
+            pix_fmt='yuv420p',
+            threads=self.threads,
+            force_key_frames=f'expr:gte(t,n_forced*{segment_seconds})',
+            hls_time=segment_seconds,
+            hls_playlist_type='vod',
+            hls_segment_filename=os.path.join(hls_dir, '%v', 'segment_%03d.ts'),
+            master_pl_name=HLS_MASTER_PLAYLIST,
+            var_stream_map=' '.join(stream_map),
+            **options
+        )
+    
     def get_video_info(self, video_path: str) -> dict:
         """Get video information"""
         try:
@@ -92,36 +320,51 @@ class FFmpegWorker:
             print(f"Video info extraction error: {e}")
             return {}
     
-    def process_reel_video(self, input_path: str) -> Tuple[Optional[str], Optional[str], Optional[str], dict]:
-        """Process reel video: compress, generate thumbnail, extract audio"""
+    def process_reel_video(self, input_path: str) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str],
+                                                           Optional[dict], dict]:
+        """Process reel video: compress, pick a thumbnail, extract audio, encode the HLS ladder and sprite sheet.
+        
+        Returns (video_url, thumbnail_url, audio_url, hls_manifest_url, thumbnail_sprite, video_info);
+        thumbnail_sprite is the sprite's sprite_layout with its url.
+        """
         try:
             # Create temporary files
             with tempfile.TemporaryDirectory() as temp_dir:
                 video_output = os.path.join(temp_dir, "processed_video.mp4")
                 thumbnail_output = os.path.join(temp_dir, "thumbnail.jpg")
                 audio_output = os.path.join(temp_dir, "audio.mp3")
+                hls_dir = os.path.join(temp_dir, "hls") if settings.REEL_HLS_ENABLED else None
+                sprite_output = os.path.join(temp_dir, "sprite.jpg") if settings.REEL_SPRITE_ENABLED else None
                 
-                # Get video info
-                video_info = self.get_video_info(input_path)
-                
-                # Process video
-                if not self.process_video(input_path, video_output):
-                    return None, None, None, {}
-                
-                # Generate thumbnail
-                thumbnail_generated = self.generate_thumbnail(video_output, thumbnail_output)
-                
-                # Extract audio if present
-                audio_generated = False
-                if video_info.get('has_audio', False):
-                    audio_generated = self.extract_audio(video_output, audio_output)
+                # FFmpeg reads the source straight from storage; objects of our (private) bucket
+                # through a fresh presigned GET, so a job that waited in the queue is not refused
+                s3_helper = get_s3_helper()
+                input_path = s3_helper.readable_url(input_path)
                 
-                # Upload processed files
-                s3_helper = S3Helper()
+                # Probe once; the same info drives the duration check and the filter graph
+                video_info = self.get_video_info(input_path)
+                if not video_info:
+                    return None, None, None, None, None, {}
+                if video_info['duration'] > self.max_duration:
+                    print(f"Reel processing error: video duration ({video_info['duration']}s) exceeds "
+                          f"maximum allowed duration ({self.max_duration}s)")
+                    return None, None, None, None, None, {}
                 
-                # Upload video
-                with open(video_output, 'rb') as f:
-                    video_url = s3_helper.upload_file(f, "processed_video.mp4", "video/mp4")
+                # Transcode, thumbnail and audio from a single decode
+                if settings.REEL_STREAMING_TRANSCODE:
+                    # The MP4 is uploaded while it is encoded, without a local copy
+                    video_url = self.stream_transcode_reel(input_path, thumbnail_output, audio_output, video_info,
+                                                           s3_helper, hls_dir=hls_dir, sprite_output=sprite_output)
+                    if not video_url:
+                        return None, None, None, None, None, {}
+                else:
+                    if not self.transcode_reel(input_path, video_output, thumbnail_output, audio_output, video_info,
+                                               hls_dir=hls_dir, sprite_output=sprite_output):
+                        return None, None, None, None, None, {}
+                    with open(video_output, 'rb') as f:
+                        video_url = s3_helper.upload_file(f, "processed_video.mp4", "video/mp4")
+                thumbnail_generated = os.path.exists(thumbnail_output)
+                audio_generated = video_info['has_audio'] and os.path.exists(audio_output)
                 
                 # Upload thumbnail
                 thumbnail_url = None
@@ -129,15 +372,29 @@ class FFmpegWorker:
                     with open(thumbnail_output, 'rb') as f:
                         thumbnail_url = s3_helper.upload_file(f, "thumbnail.jpg", "image/jpeg")
                 
+                # Upload the scrubbing sprite with the grid clients need to address its tiles
+                thumbnail_sprite = None
+                if sprite_output and os.path.exists(sprite_output):
+                    thumbnail_sprite = self.sprite_layout(sprite_output, video_info)
+                    with open(sprite_output, 'rb') as f:
+                        thumbnail_sprite['url'] = s3_helper.upload_file(f, "sprite.jpg", "image/jpeg")
+                
                 # Upload audio
                 audio_url = None
                 if audio_generated:
                     with open(audio_output, 'rb') as f:
                         audio_url = s3_helper.upload_file(f, "audio.mp3", "audio/mpeg")
                 
-                return video_url, thumbnail_url, audio_url, video_info
+                # Upload the HLS ladder under one prefix so the playlists' relative paths resolve
+                hls_manifest_url = None
+                if hls_dir and os.path.exists(os.path.join(hls_dir, HLS_MASTER_PLAYLIST)):
+                    prefix = f"hls/{uuid.uuid4()}"
+                    s3_helper.upload_directory(hls_dir, prefix)
+                    hls_manifest_url = s3_helper.object_url(f"{prefix}/{HLS_MASTER_PLAYLIST}")
+                
+                return video_url, thumbnail_url, audio_url, hls_manifest_url, thumbnail_sprite, video_info
                 
         except Exception as e:
             print(f"Reel processing error: {e}")
-            return None, None, None, {}
+            return None, None, None, None, None, {}
 
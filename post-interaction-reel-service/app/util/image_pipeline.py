@@ -0,0 +1,98 @@
+import asyncio
+import io
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Optional, Union
+from PIL import Image, ImageOps
+
+try:
+    import pillow_avif  # registers the AVIF codec with Pillow < 11.2
+except ImportError:  # optional: AVIF falls back to WebP
+    pillow_avif = None
+
+from app.config.settings import settings
+from app.util.transcode_scheduler import available_cores
+
+# Longest edge of each variant; images are never upscaled
+VARIANT_SIZES = {"full": 2048, "feed": 1080, "thumb": 320}
+CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+def image_format() -> str:
+    """IMAGE_FORMAT if Pillow can encode it here, else webp"""
+    Image.init()
+    if settings.IMAGE_FORMAT == "avif" and "AVIF" not in Image.SAVE:
+        print("Image format avif is not supported by this Pillow, using webp")
+        return "webp"
+    return settings.IMAGE_FORMAT
+
+def has_variants(content_type: str) -> bool:
+    """Images Pillow decodes get variants; GIFs (usually animated), other types and videos are stored as uploaded"""
+    return content_type in settings.ALLOWED_IMAGE_TYPES and content_type != "image/gif"
+
+def make_variants(source: Union[str, BinaryIO], output_format: str, quality: int) -> Optional[dict]:
+    """Decode an image (a file path, or a file object) once and encode every variant, largest first,
+    each resized from the previous one.
+
+    Orientation from EXIF is applied to the pixels; EXIF, XMP and comments are not written
+    (only the ICC profile is kept, so colours stay right). Returns None for animated images,
+    which are stored as uploaded. Runs in the image worker processes.
+    """
+    with Image.open(source) as original:
+        if getattr(original, "is_animated", False):
+            return None
+        scale = max(VARIANT_SIZES.values()) / max(original.size)
+        if scale < 1:
+            # JPEG: decode straight at 1/2..1/8 scale when that still covers the largest variant
+            original.draft("RGB", (math.ceil(original.width * scale), math.ceil(original.height * scale)))
+        image = ImageOps.exif_transpose(original)
+        icc_profile = original.info.get("icc_profile")
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    image.info = {}
+
+    variants = {}
+    for name, size in sorted(VARIANT_SIZES.items(), key=lambda item: -item[1]):
+        if max(image.size) > size:
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        options = {"method": 4} if output_format == "webp" else {}
+        image.save(buffer, format=output_format.upper(), quality=quality, icc_profile=icc_profile, **options)
+        variants[name] = buffer.getvalue()
+        if name == "full":
+            width, height = image.size
+    return {"format": output_format, "width": width, "height": height, "variants": variants}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_format: Optional[str] = None
+_pool_lock = threading.Lock()
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """Process pool for decoding/resizing/encoding, one worker per core unless IMAGE_WORKERS is set"""
+    global _pool, _pool_format
+    with _pool_lock:
+        if _pool is None:
+            # Resolved once per pool, not per image
+            _pool_format = image_format()
+            # spawn: forking a server process with running threads (pools, redis listener) is unsafe
+            _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS or available_cores(),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+async def process_image(path: str) -> Optional[dict]:
+    """make_variants of an image file on the image pool; raises PIL errors if it is not a readable image.
+
+    Workers get the path, not the bytes, so an upload is never pickled into another process.
+    """
+    pool = get_image_pool()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, make_variants, path, _pool_format, settings.IMAGE_QUALITY)
+
+def shutdown_image_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
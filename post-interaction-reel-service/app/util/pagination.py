@@ -0,0 +1,38 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+Cursor = Tuple[datetime, int]
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Encode the (created_at, id) of the last item on a page into an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode an opaque cursor back into (created_at, id); raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def paginate(query: Query, model, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> Query:
+    """Order newest first and apply either a keyset cursor or the legacy offset"""
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor is not None:
+        # Row comparison lets the (created_at desc, id desc) index serve the seek directly
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(*cursor))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(items: list, size: int) -> Optional[str]:
+    """Build the cursor for the page after items, or None on the last page"""
+    if len(items) < size or not items:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
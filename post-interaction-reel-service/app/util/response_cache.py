@@ -0,0 +1,41 @@
+import hashlib
+from typing import Awaitable, Callable, List, Optional, Tuple
+from fastapi import Response, status
+from pydantic import BaseModel
+from app.config.settings import settings
+from app.util.cache_helper import AsyncCacheHelper
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag of an encoded response body"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Whether an If-None-Match header (possibly a list, weak tags or *) matches etag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+def rendered_response(etag: str, body: bytes, if_none_match: Optional[str] = None) -> Response:
+    """Raw JSON response for pre-rendered bytes, or 304 when the client already has them"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def get_or_render(cache_helper: AsyncCacheHelper, key: str, build: Callable[[], Awaitable[BaseModel]],
+                        tags: Callable[[BaseModel], List[str]]) -> Tuple[str, bytes]:
+    """(etag, body) for key: cached bytes on a hit, else build() rendered once and stored.
+
+    Hits skip pydantic and FastAPI's response_model encoding entirely. Only responses that
+    are the same for every viewer may be cached this way (no liked_by_me).
+    """
+    rendered = await cache_helper.get_rendered(key)
+    if rendered is not None:
+        return rendered
+    
+    response = await build()
+    body = response.model_dump_json().encode()
+    etag = make_etag(body)
+    await cache_helper.set_rendered(key, etag, body, ttl=settings.RESPONSE_CACHE_TTL, tags=tags(response))
+    return etag, body
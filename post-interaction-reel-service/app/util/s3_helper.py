@@ -1,93 +1,338 @@
 import boto3
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+import urllib3
+from botocore.config import Config
 from minio import Minio
 from minio.error import S3Error
-from typing import Optional, BinaryIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, BinaryIO, Union
 import uuid
+from datetime import timedelta
 from app.config.settings import settings
+from app.util.dedup_index import DedupIndex
+
+# Content types of the HLS files, which mimetypes does not know on every platform
+CONTENT_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+
+class UploadTooLargeError(ValueError):
+    """Raised while streaming an upload once it grows past the allowed size"""
+
+class _SizeLimitedReader:
+    """File-like view of a stream that fails as soon as more than max_size bytes are read"""
+    
+    def __init__(self, stream: BinaryIO, max_size: Optional[int] = None):
+        self.stream = stream
+        self.max_size = max_size
+        self.bytes_read = 0
+        # Hashed as it streams through, so deduplication needs no second pass over the upload
+        self.hasher = hashlib.sha256()
+    
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        self.hasher.update(chunk)
+        if self.max_size is not None and self.bytes_read > self.max_size:
+            raise UploadTooLargeError(f"File exceeds the maximum size of {self.max_size} bytes")
+        return chunk
+    
+    def read_part(self, part_size: int) -> bytes:
+        """Read up to part_size bytes, looping over short reads from the underlying stream"""
+        chunk = self.read(part_size)
+        if not chunk or len(chunk) == part_size:
+            return chunk
+        buffer = bytearray(chunk)
+        while len(buffer) < part_size:
+            chunk = self.read(part_size - len(buffer))
+            if not chunk:
+                break
+            buffer += chunk
+        return bytes(buffer)
+
+_clients: dict = {}
+_clients_lock = threading.Lock()
+_bucket_ready = False
+
+def _use_minio() -> bool:
+    return not (settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY)
+
+def _build_s3_client():
+    return boto3.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+        config=Config(
+            max_pool_connections=settings.STORAGE_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.STORAGE_CONNECT_TIMEOUT,
+            read_timeout=settings.STORAGE_READ_TIMEOUT,
+            retries={"max_attempts": 3, "mode": "standard"}
+        )
+    )
+
+def _build_minio_client() -> Minio:
+    http_client = urllib3.PoolManager(
+        maxsize=settings.STORAGE_MAX_POOL_CONNECTIONS,
+        timeout=urllib3.Timeout(connect=settings.STORAGE_CONNECT_TIMEOUT, read=settings.STORAGE_READ_TIMEOUT),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+        block=True  # wait for a free connection instead of opening throwaway ones
+    )
+    return Minio(
+        settings.MINIO_ENDPOINT,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY,
+        secure=settings.MINIO_SECURE,
+        http_client=http_client
+    )
+
+def get_storage_client():
+    """Process-wide boto3 or Minio client; both are thread-safe and keep a connection pool"""
+    backend = "minio" if _use_minio() else "s3"
+    client = _clients.get(backend)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(backend)
+            if client is None:
+                client = _build_minio_client() if backend == "minio" else _build_s3_client()
+                _clients[backend] = client
+    return client
 
 class S3Helper:
+    # Content-hash index behind upload_stream/delete_file; without it every upload is its own object
+    dedup_index: Optional[DedupIndex] = None
+    
     def __init__(self):
-        if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION
-            )
-            self.bucket_name = settings.S3_BUCKET_NAME
-            self.use_minio = False
-        else:
-            self.minio_client = Minio(
-                settings.MINIO_ENDPOINT,
-                access_key=settings.MINIO_ACCESS_KEY,
-                secret_key=settings.MINIO_SECRET_KEY,
-                secure=settings.MINIO_SECURE
-            )
+        # Clients come from the registry, so constructing a helper costs no connection or request
+        self.use_minio = _use_minio()
+        if self.use_minio:
+            self.minio_client = get_storage_client()
             self.bucket_name = settings.MINIO_BUCKET_NAME
-            self.use_minio = True
-            self._ensure_bucket_exists()
+        else:
+            self.s3_client = get_storage_client()
+            self.bucket_name = settings.S3_BUCKET_NAME
+        if settings.MEDIA_DEDUP_ENABLED:
+            self.dedup_index = DedupIndex()
     
-    def _ensure_bucket_exists(self):
+    def _ensure_bucket_exists(self) -> bool:
         """Ensure MinIO bucket exists"""
         try:
             if not self.minio_client.bucket_exists(self.bucket_name):
                 self.minio_client.make_bucket(self.bucket_name)
-        except S3Error as e:
+            return True
+        except Exception as e:
             print(f"Error creating bucket: {e}")
+            return False
     
-    def upload_file(self, file_data: BinaryIO, file_name: str, content_type: str) -> str:
-        """Upload file to S3/MinIO and return URL"""
+    def new_object_key(self, file_name: str) -> str:
+        """Unique object key keeping the file's extension"""
         file_extension = file_name.split('.')[-1]
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
+        return f"{uuid.uuid4()}.{file_extension}"
+    
+    def object_url(self, key: str) -> str:
+        """Public URL of an object key"""
+        if self.use_minio:
+            return f"http://{settings.MINIO_ENDPOINT}/{self.bucket_name}/{key}"
+        return f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+    
+    def upload_file(self, file_data: Union[bytes, BinaryIO], file_name: str, content_type: str) -> str:
+        """Upload file to S3/MinIO and return URL"""
+        if isinstance(file_data, (bytes, bytearray)):
+            file_data = io.BytesIO(file_data)
+        return self.upload_stream(file_data, file_name, content_type)
+    
+    def upload_stream(self, stream: BinaryIO, file_name: str, content_type: str,
+                      max_size: Optional[int] = None) -> str:
+        """Upload a file-like stream part by part and return URL.
         
+        At most one part (UPLOAD_PART_SIZE) is held in memory; the upload is aborted with
+        UploadTooLargeError as soon as the stream passes max_size. With the dedup index, bytes
+        that are already stored resolve to the existing object's URL and the new copy is dropped.
+        """
+        key = self.new_object_key(file_name)
+        reader = _SizeLimitedReader(stream, max_size)
+        url = self._upload_reader(reader, key, content_type)
+        if self.dedup_index is None:
+            return url
+        return self._deduplicate(reader, key, content_type)
+    
+    def upload_object(self, stream: BinaryIO, key: str, content_type: str,
+                      max_size: Optional[int] = None) -> str:
+        """Upload a file-like stream under an exact key and return URL (never deduplicated)"""
+        return self._upload_reader(_SizeLimitedReader(stream, max_size), key, content_type)
+    
+    def _deduplicate(self, reader: _SizeLimitedReader, key: str, content_type: str) -> str:
+        """Point a finished upload at the stored copy of its bytes, if any, and remove the duplicate"""
+        try:
+            canonical = self.dedup_index.claim(reader.hasher.hexdigest(), key, reader.bytes_read, content_type)
+        except Exception as e:
+            # Not indexed: the object is still valid, and delete_file removes it directly
+            print(f"Dedup index error: {e}")
+            return self.object_url(key)
+        if canonical != key:
+            self._remove_object(key)
+        return self.object_url(canonical)
+    
+    def _upload_reader(self, reader: _SizeLimitedReader, key: str, content_type: str) -> str:
         if self.use_minio:
             try:
+                # length=-1 makes minio read and send part_size parts, aborting the upload on error
                 self.minio_client.put_object(
                     self.bucket_name,
-                    unique_filename,
-                    file_data,
+                    key,
+                    reader,
                     length=-1,
-                    part_size=10*1024*1024,
+                    part_size=settings.UPLOAD_PART_SIZE,
                     content_type=content_type
                 )
-                return f"http://{settings.MINIO_ENDPOINT}/{self.bucket_name}/{unique_filename}"
+                return self.object_url(key)
             except S3Error as e:
                 raise Exception(f"MinIO upload error: {e}")
         else:
             try:
-                self.s3_client.put_object(
-                    Bucket=self.bucket_name,
-                    Key=unique_filename,
-                    Body=file_data,
-                    ContentType=content_type
-                )
-                return f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{unique_filename}"
+                self._s3_multipart_upload(reader, key, content_type)
+                return self.object_url(key)
+            except UploadTooLargeError:
+                raise
             except Exception as e:
                 raise Exception(f"S3 upload error: {e}")
     
+    def upload_directory(self, local_dir: str, prefix: str) -> str:
+        """Upload every file under local_dir to <prefix>/<relative path> and return the prefix URL.
+        
+        Relative references between the files (HLS playlists and segments) keep working.
+        """
+        paths = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(local_dir)
+            for name in names
+        ]
+        
+        def upload(path: str) -> str:
+            key = f"{prefix}/{os.path.relpath(path, local_dir).replace(os.sep, '/')}"
+            extension = os.path.splitext(path)[1]
+            content_type = CONTENT_TYPES.get(extension) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+            with open(path, 'rb') as f:
+                return self.upload_object(f, key, content_type)
+        
+        with ThreadPoolExecutor(max_workers=settings.UPLOAD_MAX_CONCURRENCY) as pool:
+            list(pool.map(upload, paths))
+        return self.object_url(prefix)
+    
+    def _s3_multipart_upload(self, reader: _SizeLimitedReader, key: str, content_type: str) -> None:
+        """Send reader to S3 in UPLOAD_PART_SIZE parts, or one PUT if it fits in a single part"""
+        part = reader.read_part(settings.UPLOAD_PART_SIZE)
+        if len(part) < settings.UPLOAD_PART_SIZE:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=part, ContentType=content_type)
+            return
+        
+        upload_id = self.s3_client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=key, ContentType=content_type
+        )["UploadId"]
+        try:
+            parts = []
+            while part:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                    PartNumber=len(parts) + 1, Body=part
+                )
+                parts.append({"PartNumber": len(parts) + 1, "ETag": response["ETag"]})
+                part = reader.read_part(settings.UPLOAD_PART_SIZE)
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+        except Exception:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+            raise
+    
     def delete_file(self, file_url: str) -> bool:
-        """Delete file from S3/MinIO"""
+        """Delete file from S3/MinIO, unless other uploads still reference the same deduplicated object"""
         try:
-            # Extract filename from URL
-            filename = file_url.split('/')[-1]
-            
-            if self.use_minio:
-                self.minio_client.remove_object(self.bucket_name, filename)
-            else:
-                self.s3_client.delete_object(Bucket=self.bucket_name, Key=filename)
+            key = self.key_from_url(file_url) or file_url.split('/')[-1]
+            if self.dedup_index is not None and self.dedup_index.release(key):
+                return True
+            self._remove_object(key)
             return True
         except Exception as e:
             print(f"Error deleting file: {e}")
             return False
     
+    def _remove_object(self, key: str) -> None:
+        if self.use_minio:
+            self.minio_client.remove_object(self.bucket_name, key)
+        else:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+    
+    def key_from_url(self, url: str) -> Optional[str]:
+        """Object key of an unsigned URL of this bucket, None for any other URL"""
+        prefix = self.object_url("")
+        if url.startswith(prefix) and "?" not in url:
+            return url[len(prefix):]
+        return None
+    
     def get_presigned_url(self, file_name: str, expiration: int = 3600) -> str:
         """Generate presigned URL for file access"""
         if self.use_minio:
-            return self.minio_client.presigned_get_object(self.bucket_name, file_name, expires=expiration)
+            return self.minio_client.presigned_get_object(
+                self.bucket_name, file_name, expires=timedelta(seconds=expiration)
+            )
         else:
             return self.s3_client.generate_presigned_url(
                 'get_object',
                 Params={'Bucket': self.bucket_name, 'Key': file_name},
                 ExpiresIn=expiration
             )
+    
+    def readable_url(self, url: str, expiration: int = 3600) -> str:
+        """Presigned GET for an unsigned URL of this bucket (it may be private); other URLs are returned as is"""
+        key = self.key_from_url(url)
+        return self.get_presigned_url(key, expiration) if key else url
+    
+    def get_presigned_upload_url(self, key: str, content_type: str, expiration: int = 3600) -> str:
+        """Generate presigned URL the client PUTs the object to directly"""
+        if self.use_minio:
+            return self.minio_client.presigned_put_object(
+                self.bucket_name, key, expires=timedelta(seconds=expiration)
+            )
+        else:
+            # ContentType is signed, so S3 rejects a PUT declaring another type
+            return self.s3_client.generate_presigned_url(
+                'put_object',
+                Params={'Bucket': self.bucket_name, 'Key': key, 'ContentType': content_type},
+                ExpiresIn=expiration
+            )
+    
+    def head_file(self, key: str) -> Optional[dict]:
+        """Size and content type of a stored object, or None if it does not exist"""
+        try:
+            if self.use_minio:
+                stat = self.minio_client.stat_object(self.bucket_name, key)
+                return {"size": stat.size, "content_type": stat.content_type}
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            return {"size": response["ContentLength"], "content_type": response.get("ContentType")}
+        except Exception as e:
+            print(f"Error reading file metadata: {e}")
+            return None
+
+_s3_helper: Optional[S3Helper] = None
+_s3_helper_lock = threading.Lock()
+
+def get_s3_helper() -> S3Helper:
+    """Process-wide S3Helper; the boto3/minio clients are thread-safe and pool their connections"""
+    global _s3_helper
+    if _s3_helper is None:
+        with _s3_helper_lock:
+            if _s3_helper is None:
+                _s3_helper = S3Helper()
+    return _s3_helper
 
+def ensure_bucket() -> bool:
+    """Check (and create) the MinIO bucket once per process; called at startup"""
+    global _bucket_ready
+    if not _bucket_ready:
+        helper = get_s3_helper()
+        _bucket_ready = not helper.use_minio or helper._ensure_bucket_exists()
+    return _bucket_ready
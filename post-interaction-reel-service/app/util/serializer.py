@@ -0,0 +1,135 @@
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to stdlib json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: falls back to stdlib json
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional: falls back to zlib
+    zstandard = None
+
+from app.config.settings import settings
+
+def _default(value: Any) -> Any:
+    """Serialize datetimes from response .dict() payloads as ISO 8601"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+class JsonSerializer:
+    tag = b"j"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+class OrjsonSerializer:
+    tag = b"o"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=_default)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+class MsgpackSerializer:
+    tag = b"m"
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=_default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+class CacheCodec:
+    """Frames cache payloads as <serializer tag><compression tag><body>.
+
+    The tags make entries self-describing, so changing CACHE_SERIALIZER or
+    CACHE_COMPRESSION never breaks values already in Redis; untagged values written
+    as plain JSON by older releases are still read.
+    """
+
+    NO_COMPRESSION = b"-"
+    ZSTD = b"z"
+    ZLIB = b"l"
+
+    def __init__(self, serializer: Optional[str] = None, compression: Optional[str] = None,
+                 threshold: Optional[int] = None):
+        self.serializers = {serializer.tag: serializer for serializer in self._available_serializers()}
+        self.serializer = self._pick_serializer(serializer or settings.CACHE_SERIALIZER)
+        self.compression = self._pick_compression(compression or settings.CACHE_COMPRESSION)
+        self.threshold = settings.CACHE_COMPRESSION_THRESHOLD if threshold is None else threshold
+        if zstandard is not None:
+            self._zstd_compressor = zstandard.ZstdCompressor(level=3)
+            self._zstd_decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, value: Any) -> bytes:
+        body = self.serializer.dumps(value)
+        compression = self.NO_COMPRESSION
+        if self.compression != self.NO_COMPRESSION and len(body) > self.threshold:
+            compression = self.compression
+            body = self._zstd_compressor.compress(body) if compression == self.ZSTD else zlib.compress(body, 6)
+        return self.serializer.tag + compression + body
+
+    def decode(self, data: Optional[bytes]) -> Any:
+        if not data:
+            return None
+        if isinstance(data, str):
+            data = data.encode()
+        serializer = self.serializers.get(data[:1])
+        if serializer is None:
+            # Legacy plain JSON (or a raw string) written before payloads were framed
+            try:
+                return json.loads(data)
+            except ValueError:
+                return data.decode()
+        compression, body = data[1:2], data[2:]
+        if compression == self.ZSTD:
+            body = self._zstd_decompressor.decompress(body)
+        elif compression == self.ZLIB:
+            body = zlib.decompress(body)
+        return serializer.loads(body)
+
+    @staticmethod
+    def _available_serializers() -> list:
+        serializers = [JsonSerializer()]
+        if orjson is not None:
+            serializers.append(OrjsonSerializer())
+        if msgpack is not None:
+            serializers.append(MsgpackSerializer())
+        return serializers
+
+    def _pick_serializer(self, name: str):
+        tag = {"json": b"j", "orjson": b"o", "msgpack": b"m"}.get(name)
+        if tag is None:
+            raise ValueError(f"Unknown cache serializer: {name}")
+        if tag not in self.serializers:
+            print(f"Cache serializer {name} is not installed, using json")
+            return self.serializers[b"j"]
+        return self.serializers[tag]
+
+    def _pick_compression(self, name: str) -> bytes:
+        if name == "none":
+            return self.NO_COMPRESSION
+        if name == "zlib":
+            return self.ZLIB
+        if name == "zstd":
+            if zstandard is None:
+                print("Cache compression zstd is not installed, using zlib")
+                return self.ZLIB
+            return self.ZSTD
+        raise ValueError(f"Unknown cache compression: {name}")
+
+codec = CacheCodec()
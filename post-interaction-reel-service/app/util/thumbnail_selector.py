@@ -0,0 +1,54 @@
+import math
+from typing import List, Optional
+from PIL import Image, ImageFilter, ImageStat
+
+try:
+    import numpy as np
+except ImportError:  # optional: Pillow's histogram and kernel filter rank frames the same, a bit slower
+    np = None
+
+# Candidates are scored on a downscaled copy: cheap, and blur/flatness survive the downscale
+SCORE_SIZE = 256
+LAPLACIAN = (0, 1, 0, 1, -4, 1, 0, 1, 0)
+
+def _load_luma(path: str) -> Image.Image:
+    image = Image.open(path)
+    image.draft("L", (SCORE_SIZE, SCORE_SIZE))  # JPEG: decode at 1/2..1/8 scale
+    image = image.convert("L")
+    image.thumbnail((SCORE_SIZE, SCORE_SIZE))
+    return image
+
+def frame_score(path: str) -> float:
+    """Score a frame: luma histogram entropy (bits) x log(1 + variance of its Laplacian).
+
+    Black, faded or flat frames have near-zero entropy and motion-blurred ones a small
+    Laplacian variance, so either drags the product down.
+    """
+    luma = _load_luma(path)
+    if np is not None:
+        pixels = np.asarray(luma, dtype=np.float32)
+        histogram = np.bincount(pixels.astype(np.uint8).ravel(), minlength=256) / pixels.size
+        histogram = histogram[histogram > 0]
+        entropy = float(-(histogram * np.log2(histogram)).sum())
+        laplacian = (pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+                     - 4 * pixels[1:-1, 1:-1])
+        sharpness = float(laplacian.var())
+    else:
+        entropy = luma.entropy()
+        # Offset keeps negative responses; clipping at 0/255 flattens strong edges, so sharpness runs lower
+        edges = luma.filter(ImageFilter.Kernel((3, 3), LAPLACIAN, scale=1, offset=128))
+        sharpness = ImageStat.Stat(edges).var[0]
+    return entropy * math.log1p(sharpness)
+
+def best_frame(paths: List[str]) -> Optional[str]:
+    """Highest scoring readable frame of the candidates (first one on ties)"""
+    best, best_score = None, -1.0
+    for path in paths:
+        try:
+            score = frame_score(path)
+        except Exception as e:
+            print(f"Thumbnail scoring error: {e}")
+            continue
+        if score > best_score:
+            best, best_score = path, score
+    return best
@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from app.config.redis_config import get_redis
+from app.config.settings import settings
+from app.util.pagination import Cursor
+
+# (post_id, author_id, created_at timestamp)
+TimelineEntry = Tuple[int, int, float]
+
+class TimelineHelper:
+    """Per-follower home timelines kept in Redis sorted sets (fan-out on write).
+
+    Members are "post_id:author_id" scored by created_at, so unfollowed authors can be
+    filtered out before hydration. Authors above TIMELINE_CELEBRITY_THRESHOLD followers
+    are not fanned out; their posts are pulled at read time instead (fan-out on read).
+    A timeline only holds complete history for the authors in its seeded set
+    (timeline:<user_id>:authors): fan-out skips unseeded timelines, and readers backfill
+    newly followed authors from SQL before serving.
+    """
+    CELEBRITY_KEY = "timeline:celebrities"
+    # Extra entries read past a cursor to absorb posts sharing the cursor's timestamp
+    TIE_SLACK = 20
+    
+    def __init__(self):
+        self.redis_client = get_redis()
+        self.max_length = settings.TIMELINE_MAX_LENGTH
+        self.celebrity_threshold = settings.TIMELINE_CELEBRITY_THRESHOLD
+    
+    def _key(self, user_id: int) -> str:
+        return f"timeline:{user_id}"
+    
+    def _authors_key(self, user_id: int) -> str:
+        return f"timeline:{user_id}:authors"
+    
+    def push_post(self, post_id: int, author_id: int, created_at: datetime, follower_ids: List[int]) -> bool:
+        """Fan a new post out to every follower's timeline, or mark the author for fan-out on read"""
+        try:
+            if len(follower_ids) >= self.celebrity_threshold:
+                self.redis_client.sadd(self.CELEBRITY_KEY, author_id)
+                return True
+            
+            # Only seeded timelines: a push would otherwise make a cold timeline look seeded
+            # and hide the follower's older feed. A timeline seeded after this check reads the
+            # post from SQL, which already has it
+            pipe = self.redis_client.pipeline(transaction=False)
+            for follower_id in follower_ids:
+                pipe.exists(self._authors_key(follower_id))
+            seeded = [follower_id for follower_id, exists in zip(follower_ids, pipe.execute()) if exists]
+            if not seeded:
+                return True
+            
+            member = f"{post_id}:{author_id}"
+            score = created_at.timestamp()
+            pipe = self.redis_client.pipeline(transaction=False)
+            for follower_id in seeded:
+                key = self._key(follower_id)
+                pipe.zadd(key, {member: score})
+                # Keep only the newest max_length entries
+                pipe.zremrangebyrank(key, 0, -(self.max_length + 1))
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Timeline fan-out error: {e}")
+            return False
+    
+    def rebuild(self, user_id: int, posts: list, author_ids: List[int]) -> bool:
+        """Seed the timeline with the newest posts of author_ids and mark those authors seeded"""
+        if not author_ids:
+            return True
+        try:
+            key = self._key(user_id)
+            pipe = self.redis_client.pipeline(transaction=False)
+            if posts:
+                pipe.zadd(key, {f"{post.id}:{post.user_id}": post.created_at.timestamp() for post in posts})
+                pipe.zremrangebyrank(key, 0, -(self.max_length + 1))
+            pipe.sadd(self._authors_key(user_id), *author_ids)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Timeline rebuild error: {e}")
+            return False
+    
+    def unseeded_authors(self, user_id: int, author_ids: List[int]) -> Optional[List[int]]:
+        """Followed authors whose history the timeline does not hold yet (all of them when cold).
+
+        Authors no longer followed leave the seeded set, so a re-follow backfills the posts
+        missed in between. None when Redis is unavailable.
+        """
+        try:
+            key = self._authors_key(user_id)
+            seeded = {int(author_id) for author_id in self.redis_client.smembers(key)}
+            following = set(author_ids)
+            unfollowed = seeded - following
+            if unfollowed:
+                self.redis_client.srem(key, *unfollowed)
+            return [author_id for author_id in author_ids if author_id not in seeded]
+        except Exception as e:
+            print(f"Timeline seed check error: {e}")
+            return None
+    
+    def get_entries(self, user_id: int, limit: int, before: Optional[Cursor] = None) -> Optional[List[TimelineEntry]]:
+        """Newest-first timeline entries older than the cursor.
+
+        Returns None when the timeline cannot answer the request (Redis error, or the
+        requested window reaches past the capped length) so callers fall back to SQL.
+        """
+        try:
+            key = self._key(user_id)
+            if before is None:
+                if limit > self.max_length:
+                    return None
+                raw = self.redis_client.zrevrange(key, 0, limit - 1, withscores=True)
+            else:
+                raw = self.redis_client.zrevrangebyscore(
+                    key, before[0].timestamp(), "-inf", start=0, num=limit + self.TIE_SLACK, withscores=True
+                )
+                if len(raw) < limit + self.TIE_SLACK and self.redis_client.zcard(key) >= self.max_length:
+                    # Older entries may have been trimmed away
+                    return None
+        except Exception as e:
+            print(f"Timeline read error: {e}")
+            return None
+        
+        entries = []
+        for member, score in raw:
+            post_id, author_id = (int(part) for part in member.split(":"))
+            entries.append((post_id, author_id, score))
+        if before is not None:
+            cursor_key = (before[0].timestamp(), before[1])
+            entries = [entry for entry in entries if (entry[2], entry[0]) < cursor_key]
+        entries.sort(key=lambda entry: (entry[2], entry[0]), reverse=True)
+        return entries[:limit]
+    
+    def get_celebrity_authors(self, author_ids: List[int]) -> List[int]:
+        """Subset of author_ids whose posts are fanned out on read"""
+        if not author_ids:
+            return []
+        try:
+            flags = self.redis_client.smismember(self.CELEBRITY_KEY, author_ids)
+            return [author_id for author_id, flag in zip(author_ids, flags) if flag]
+        except Exception as e:
+            print(f"Timeline celebrity lookup error: {e}")
+            return []
@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, List
+from app.config.settings import settings
+from app.util.executor import _percentiles
+
+class TranscodeQueueFullError(Exception):
+    """Raised when the transcode backlog is full and a new reel has to be refused"""
+
+def available_cores() -> int:
+    """Cores this process may run on (the cgroup/affinity set, not the whole host)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def transcode_slots() -> int:
+    """Concurrent FFmpeg processes per worker: TRANSCODE_WORKERS, or one per TRANSCODE_THREADS cores"""
+    if settings.TRANSCODE_WORKERS:
+        return settings.TRANSCODE_WORKERS
+    return max(1, available_cores() // settings.TRANSCODE_THREADS)
+
+def transcode_priority(duration: float) -> float:
+    """Heap key of a job: its submit time pushed back by TRANSCODE_DURATION_WEIGHT per clip second.
+
+    Short clips go first, but a long clip only yields to clips submitted within
+    duration * weight seconds after it, so it cannot starve under a steady stream of short ones.
+    """
+    return time.monotonic() + max(duration, 0) * settings.TRANSCODE_DURATION_WEIGHT
+
+class TranscodeScheduler:
+    """Runs transcode jobs on a fixed number of slots, shortest clip first.
+
+    Each slot is a thread driving one FFmpeg process (capped at TRANSCODE_THREADS threads),
+    so at most slots x threads cores encode at once no matter how many reels arrive; the
+    rest wait in a bounded priority queue whose wait times are recorded like ServiceExecutor's.
+    """
+
+    def __init__(self, slots: int, max_queue: int, name: str = "transcode", samples: int = 1024):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.name = name
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._queue_times = deque(maxlen=samples)
+        self._run_times = deque(maxlen=samples)
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._running = 0
+
+    def has_capacity(self) -> bool:
+        with self._condition:
+            return len(self._queue) < self.max_queue
+
+    def backlog(self) -> int:
+        """Jobs waiting for a slot"""
+        with self._condition:
+            return len(self._queue)
+
+    def submit(self, duration: float, func: Callable[..., Any], *args) -> None:
+        """Queue func(*args) for a slot; raises TranscodeQueueFullError when max_queue jobs are waiting"""
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("Transcode scheduler is shut down")
+            if len(self._queue) >= self.max_queue:
+                self._rejected += 1
+                raise TranscodeQueueFullError(f"{len(self._queue)} transcodes are already waiting")
+            heapq.heappush(self._queue, (transcode_priority(duration), next(self._sequence),
+                                         time.perf_counter(), func, args))
+            self._submitted += 1
+            self._start_threads()
+            self._condition.notify()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "slots": self.slots,
+                "threads_per_job": settings.TRANSCODE_THREADS,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": len(self._queue),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "queue_ms": _percentiles(sorted(self._queue_times)),
+                "run_ms": _percentiles(sorted(self._run_times)),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop taking jobs; running jobs finish, queued ones are dropped (their reels stay processing)"""
+        with self._condition:
+            self._stopping = True
+            self._queue.clear()
+            threads, self._threads = self._threads, []
+            self._condition.notify_all()
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _start_threads(self) -> None:
+        while len(self._threads) < self.slots:
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                _, _, submitted_at, func, args = heapq.heappop(self._queue)
+                started_at = time.perf_counter()
+                self._queue_times.append(started_at - submitted_at)
+                self._running += 1
+            failed = False
+            try:
+                func(*args)
+            except Exception as e:
+                failed = True
+                print(f"Transcode job error: {e}")
+            finally:
+                with self._condition:
+                    self._running -= 1
+                    self._completed += 1
+                    self._failed += failed
+                    self._run_times.append(time.perf_counter() - started_at)
+
+transcode_scheduler = TranscodeScheduler(transcode_slots(), settings.TRANSCODE_MAX_QUEUE)
+
+def transcode_stats() -> dict:
+    """Slots, backlog and recent queue/run times of this process's transcode scheduler"""
+    return transcode_scheduler.stats()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import tempfile
+from typing import BinaryIO, List, Optional
+from fastapi import UploadFile
+from app.config.settings import settings
+from app.util.executor import run_upload
+from app.util.image_pipeline import CONTENT_TYPES, has_variants, process_image
+from app.util.s3_helper import S3Helper, UploadTooLargeError
+
+# Bytes copied at a time while spooling an image for the image pool
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+def spool_to_file(stream: BinaryIO, max_size: int) -> str:
+    """Copy a stream to a temp file chunk by chunk and return its path; UploadTooLargeError past max_size"""
+    spooled = tempfile.NamedTemporaryFile(prefix="image_", delete=False)
+    try:
+        with spooled:
+            size = 0
+            while True:
+                chunk = stream.read(SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(f"Image exceeds the maximum size of {max_size} bytes")
+                spooled.write(chunk)
+        return spooled.name
+    except BaseException:
+        os.unlink(spooled.name)
+        raise
+
+async def upload_image_variants(s3_helper: S3Helper, file: UploadFile, max_size: Optional[int] = None) -> Optional[dict]:
+    """Resize and re-encode an uploaded image on the image pool and store its variants.
+
+    Images are capped at IMAGE_MAX_SIZE (and max_size): they are decoded whole, unlike other
+    uploads which stream. The upload is spooled to a temp file in chunks and the worker reads
+    it from there, so no copy of it is held in this process or pickled to the pool.
+    The original is not stored (its EXIF, GPS included, never reaches storage). Returns the
+    variant set: thumb/feed/full URLs, format and the full variant's size, or None for an animated
+    image, which is left to be stored as uploaded. If any variant fails to upload, the ones
+    already stored are deleted before the error is raised.
+    """
+    limit = min(max_size, settings.IMAGE_MAX_SIZE) if max_size is not None else settings.IMAGE_MAX_SIZE
+    if file.size is not None and file.size > limit:
+        raise UploadTooLargeError(f"Image exceeds the maximum size of {limit} bytes")
+    path = await run_upload(spool_to_file, file.file, limit)
+    try:
+        processed = await process_image(path)
+    finally:
+        os.unlink(path)
+    if processed is None:
+        return None
+    stem = os.path.splitext(file.filename or "image")[0]
+    names = list(processed["variants"])
+    urls = await asyncio.gather(
+        *(run_upload(s3_helper.upload_file, processed["variants"][name],
+                     f"{stem}_{name}.{processed['format']}", CONTENT_TYPES[processed["format"]])
+          for name in names),
+        return_exceptions=True
+    )
+    errors = [url for url in urls if isinstance(url, BaseException)]
+    if errors:
+        await asyncio.gather(*(run_upload(s3_helper.delete_file, url) for url in urls if isinstance(url, str)))
+        raise errors[0]
+    return {**dict(zip(names, urls)), "format": processed["format"],
+            "width": processed["width"], "height": processed["height"]}
+
+async def upload_files(s3_helper: S3Helper, files: List[UploadFile], max_size: Optional[int] = None,
+                       concurrency: int = 4, image_variants: bool = False) -> List[dict]:
+    """Upload files concurrently and return one result per file, in request order.
+    
+    At most `concurrency` files of this request are in flight; the upload pool caps the worker
+    as a whole. All or nothing: once a file fails, files not yet started are skipped and the
+    ones already stored are deleted again.
+    With image_variants, still images are stored as their variant set instead (result "variants",
+    "url" is the full variant).
+    Result status: uploaded, too_large, failed, skipped, rolled_back or orphaned (delete failed).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = asyncio.Event()
+    results = [
+        {"filename": file.filename, "content_type": file.content_type, "size": file.size,
+         "status": "pending", "url": None, "variants": None, "error": None}
+        for file in files
+    ]
+    
+    async def upload(file: UploadFile, result: dict):
+        async with semaphore:
+            if failed.is_set():
+                result["status"] = "skipped"
+                return
+            try:
+                if image_variants and has_variants(file.content_type):
+                    result["variants"] = await upload_image_variants(s3_helper, file, max_size)
+                    if result["variants"] is None:
+                        # Animated: store the file as uploaded, from the start again
+                        file.file.seek(0)
+                if result["variants"]:
+                    result["url"] = result["variants"]["full"]
+                else:
+                    result["url"] = await run_upload(
+                        s3_helper.upload_stream, file.file, file.filename, file.content_type, max_size
+                    )
+                result["status"] = "uploaded"
+            except Exception as e:
+                result["status"] = "too_large" if isinstance(e, UploadTooLargeError) else "failed"
+                result["error"] = str(e)
+                failed.set()
+    
+    await asyncio.gather(*(upload(file, result) for file, result in zip(files, results)))
+    
+    if failed.is_set():
+        uploaded = [result for result in results if result["status"] == "uploaded"]
+        deleted = await asyncio.gather(*(_delete_result(s3_helper, result) for result in uploaded))
+        for result, ok in zip(uploaded, deleted):
+            result["status"] = "rolled_back" if ok else "orphaned"
+    return results
+
+async def _delete_result(s3_helper: S3Helper, result: dict) -> bool:
+    """Delete everything one result stored: its variants, or the single object"""
+    variants = result["variants"]
+    urls = [variants["thumb"], variants["feed"], variants["full"]] if variants else [result["url"]]
+    deleted = await asyncio.gather(*(run_upload(s3_helper.delete_file, url) for url in urls))
+    return all(deleted)
@@ -0,0 +1,97 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from app.config.redis_config import get_redis
+from app.config.settings import settings
+from app.schema.upload_schema import PresignedUpload, UploadFileSpec, UploadSessionResponse
+from app.util.s3_helper import get_s3_helper
+
+class UploadSessionHelper:
+    """Direct-to-storage uploads: clients PUT media to presigned URLs instead of through the API.
+
+    A session records the object keys handed out (in Redis, for as long as the URLs are valid);
+    completing it HEADs every object and only then returns their URLs for the post or reel.
+    """
+    KEY_PREFIX = "upload_session"
+
+    def __init__(self):
+        self.redis_client = get_redis()
+        self.s3_helper = get_s3_helper()
+        self.ttl = settings.UPLOAD_SESSION_TTL
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{session_id}"
+
+    def create_session(self, user_id: int, kind: str, files: List[UploadFileSpec],
+                       allowed_types: Tuple[str, ...], max_files: Optional[int] = None) -> UploadSessionResponse:
+        """Validate the announced files and hand out one presigned PUT URL per file"""
+        max_files = max_files or settings.UPLOAD_SESSION_MAX_FILES
+        if not files:
+            raise ValueError("No files to upload")
+        if len(files) > max_files:
+            raise ValueError(f"At most {max_files} files can be uploaded at once")
+        for file in files:
+            if not file.content_type.startswith(allowed_types):
+                raise ValueError(f"File type {file.content_type} not supported")
+            if file.size <= 0 or file.size > settings.MAX_FILE_SIZE:
+                raise ValueError(f"File {file.filename} must be between 1 and {settings.MAX_FILE_SIZE} bytes")
+
+        session_id = uuid.uuid4().hex
+        entries = [
+            {"key": self.s3_helper.new_object_key(file.filename), "filename": file.filename,
+             "content_type": file.content_type, "size": file.size}
+            for file in files
+        ]
+        self.redis_client.set(
+            self._key(session_id),
+            json.dumps({"user_id": user_id, "kind": kind, "files": entries}),
+            ex=self.ttl
+        )
+
+        return UploadSessionResponse(
+            session_id=session_id,
+            expires_at=datetime.utcnow() + timedelta(seconds=self.ttl),
+            uploads=[
+                PresignedUpload(
+                    key=entry["key"],
+                    filename=entry["filename"],
+                    upload_url=self.s3_helper.get_presigned_upload_url(entry["key"], entry["content_type"], self.ttl),
+                    headers={"Content-Type": entry["content_type"]}
+                )
+                for entry in entries
+            ]
+        )
+
+    def complete_session(self, session_id: str, user_id: int, kind: str) -> List[dict]:
+        """HEAD every object of the session and return its files with their URLs.
+
+        Raises ValueError when the session is unknown or any object is missing or differs in
+        size or type from what was announced; mismatching objects are deleted so the client
+        can upload them again within the same session.
+        """
+        raw = self.redis_client.get(self._key(session_id))
+        session = json.loads(raw) if raw else None
+        if not session or session["user_id"] != user_id or session["kind"] != kind:
+            raise ValueError("Upload session not found or expired")
+
+        problems = []
+        for entry in session["files"]:
+            stored = self.s3_helper.head_file(entry["key"])
+            if stored is None:
+                problems.append(f"{entry['filename']} was not uploaded")
+                continue
+            if stored["size"] != entry["size"]:
+                problems.append(f"{entry['filename']} is {stored['size']} bytes, expected {entry['size']}")
+            elif stored["content_type"] != entry["content_type"]:
+                problems.append(f"{entry['filename']} is {stored['content_type']}, expected {entry['content_type']}")
+            else:
+                continue
+            self.s3_helper.delete_file(self.s3_helper.object_url(entry["key"]))
+        if problems:
+            raise ValueError("; ".join(problems))
+
+        # Claim the session so a repeated completion cannot create a second post or reel
+        if not self.redis_client.delete(self._key(session_id)):
+            raise ValueError("Upload session not found or expired")
+        return [{**entry, "url": self.s3_helper.object_url(entry["key"])} for entry in session["files"]]
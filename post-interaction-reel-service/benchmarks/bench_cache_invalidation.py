@@ -0,0 +1,88 @@
+"""
+Benchmark: Redis latency seen by other clients while the cache is invalidated.
+
+Loads N keys (default 1M), then measures PING latency from a second connection while
+each strategy runs:
+  * keys     - legacy KEYS pattern + DEL (blocks Redis for the whole keyspace)
+  * scan     - CacheHelper.delete_pattern (incremental SCAN + UNLINK batches)
+  * tag      - CacheHelper.invalidate_tag (SSCAN of one tag set + UNLINK)
+
+Usage (needs a disposable Redis, the benchmark FLUSHes the selected DB):
+    python -m benchmarks.bench_cache_invalidation --redis-url redis://localhost:6379/15 [--keys 1000000]
+"""
+import argparse
+import statistics
+import threading
+import time
+import redis
+from app.util.cache_helper import CacheHelper
+
+TAGGED_KEYS = 10000
+
+def load(client: redis.Redis, keys: int):
+    client.flushdb()
+    pipe = client.pipeline(transaction=False)
+    for i in range(keys):
+        pipe.set(f"bench:user_feed:{i}", "x" * 64)
+        if i < TAGGED_KEYS:
+            pipe.sadd("tag:bench", f"bench:user_feed:{i}")
+        if i % 10000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+def measure(redis_url: str, action) -> dict:
+    """Run action while a second client pings Redis; return latency stats in ms"""
+    probe = redis.from_url(redis_url)
+    samples = []
+    done = threading.Event()
+    
+    def ping_loop():
+        while not done.is_set():
+            start = time.perf_counter()
+            probe.ping()
+            samples.append((time.perf_counter() - start) * 1000)
+    
+    thread = threading.Thread(target=ping_loop)
+    thread.start()
+    start = time.perf_counter()
+    deleted = action()
+    elapsed = time.perf_counter() - start
+    done.set()
+    thread.join()
+    samples.sort()
+    return {
+        "deleted": deleted,
+        "wall_s": elapsed,
+        "ping_p50_ms": statistics.median(samples),
+        "ping_p99_ms": samples[int(len(samples) * 0.99) - 1],
+        "ping_max_ms": samples[-1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    client = redis.from_url(args.redis_url, decode_responses=True)
+    cache_helper = CacheHelper()
+    cache_helper.redis_client = client
+    
+    def keys_and_delete():
+        keys = client.keys("bench:user_feed:*")
+        return sum(client.delete(*keys[i:i + 10000]) for i in range(0, len(keys), 10000))
+    
+    strategies = {
+        "keys": keys_and_delete,
+        "scan": lambda: cache_helper.delete_pattern("bench:user_feed:*"),
+        "tag": lambda: cache_helper.invalidate_tag("bench"),
+    }
+    for name, action in strategies.items():
+        load(client, args.keys)
+        stats = measure(args.redis_url, action)
+        print(f"{name:<5} deleted={stats['deleted']:>8} wall={stats['wall_s']:.2f}s "
+              f"ping p50={stats['ping_p50_ms']:.2f}ms p99={stats['ping_p99_ms']:.2f}ms max={stats['ping_max_ms']:.2f}ms")
+    client.flushdb()
+
+if __name__ == "__main__":
+    main()
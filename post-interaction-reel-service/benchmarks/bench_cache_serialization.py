@@ -0,0 +1,121 @@
+"""
+Benchmark: cache hit latency and Redis memory per serializer/compression.
+
+Stores one global feed page (default 20 posts) under each codec configuration, then measures
+the hit path the service runs on every cached read: GET -> decode -> PostFeedResponse.
+  * legacy         - json.dumps text, json.loads
+  * <serializer>   - CacheCodec frames, optionally compressed above the threshold
+  * construct      - msgpack, but model_construct instead of validation
+
+pydantic v2 validates in Rust, so model_construct (pure Python) is slower than validating
+a decoded dict; hits skip pydantic entirely only through the pre-rendered response bytes.
+
+Memory is Redis MEMORY USAGE when run against a real server, else the stored payload size.
+
+Usage:
+    python -m benchmarks.bench_cache_serialization [--redis-url redis://localhost:6379/15] [--posts 20] [--iterations 2000]
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+import fakeredis
+import redis
+from app.schema.post_schema import PostFeedResponse, PostResponse
+from app.util.serializer import CacheCodec, _default
+
+CONFIGS = [
+    ("json", "none"),
+    ("orjson", "none"),
+    ("msgpack", "none"),
+    ("msgpack", "zlib"),
+    ("msgpack", "zstd"),
+    ("orjson", "zstd"),
+]
+
+def feed_page(posts: int) -> dict:
+    now = datetime(2024, 1, 1)
+    return {
+        "posts": [
+            {
+                "id": i,
+                "user_id": 1000 + i % 50,
+                "content": f"Post {i} " + "lorem ipsum dolor sit amet " * 8,
+                "media_url": [f"https://cdn.example.com/posts/{i}/{n}.jpg" for n in range(3)],
+                "type": "image",
+                "like_count": i * 7,
+                "comment_count": i * 3,
+                "created_at": now - timedelta(minutes=i),
+                "updated_at": now - timedelta(minutes=i),
+            }
+            for i in range(posts)
+        ],
+        "total": posts,
+        "page": 1,
+        "size": posts,
+        "has_next": True,
+        "next_cursor": "MjAyNC0wMS0wMVQwMDowMDowMHwx",
+    }
+
+def memory_usage(client: redis.Redis, key: str) -> int:
+    try:
+        return int(client.memory_usage(key))
+    except Exception:
+        return len(client.get(key))
+
+def hit_latency(iterations: int, hit) -> dict:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        hit()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {"p50_us": statistics.median(samples), "p99_us": samples[int(len(samples) * 0.99) - 1]}
+
+def run(client: redis.Redis, posts: int, iterations: int):
+    page = feed_page(posts)
+    rows = []
+
+    client.set("bench:legacy", json.dumps(page, default=_default))
+    def legacy_hit():
+        PostFeedResponse(**json.loads(client.get("bench:legacy")))
+    rows.append(("legacy json", memory_usage(client, "bench:legacy"), hit_latency(iterations, legacy_hit)))
+
+    for serializer, compression in CONFIGS:
+        codec = CacheCodec(serializer, compression)
+        key = f"bench:{serializer}:{compression}"
+        client.set(key, codec.encode(page))
+        def hit(codec=codec, key=key):
+            PostFeedResponse(**codec.decode(client.get(key)))
+        rows.append((f"{serializer}+{compression}", memory_usage(client, key), hit_latency(iterations, hit)))
+
+    codec = CacheCodec("msgpack", "none")
+    def construct_hit():
+        cached = codec.decode(client.get("bench:msgpack:none"))
+        PostFeedResponse.model_construct(
+            posts=[PostResponse.model_construct(**post) for post in cached["posts"]],
+            **{field: value for field, value in cached.items() if field != "posts"}
+        )
+    rows.append(("construct", memory_usage(client, "bench:msgpack:none"), hit_latency(iterations, construct_hit)))
+
+    print(f"{'codec':<18}{'bytes':>8}{'p50 us':>10}{'p99 us':>10}")
+    for name, size, latency in rows:
+        print(f"{name:<18}{size:>8}{latency['p50_us']:>10.1f}{latency['p99_us']:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", help="disposable Redis to measure against (default: in-process fakeredis)")
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    client = redis.from_url(args.redis_url) if args.redis_url else fakeredis.FakeRedis()
+    try:
+        run(client, args.posts, args.iterations)
+    finally:
+        for key in client.scan_iter(match="bench:*"):
+            client.delete(key)
+
+if __name__ == "__main__":
+    main()
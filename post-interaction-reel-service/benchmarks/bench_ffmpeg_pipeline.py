@@ -0,0 +1,79 @@
+"""
+Benchmark: wall time and CPU-seconds per reel, multi-pass vs single-pass FFmpeg pipeline.
+
+  * multi-pass  - the previous process_reel_video steps: ffprobe, process_video (which
+                  probes again and transcodes), then a thumbnail and an audio run that each
+                  decode the transcoded MP4 again
+  * single-pass - ffprobe once, then FFmpegWorker.transcode_reel: one decode, split filter,
+                  MP4 + thumbnail + MP3 outputs
+
+Inputs are synthetic clips generated locally with lavfi (testsrc2 + sine); uploads are not
+included. CPU-seconds are the user+sys time of the FFmpeg/ffprobe child processes.
+
+Usage:
+    python -m benchmarks.bench_ffmpeg_pipeline [--seconds 10] [--size 720x1280] [--repeat 3]
+"""
+import argparse
+import os
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from app.util.ffmpeg_worker import FFmpegWorker
+
+def make_clip(path: str, seconds: float, size: str) -> None:
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-shortest", "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", path
+    ], check=True)
+
+def multi_pass(worker: FFmpegWorker, source: str, out_dir: str) -> None:
+    video, thumbnail, audio = (os.path.join(out_dir, name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3"))
+    video_info = worker.get_video_info(source)
+    assert worker.process_video(source, video)
+    assert worker.generate_thumbnail(video, thumbnail)
+    if video_info.get("has_audio"):
+        assert worker.extract_audio(video, audio)
+
+def single_pass(worker: FFmpegWorker, source: str, out_dir: str) -> None:
+    video, thumbnail, audio = (os.path.join(out_dir, name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3"))
+    assert worker.transcode_reel(source, video, thumbnail, audio, worker.get_video_info(source))
+
+def measure(pipeline, worker: FFmpegWorker, source: str, repeat: int) -> dict:
+    walls, cpus = [], []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as out_dir:
+            before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            start = time.perf_counter()
+            pipeline(worker, source, out_dir)
+            walls.append(time.perf_counter() - start)
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpus.append((after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime))
+    return {"wall_s": statistics.median(walls), "cpu_s": statistics.median(cpus)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--size", default="720x1280")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    worker = FFmpegWorker()
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "source.mp4")
+        make_clip(source, args.seconds, args.size)
+        rows = [
+            ("multi-pass", measure(multi_pass, worker, source, args.repeat)),
+            ("single-pass", measure(single_pass, worker, source, args.repeat)),
+        ]
+    
+    print(f"{args.seconds:g}s {args.size} clip, {os.cpu_count()} CPUs")
+    print(f"{'pipeline':<14}{'wall s':>9}{'cpu s':>9}")
+    for name, result in rows:
+        print(f"{name:<14}{result['wall_s']:>9.2f}{result['cpu_s']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
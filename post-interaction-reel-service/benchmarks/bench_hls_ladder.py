@@ -0,0 +1,92 @@
+"""
+Benchmark: encode time of the HLS rendition ladder, one shared decode vs one FFmpeg run per rung.
+
+For each ladder (240p; 240p+480p; 240p+480p+720p) it reports wall time and CPU-seconds of
+  * shared  - FFmpegWorker.transcode_reel with hls_dir: MP4, thumbnail, audio and every rung
+              from one decode, the rungs' x264 encoders running side by side
+  * per-rung - transcode_reel without the ladder, then one FFmpeg run per rung (a decode each)
+The "mp4 only" row is the transcode without any ladder, so the ladder's own cost is the
+difference. Inputs are synthetic lavfi clips; uploads are not included.
+
+Usage:
+    python -m benchmarks.bench_hls_ladder [--seconds 10] [--size 720x1280] [--repeat 3]
+"""
+import argparse
+import os
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from unittest.mock import patch
+import ffmpeg
+from app.util import ffmpeg_worker as ffmpeg_module
+from app.util.ffmpeg_worker import FFmpegWorker, HLS_LADDER
+
+def make_clip(path: str, seconds: float, size: str) -> None:
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-shortest", "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", path
+    ], check=True)
+
+def outputs(out_dir: str) -> list:
+    return [os.path.join(out_dir, name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3")]
+
+def measure(run, repeat: int) -> dict:
+    walls, cpus = [], []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as out_dir:
+            before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            start = time.perf_counter()
+            run(out_dir)
+            walls.append(time.perf_counter() - start)
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpus.append((after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime))
+    return {"wall_s": statistics.median(walls), "cpu_s": statistics.median(cpus)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--size", default="720x1280")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    worker = FFmpegWorker()
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "source.mp4")
+        make_clip(source, args.seconds, args.size)
+        video_info = worker.get_video_info(source)
+        
+        def mp4_only(out_dir):
+            assert worker.transcode_reel(source, *outputs(out_dir), video_info)
+        
+        rows = [("mp4 only", "-", measure(mp4_only, args.repeat))]
+        for rungs in range(1, len(HLS_LADDER) + 1):
+            ladder = HLS_LADDER[:rungs]
+            name = "+".join(rung["name"] for rung in ladder)
+            
+            def shared(out_dir, ladder=ladder):
+                with patch.object(ffmpeg_module, "HLS_LADDER", ladder):
+                    assert worker.transcode_reel(source, *outputs(out_dir), video_info,
+                                                 hls_dir=os.path.join(out_dir, "hls"))
+            
+            def per_rung(out_dir, ladder=ladder):
+                mp4_only(out_dir)
+                for rung in ladder:
+                    stream = ffmpeg.input(source)
+                    hls_dir = os.path.join(out_dir, "hls", rung["name"])
+                    worker._hls_output(stream, [stream.video], [rung], video_info, hls_dir) \
+                        .overwrite_output().run(quiet=True)
+            
+            rows.append((name, "shared", measure(shared, args.repeat)))
+            rows.append((name, "per-rung", measure(per_rung, args.repeat)))
+    
+    print(f"{args.seconds:g}s {args.size} clip, {os.cpu_count()} CPUs")
+    print(f"{'ladder':<18}{'decode':<10}{'wall s':>9}{'cpu s':>9}")
+    for name, mode, result in rows:
+        print(f"{name:<18}{mode:<10}{result['wall_s']:>9.2f}{result['cpu_s']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: images/sec per core of the post image pipeline and bytes saved against the originals.
+
+--images camera-sized JPEGs (noise over gradients, --size, quality 92, with EXIF) go through
+make_variants (thumb/feed/full, IMAGE_FORMAT at IMAGE_QUALITY) on the image process pool, reading
+each photo from a spooled file like the upload path does:
+  * 1 worker     - the single-core rate
+  * N workers    - IMAGE_WORKERS or one per available core
+Bytes saved compares the stored variant set with storing only the original upload
+(what /posts/upload did before); "feed" compares what a feed page downloads per image.
+
+Usage:
+    python -m benchmarks.bench_image_pipeline [--images 24] [--size 4032x3024]
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageFilter
+from app.config.settings import settings
+from app.util.image_pipeline import image_format, make_variants
+from app.util.transcode_scheduler import available_cores
+
+def make_photo(width: int, height: int, seed: int) -> bytes:
+    """Photo-like JPEG: blurred noise has detail without compressing like flat colour"""
+    noise = Image.frombytes("L", (width // 8, height // 8), os.urandom(width // 8 * height // 8))
+    noise = noise.resize((width, height), Image.BICUBIC).filter(ImageFilter.GaussianBlur(2))
+    gradient = Image.linear_gradient("L").resize((width, height)).rotate(seed * 37 % 360)
+    image = Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    exif = Image.Exif()
+    exif[0x010F] = "BenchCam"  # Make
+    exif[0x0112] = 1  # Orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+def run(paths: list, workers: int, output_format: str) -> tuple:
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Warm the workers up so process start-up is not counted
+        list(pool.map(make_variants, paths[:workers], [output_format] * workers, [settings.IMAGE_QUALITY] * workers))
+        start = time.perf_counter()
+        results = list(pool.map(make_variants, paths, [output_format] * len(paths),
+                                [settings.IMAGE_QUALITY] * len(paths)))
+        return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--size", default="4032x3024")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split("x"))
+    photos = [make_photo(width, height, seed) for seed in range(args.images)]
+    output_format = image_format()
+    cores = available_cores()
+    workers = settings.IMAGE_WORKERS or cores
+
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = []
+        for i, photo in enumerate(photos):
+            paths.append(os.path.join(work_dir, f"photo_{i}.jpg"))
+            with open(paths[-1], "wb") as f:
+                f.write(photo)
+        for label, count in [("1 worker", 1)] + ([(f"{workers} workers", workers)] if workers > 1 else []):
+            elapsed, results = run(paths, count, output_format)
+            rows.append((label, count, elapsed))
+
+    original = sum(len(photo) for photo in photos)
+    stored = {name: sum(len(result["variants"][name]) for result in results) for name in ("thumb", "feed", "full")}
+    print(f"{args.images} JPEGs {args.size} q92 ({original / args.images / 1024:.0f} KB avg), "
+          f"{output_format} q{settings.IMAGE_QUALITY}, {cores} cores")
+    print(f"{'pool':<12}{'images/s':>10}{'images/s/core':>15}")
+    for label, count, elapsed in rows:
+        rate = args.images / elapsed
+        print(f"{label:<12}{rate:>10.2f}{rate / min(count, cores):>15.2f}")
+    total = sum(stored.values())
+    print(f"stored: original {original / 1024 / 1024:.1f} MB -> variants {total / 1024 / 1024:.1f} MB "
+          f"({(1 - total / original) * 100:.0f}% saved)")
+    print(f"per feed image: {original / args.images / 1024:.0f} KB -> {stored['feed'] / args.images / 1024:.0f} KB, "
+          f"thumb {stored['thumb'] / args.images / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: offset vs keyset (cursor) pagination at page 1 and page 500.
+
+Usage:
+    python -m benchmarks.bench_keyset_pagination [--database-url URL] [--rows N]
+
+Runs against an in-memory SQLite database by default; point --database-url at
+PostgreSQL to measure the production query plans.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.model.notification_model import Notification
+from app.repository.notification_repository import NotificationRepository
+from app.util.pagination import decode_cursor, next_cursor
+
+PAGE_SIZE = 20
+
+def seed(db, rows: int):
+    base_time = datetime(2024, 1, 1)
+    db.bulk_insert_mappings(Notification, [
+        {"id": i + 1, "user_id": 1, "actor_id": 2, "type": "like", "message": "bench",
+         "is_read": False, "created_at": base_time + timedelta(seconds=i)}
+        for i in range(rows)
+    ])
+    db.commit()
+
+def timed(fn, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Notification.__table__.drop(bind=engine, checkfirst=True)
+    Notification.__table__.create(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.rows)
+    repo = NotificationRepository(db)
+
+    # Walk to page 500 once to obtain the cursor a scrolling client would hold
+    cursor = None
+    for _ in range(499):
+        page = repo.get_user_notifications(1, limit=PAGE_SIZE, cursor=cursor)
+        cursor = decode_cursor(next_cursor(page, PAGE_SIZE))
+
+    results = {
+        "offset page 1": timed(lambda: repo.get_user_notifications(1, 0, PAGE_SIZE)),
+        "offset page 500": timed(lambda: repo.get_user_notifications(1, 499 * PAGE_SIZE, PAGE_SIZE)),
+        "cursor page 1": timed(lambda: repo.get_user_notifications(1, limit=PAGE_SIZE, cursor=None)),
+        "cursor page 500": timed(lambda: repo.get_user_notifications(1, limit=PAGE_SIZE, cursor=cursor)),
+    }
+    for name, ms in results.items():
+        print(f"{name:<18} {ms:8.3f} ms")
+
+    Notification.__table__.drop(bind=engine)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: /posts/upload latency for a multi-file post, serial vs concurrent uploads.
+
+Runs upload_files (the helper behind /posts/upload) over N in-memory files at several
+per-request concurrency caps; concurrency=1 is the old one-file-after-another loop.
+
+Storage is an in-process stand-in whose calls each take --rtt-ms, or a real S3-compatible
+endpoint (a local MinIO, or `moto_server -p 5000`) via --endpoint-url.
+
+Usage:
+    python -m benchmarks.bench_parallel_upload [--files 10] [--file-kb 512] [--rtt-ms 30]
+    python -m benchmarks.bench_parallel_upload --endpoint-url http://localhost:9000 --access-key minioadmin --secret-key minioadmin
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import time
+import boto3
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from app.util.executor import upload_executor
+from app.util.s3_helper import S3Helper
+from app.util.upload_helper import upload_files
+
+BUCKET = "bench-uploads"
+
+class LatencyS3Client:
+    """boto3 S3 client stand-in where every call costs one simulated round trip"""
+    
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000
+    
+    def _round_trip(self, **kwargs):
+        time.sleep(self.rtt)
+        return {"UploadId": "bench", "ETag": '"bench"'}
+    
+    put_object = create_multipart_upload = upload_part = complete_multipart_upload = _round_trip
+    abort_multipart_upload = delete_object = _round_trip
+
+def make_helper(args) -> S3Helper:
+    helper = S3Helper.__new__(S3Helper)
+    helper.use_minio = False
+    helper.bucket_name = BUCKET
+    if args.endpoint_url:
+        helper.s3_client = boto3.client(
+            "s3", endpoint_url=args.endpoint_url, region_name="us-east-1",
+            aws_access_key_id=args.access_key, aws_secret_access_key=args.secret_key
+        )
+        try:
+            helper.s3_client.create_bucket(Bucket=BUCKET)
+        except helper.s3_client.exceptions.ClientError:
+            pass  # already exists
+    else:
+        helper.s3_client = LatencyS3Client(args.rtt_ms)
+    return helper
+
+def make_files(count: int, size: int) -> list:
+    payload = bytes(size)
+    return [
+        UploadFile(io.BytesIO(payload), size=size, filename=f"photo{i}.jpg",
+                   headers=Headers({"content-type": "image/jpeg"}))
+        for i in range(count)
+    ]
+
+async def request_latency(helper: S3Helper, args, concurrency: int) -> float:
+    files = make_files(args.files, args.file_kb * 1024)
+    start = time.perf_counter()
+    results = await upload_files(helper, files, concurrency=concurrency)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert all(result["status"] == "uploaded" for result in results), results
+    return elapsed
+
+async def run(args):
+    helper = make_helper(args)
+    print(f"{'concurrency':<13}{'p50 ms':>9}{'max ms':>9}{'speedup':>9}")
+    baseline = None
+    for concurrency in args.concurrency:
+        samples = [await request_latency(helper, args, concurrency) for _ in range(args.repeat)]
+        p50 = statistics.median(samples)
+        baseline = baseline or p50
+        print(f"{concurrency:<13}{p50:>9.1f}{max(samples):>9.1f}{baseline / p50:>8.2f}x")
+    upload_executor.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--file-kb", type=int, default=512)
+    parser.add_argument("--rtt-ms", type=float, default=30.0, help="per-call latency of the in-process stand-in")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--endpoint-url", help="S3-compatible endpoint (MinIO, moto_server) instead of the stand-in")
+    parser.add_argument("--access-key", default="minioadmin")
+    parser.add_argument("--secret-key", default="minioadmin")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
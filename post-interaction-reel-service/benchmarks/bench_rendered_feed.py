@@ -0,0 +1,103 @@
+"""
+Benchmark: requests/sec for a cached global feed page, per response path.
+
+Each path serves the same cached page (default 20 posts) through a FastAPI route:
+  * response_model - cached dict -> PostFeedResponse -> FastAPI response_model encoding
+  * rendered       - pre-rendered bytes + ETag from AsyncCacheHelper.get_rendered
+  * not_modified   - rendered, with a matching If-None-Match (304, empty body)
+
+Runs in-process through TestClient against fakeredis, so the numbers compare the serving
+cost of each path rather than network or Redis latency.
+
+Usage:
+    python -m benchmarks.bench_rendered_feed [--posts 20] [--requests 2000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+import fakeredis.aioredis
+from fastapi import FastAPI, Header
+from fastapi.testclient import TestClient
+from app.schema.post_schema import PostFeedResponse
+from app.util.cache_helper import AsyncCacheHelper
+from app.util.local_cache import LocalCache
+from app.util.response_cache import get_or_render, rendered_response
+
+def feed_page(posts: int) -> dict:
+    now = datetime(2024, 1, 1)
+    return {
+        "posts": [
+            {
+                "id": i,
+                "user_id": 1000 + i % 50,
+                "content": f"Post {i} " + "lorem ipsum dolor sit amet " * 8,
+                "media_url": [f"https://cdn.example.com/posts/{i}/{n}.jpg" for n in range(3)],
+                "type": "image",
+                "like_count": i * 7,
+                "comment_count": i * 3,
+                "created_at": now - timedelta(minutes=i),
+                "updated_at": now - timedelta(minutes=i),
+            }
+            for i in range(posts)
+        ],
+        "total": posts,
+        "page": 1,
+        "size": posts,
+        "has_next": True,
+        "next_cursor": None,
+    }
+
+def build_app(posts: int) -> FastAPI:
+    app = FastAPI()
+    cache_helper = AsyncCacheHelper()
+    cache_helper.redis_client = fakeredis.aioredis.FakeRedis()
+    cache_helper.local_cache = LocalCache(1000, 64 * 1024 * 1024, 5.0)
+    page = feed_page(posts)
+    
+    async def build():
+        return PostFeedResponse(**page)
+    
+    @app.get("/model", response_model=PostFeedResponse)
+    async def model_feed():
+        cached = await cache_helper.get_cache("bench:model")
+        if cached is None:
+            await cache_helper.set_cache("bench:model", page)
+            cached = page
+        return PostFeedResponse(**cached)
+    
+    @app.get("/rendered")
+    async def rendered_feed(if_none_match: Optional[str] = Header(None)):
+        etag, body = await get_or_render(cache_helper, "bench:rendered", build, lambda feed: [])
+        return rendered_response(etag, body, if_none_match)
+    
+    return app
+
+def requests_per_second(client: TestClient, path: str, requests: int, headers: Optional[dict] = None) -> float:
+    client.get(path, headers=headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    
+    with TestClient(build_app(args.posts)) as client:
+        etag = client.get("/rendered").headers["etag"]
+        rows = [
+            ("response_model", requests_per_second(client, "/model", args.requests)),
+            ("rendered", requests_per_second(client, "/rendered", args.requests)),
+            ("not_modified", requests_per_second(client, "/rendered", args.requests, {"If-None-Match": etag})),
+        ]
+    
+    baseline = rows[0][1]
+    print(f"{'path':<16}{'req/s':>10}{'speedup':>10}")
+    for name, rate in rows:
+        print(f"{name:<16}{rate:>10.0f}{rate / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
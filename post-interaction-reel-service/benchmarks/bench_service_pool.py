@@ -0,0 +1,94 @@
+"""
+Benchmark: latency under concurrent mixed load, blocking calls inline vs on the service pool.
+
+Mixes slow "write" requests (a blocking call standing in for a SQLAlchemy/boto3 round trip)
+with fast "read" requests (pure async, e.g. a cache hit) against one worker:
+  * inline      - the blocking call runs directly in the async route (the old controllers)
+  * pool=N      - the blocking call goes through ServiceExecutor with N threads
+
+Requests arrive at a fixed rate (open loop) and latency is measured from each request's
+arrival, so time spent waiting for a blocked event loop is counted. Reports achieved
+throughput, read/write p50/p99 latency and the pool's p95 queue time. Inline, every read
+waits behind whichever writes are holding the event loop.
+
+Usage:
+    python -m benchmarks.bench_service_pool [--requests 400] [--rate 300] [--write-ratio 0.3] [--block-ms 20]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import httpx
+from fastapi import FastAPI
+from app.util.executor import ServiceExecutor
+
+def build_app(executor, block_ms: float) -> FastAPI:
+    app = FastAPI()
+    
+    def blocking_call():
+        time.sleep(block_ms / 1000)
+        return {"ok": True}
+    
+    @app.post("/write")
+    async def write():
+        if executor is None:
+            return blocking_call()
+        return await executor.run(blocking_call)
+    
+    @app.get("/read")
+    async def read():
+        return {"ok": True}
+    
+    return app
+
+async def run_load(app: FastAPI, requests: int, rate: float, write_ratio: float) -> dict:
+    """Open-loop load: request i is due at i / rate, and latency counts from when it was due"""
+    latencies = {"read": [], "write": []}
+    rng = random.Random(42)
+    kinds = ["write" if rng.random() < write_ratio else "read" for _ in range(requests)]
+    
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        
+        async def one(index: int, kind: str):
+            due = start + index / rate
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            if kind == "write":
+                await client.post("/write")
+            else:
+                await client.get("/read")
+            latencies[kind].append((loop.time() - due) * 1000)
+        
+        await asyncio.gather(*(one(index, kind) for index, kind in enumerate(kinds)))
+        elapsed = loop.time() - start
+    
+    return {"rps": requests / elapsed, **{kind: sorted(samples) for kind, samples in latencies.items()}}
+
+def p(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    return statistics.median(samples) if q == 0.5 else samples[min(len(samples) - 1, int(len(samples) * q))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=300.0, help="offered requests/sec")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--block-ms", type=float, default=20.0)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 4, 15])
+    args = parser.parse_args()
+    
+    modes = [("inline", None)] + [(f"pool={size}", ServiceExecutor(size)) for size in args.pool_sizes]
+    print(f"{'mode':<10}{'req/s':>8}{'read p50':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}{'queue p95':>11}")
+    for name, executor in modes:
+        result = asyncio.run(run_load(build_app(executor, args.block_ms), args.requests, args.rate, args.write_ratio))
+        queue_p95 = executor.stats()["queue_ms"]["p95"] if executor else 0.0
+        print(f"{name:<10}{result['rps']:>8.0f}{p(result['read'], 0.5):>10.1f}{p(result['read'], 0.99):>10.1f}"
+              f"{p(result['write'], 0.5):>11.1f}{p(result['write'], 0.99):>11.1f}{queue_p95:>11.1f}")
+        if executor:
+            executor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: per-request cost of constructing S3Helper, before and after the client registry.
+
+  * legacy   - what every S3Helper() used to do: build a new boto3/Minio client and, for
+               MinIO, call bucket_exists over the network
+  * registry - S3Helper() today: look up the process-wide pooled client
+
+Every request constructs at least one helper (PostService/ReelService do it in __init__).
+Without --endpoint-url the bucket check is skipped, so legacy shows client construction only.
+
+Usage:
+    python -m benchmarks.bench_storage_client [--iterations 200]
+    python -m benchmarks.bench_storage_client --endpoint-url localhost:9000 [--access-key minioadmin --secret-key minioadmin]
+"""
+import argparse
+import statistics
+import time
+import boto3
+from minio import Minio
+from app.util.s3_helper import S3Helper, get_storage_client
+
+def legacy_minio(args):
+    # region is pinned so the check is a single HEAD; without it minio first looks the region up too
+    client = Minio(args.endpoint_url or "localhost:9000", access_key=args.access_key,
+                   secret_key=args.secret_key, secure=False, region="us-east-1")
+    if args.endpoint_url:
+        client.bucket_exists("bench-bucket")
+
+def legacy_s3(args):
+    boto3.client("s3", aws_access_key_id=args.access_key, aws_secret_access_key=args.secret_key,
+                 region_name="us-east-1")
+
+def timed(iterations: int, construct) -> dict:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        construct()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {"p50_us": statistics.median(samples), "p99_us": samples[int(len(samples) * 0.99) - 1]}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--endpoint-url", help="host:port of a MinIO (or moto_server) to include the bucket check")
+    parser.add_argument("--access-key", default="minioadmin")
+    parser.add_argument("--secret-key", default="minioadmin")
+    args = parser.parse_args()
+    
+    get_storage_client()  # the registry builds its client once per process
+    rows = [
+        ("legacy minio", timed(args.iterations, lambda: legacy_minio(args))),
+        ("legacy boto3", timed(args.iterations, lambda: legacy_s3(args))),
+        ("registry", timed(args.iterations, S3Helper)),
+    ]
+    
+    print(f"{'construction':<16}{'p50 us':>12}{'p99 us':>12}")
+    for name, latency in rows:
+        print(f"{name:<16}{latency['p50_us']:>12.1f}{latency['p99_us']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
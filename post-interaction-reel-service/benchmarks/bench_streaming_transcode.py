@@ -0,0 +1,119 @@
+"""
+Benchmark: time-to-upload-complete and peak local disk of a reel transcode, temp file vs streaming.
+
+The source clip is put in a local S3-compatible server (moto) and FFmpegWorker.process_reel_video
+reads it through a presigned GET, then uploads its outputs to the same server:
+  * temp-file - MP4 written to the job's TemporaryDirectory, re-opened and uploaded afterwards
+  * streaming - fragmented MP4 piped from FFmpeg's stdout into the multipart upload
+Peak disk is the largest size of the job's temp directory, sampled every 5 ms. The HLS ladder is
+off so the two runs differ only in how the MP4 travels.
+
+Usage:
+    python -m benchmarks.bench_streaming_transcode [--seconds 20] [--size 720x1280] [--repeat 3]
+"""
+import argparse
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from minio import Minio
+from moto.server import ThreadedMotoServer
+from app.config.settings import settings
+from app.util.ffmpeg_worker import FFmpegWorker
+from app.util.s3_helper import S3Helper
+
+BUCKET = "bench-transcode"
+
+def make_clip(path: str, seconds: float, size: str) -> None:
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-shortest", "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", path
+    ], check=True)
+
+def storage(endpoint: str) -> S3Helper:
+    helper = S3Helper.__new__(S3Helper)
+    helper.use_minio = True
+    helper.bucket_name = BUCKET
+    helper.minio_client = Minio(endpoint, access_key="bench", secret_key="bench", secure=False, region="us-east-1")
+    if not helper.minio_client.bucket_exists(BUCKET):
+        helper.minio_client.make_bucket(BUCKET)
+    return helper
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def run_once(worker: FFmpegWorker, s3_helper: S3Helper, source_url: str, streaming: bool, scratch: str) -> dict:
+    peak, stop = [0], threading.Event()
+    
+    def sample():
+        while not stop.is_set():
+            peak[0] = max(peak[0], directory_size(scratch))
+            time.sleep(0.005)
+    
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    with patch.object(settings, "REEL_STREAMING_TRANSCODE", streaming), \
+         patch.object(settings, "REEL_HLS_ENABLED", False), \
+         patch("app.util.ffmpeg_worker.get_s3_helper", return_value=s3_helper), \
+         patch.object(tempfile, "tempdir", scratch):
+        start = time.perf_counter()
+        video_url, *_ = worker.process_reel_video(source_url)
+        elapsed = time.perf_counter() - start
+    stop.set()
+    sampler.join()
+    assert video_url, "transcode failed"
+    return {"seconds": elapsed, "peak_bytes": peak[0]}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--size", default="720x1280")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # moto's per-request log
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    try:
+        s3_helper = storage(f"127.0.0.1:{port}")
+        worker = FFmpegWorker()
+        with tempfile.TemporaryDirectory() as work_dir:
+            source = os.path.join(work_dir, "source.mp4")
+            make_clip(source, args.seconds, args.size)
+            with open(source, "rb") as f:
+                source_url = s3_helper.upload_object(f, "source.mp4", "video/mp4")
+            
+            rows = []
+            for name, streaming in (("temp-file", False), ("streaming", True)):
+                scratch = os.path.join(work_dir, name)
+                os.mkdir(scratch)
+                runs = [run_once(worker, s3_helper, source_url, streaming, scratch) for _ in range(args.repeat)]
+                rows.append((name, statistics.median(run["seconds"] for run in runs),
+                             max(run["peak_bytes"] for run in runs)))
+    finally:
+        server.stop()
+    
+    print(f"{args.seconds:g}s {args.size} clip, source read through a presigned GET")
+    print(f"{'mode':<12}{'upload done s':>15}{'peak disk MB':>14}")
+    for name, seconds, peak_bytes in rows:
+        print(f"{name:<12}{seconds:>15.2f}{peak_bytes / 1024 / 1024:>14.2f}")
+
+if __name__ == "__main__":
+    main()
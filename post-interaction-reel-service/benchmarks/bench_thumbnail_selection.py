@@ -0,0 +1,91 @@
+"""
+Benchmark: cost of picking the reel thumbnail from scored keyframes versus the fixed 1s frame.
+
+A --seconds clip (--size, keyframe every --gop frames) that opens on --black seconds of black,
+like a fade-in, is transcoded with FFmpegWorker.transcode_reel (MP4 + thumbnail + audio, no HLS):
+  * fixed    - REEL_THUMBNAIL_CANDIDATES=0, no sprite: the frame at 1s (what reels got before)
+  * selected - REEL_THUMBNAIL_CANDIDATES keyframes + the 1s frame scored, plus the sprite sheet
+Also reported: the separate-pass generate_thumbnail, the scoring cost per candidate (NumPy if
+installed, else Pillow) and the score of each resulting thumbnail (0 for a black frame).
+
+Usage:
+    python -m benchmarks.bench_thumbnail_selection [--seconds 15] [--size 720x1280] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from app.config.settings import settings
+from app.util import thumbnail_selector
+from app.util.ffmpeg_worker import FFmpegWorker
+from app.util.thumbnail_selector import frame_score
+
+def make_clip(path: str, seconds: float, black: float, size: str, gop: int) -> None:
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"color=black:size={size}:rate=30:duration={black}",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds - black}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-filter_complex", "[0][1]concat=n=2:v=1:a=0[v]", "-map", "[v]", "-map", "2:a",
+        "-c:v", "libx264", "-preset", "veryfast", "-g", str(gop), "-c:a", "aac", path
+    ], check=True)
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    assert func()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--black", type=float, default=1.5, help="seconds of black at the start")
+    parser.add_argument("--size", default="720x1280")
+    parser.add_argument("--gop", type=int, default=60, help="frames between source keyframes")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    
+    worker = FFmpegWorker()
+    candidates = settings.REEL_THUMBNAIL_CANDIDATES or 8
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "source.mp4")
+        make_clip(source, args.seconds, args.black, args.size, args.gop)
+        video_info = worker.get_video_info(source)
+        
+        def transcode(name: str, sprite: bool) -> bool:
+            outputs = [os.path.join(work_dir, f"{name}_{output}")
+                       for output in ("video.mp4", "thumbnail.jpg", "audio.mp3")]
+            sprite_output = os.path.join(work_dir, f"{name}_sprite.jpg") if sprite else None
+            return worker.transcode_reel(source, *outputs, video_info, sprite_output=sprite_output)
+        
+        # Interleaved, so both modes see the same machine load; medians of --runs
+        fixed, selected, separate = [], [], []
+        for _ in range(args.runs):
+            settings.REEL_THUMBNAIL_CANDIDATES = 0
+            fixed.append(timed(lambda: transcode("fixed", False)))
+            settings.REEL_THUMBNAIL_CANDIDATES = candidates
+            selected.append(timed(lambda: transcode("selected", True)))
+            separate.append(timed(lambda: worker.generate_thumbnail(source, os.path.join(work_dir, "separate.jpg"))))
+        fixed, selected, separate = (statistics.median(times) for times in (fixed, selected, separate))
+        
+        thumbnail = os.path.join(work_dir, "selected_thumbnail.jpg")
+        start = time.perf_counter()
+        for _ in range(20):
+            frame_score(thumbnail)
+        score_ms = (time.perf_counter() - start) / 20 * 1000
+        # abs: a black frame's entropy comes out as -0.0
+        scores = {name: abs(frame_score(os.path.join(work_dir, f"{name}_thumbnail.jpg")))
+                  for name in ("fixed", "selected")}
+        sprite_kb = os.path.getsize(os.path.join(work_dir, "selected_sprite.jpg")) / 1024
+    
+    print(f"{args.seconds:g}s clip {args.size}, {args.black:g}s black start, keyframe every {args.gop} frames, "
+          f"{candidates} candidates, scoring with {'numpy' if thumbnail_selector.np is not None else 'pillow'}")
+    print(f"{'mode':<26}{'transcode s':>12}{'thumb score':>13}")
+    print(f"{'fixed 1s frame':<26}{fixed:>12.2f}{scores['fixed']:>13.1f}")
+    print(f"{'selected + sprite':<26}{selected:>12.2f}{scores['selected']:>13.1f}")
+    print(f"overhead {(selected / fixed - 1) * 100:+.1f}% of the transcode; scoring {score_ms:.1f} ms/candidate; "
+          f"sprite {sprite_kb:.0f} KB; separate-pass generate_thumbnail {separate:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: reels/minute and completion latency of a burst of reel transcodes.
+
+A burst of --reels uploads (clip lengths cycling through --durations) arrives at once and is
+transcoded with FFmpegWorker.transcode_reel (MP4 + thumbnail + audio, no HLS ladder, no upload):
+  * unbounded - every reel gets its own FFmpeg at once with FFmpeg's default threads
+                (what ten simultaneous uploads did before the scheduler)
+  * scheduler - TranscodeScheduler with transcode_slots() slots, -threads TRANSCODE_THREADS
+                and shortest clip first
+Latency is from the burst's arrival to each reel's transcode finishing.
+
+Usage:
+    python -m benchmarks.bench_transcode_scheduler [--reels 10] [--durations 2,4,8] [--size 480x854]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import settings
+from app.util.ffmpeg_worker import FFmpegWorker
+from app.util.transcode_scheduler import TranscodeScheduler, available_cores, transcode_slots
+
+def make_clip(path: str, seconds: float, size: str) -> None:
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-shortest", "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", path
+    ], check=True)
+
+def transcode(worker: FFmpegWorker, source: str, video_info: dict, out_dir: str) -> None:
+    outputs = [os.path.join(out_dir, name) for name in ("video.mp4", "thumbnail.jpg", "audio.mp3")]
+    assert worker.transcode_reel(source, *outputs, video_info)
+
+def run_unbounded(jobs: list, work_dir: str) -> list:
+    worker = FFmpegWorker(threads=0)
+    start = time.perf_counter()
+    
+    def job(source, video_info):
+        out_dir = tempfile.mkdtemp(dir=work_dir)
+        transcode(worker, source, video_info, out_dir)
+        return time.perf_counter() - start
+    
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        return list(pool.map(lambda args: job(*args), jobs))
+
+def run_scheduled(jobs: list, work_dir: str) -> tuple:
+    worker = FFmpegWorker()
+    scheduler = TranscodeScheduler(transcode_slots(), max_queue=len(jobs))
+    finished, lock, done = [], threading.Lock(), threading.Event()
+    start = time.perf_counter()
+    
+    def job(source, video_info):
+        transcode(worker, source, video_info, tempfile.mkdtemp(dir=work_dir))
+        with lock:
+            finished.append(time.perf_counter() - start)
+            if len(finished) == len(jobs):
+                done.set()
+    
+    for source, video_info in jobs:
+        scheduler.submit(video_info["duration"], job, source, video_info)
+    done.wait()
+    stats = scheduler.stats()
+    scheduler.shutdown()
+    return finished, stats
+
+def summary(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "reels_per_min": len(latencies) / latencies[-1] * 60,
+        "mean_s": statistics.mean(latencies),
+        "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reels", type=int, default=10)
+    parser.add_argument("--durations", default="2,4,8", help="clip lengths in seconds, cycled over the burst")
+    parser.add_argument("--size", default="480x854")
+    args = parser.parse_args()
+    
+    worker = FFmpegWorker()
+    durations = [float(value) for value in args.durations.split(",")]
+    with tempfile.TemporaryDirectory() as work_dir:
+        clips = {}
+        for duration in durations:
+            path = os.path.join(work_dir, f"clip_{duration:g}s.mp4")
+            make_clip(path, duration, args.size)
+            clips[duration] = (path, worker.get_video_info(path))
+        # Longest first in arrival order, so FIFO and shortest-first differ
+        jobs = [clips[durations[-1 - i % len(durations)]] for i in range(args.reels)]
+        
+        rows = [("unbounded", summary(run_unbounded(jobs, work_dir)), None)]
+        latencies, stats = run_scheduled(jobs, work_dir)
+        rows.append(("scheduler", summary(latencies), stats))
+    
+    print(f"{args.reels} reels ({args.durations}s, {args.size}), {available_cores()} cores, "
+          f"{transcode_slots()} slots x {settings.TRANSCODE_THREADS} threads")
+    print(f"{'mode':<12}{'reels/min':>11}{'mean s':>9}{'p95 s':>9}{'queue p95 ms':>14}")
+    for name, result, stats in rows:
+        queue = f"{stats['queue_ms']['p95']:.0f}" if stats else "-"
+        print(f"{name:<12}{result['reels_per_min']:>11.1f}{result['mean_s']:>9.2f}{result['p95_s']:>9.2f}{queue:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -72,7 +72,8 @@ from app.config.database import Base, engine, SessionLocal, get_db
 from app.config.settings import settings
 
 # Models
-from app.model.post_model import Post, Comment, Like
+from app.model.post_model import Post, Like
+from app.model.comment_model import Comment
 from app.model.reel_model import Reel, ReelComment
 from app.model.notification_model import Notification
 
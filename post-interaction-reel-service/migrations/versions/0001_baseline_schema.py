@@ -0,0 +1,109 @@
+"""baseline schema (tables as created by Base.metadata.create_all)
+
+Databases created by create_all before the migrations owned the schema should be stamped instead:
+    alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-06-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "posts",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("content", sa.Text()),
+        sa.Column("media_url", postgresql.ARRAY(sa.String())),
+        sa.Column("type", sa.String(20)),
+        sa.Column("like_count", sa.Integer()),
+        sa.Column("comment_count", sa.Integer()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_posts_id", "posts", ["id"])
+    op.create_index("ix_posts_user_id", "posts", ["user_id"])
+
+    op.create_table(
+        "reels",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("video_url", sa.String(), nullable=False),
+        sa.Column("thumbnail_url", sa.String()),
+        sa.Column("audio_url", sa.String()),
+        sa.Column("duration", sa.Integer(), nullable=False),
+        sa.Column("view_count", sa.Integer()),
+        sa.Column("like_count", sa.Integer()),
+        sa.Column("comment_count", sa.Integer()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_reels_id", "reels", ["id"])
+    op.create_index("ix_reels_user_id", "reels", ["user_id"])
+
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("post_id", sa.BigInteger(), sa.ForeignKey("posts.id"), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("parent_id", sa.BigInteger(), sa.ForeignKey("comments.id")),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_comments_id", "comments", ["id"])
+    op.create_index("ix_comments_post_id", "comments", ["post_id"])
+    op.create_index("ix_comments_user_id", "comments", ["user_id"])
+
+    op.create_table(
+        "likes",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("post_id", sa.BigInteger(), sa.ForeignKey("posts.id")),
+        sa.Column("reel_id", sa.BigInteger(), sa.ForeignKey("reels.id")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_likes_id", "likes", ["id"])
+    op.create_index("ix_likes_user_id", "likes", ["user_id"])
+
+    op.create_table(
+        "reel_comments",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("reel_id", sa.BigInteger(), sa.ForeignKey("reels.id"), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("parent_id", sa.BigInteger(), sa.ForeignKey("reel_comments.id")),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_reel_comments_id", "reel_comments", ["id"])
+    op.create_index("ix_reel_comments_reel_id", "reel_comments", ["reel_id"])
+    op.create_index("ix_reel_comments_user_id", "reel_comments", ["user_id"])
+
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("actor_id", sa.BigInteger(), nullable=False),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("reference_id", sa.BigInteger()),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("is_read", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_notifications_id", "notifications", ["id"])
+    op.create_index("ix_notifications_user_id", "notifications", ["user_id"])
+    op.create_index("ix_notifications_actor_id", "notifications", ["actor_id"])
+
+def downgrade():
+    op.drop_table("notifications")
+    op.drop_table("reel_comments")
+    op.drop_table("likes")
+    op.drop_table("comments")
+    op.drop_table("reels")
+    op.drop_table("posts")
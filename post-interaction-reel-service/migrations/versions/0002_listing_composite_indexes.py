@@ -0,0 +1,43 @@
+"""composite indexes for feed, listing and like lookups
+
+The listing queries filter by an owner column and sort by (created_at desc, id desc);
+the cursor seek is a row comparison on the same pair, so one index serves both.
+CONCURRENTLY keeps writes flowing while the indexes build on a live PostgreSQL.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-06-02 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+CREATED_AT_ID_DESC = [sa.text("created_at DESC"), sa.text("id DESC")]
+
+INDEXES = [
+    ("ix_posts_user_id_created_at_id", "posts", [sa.text("user_id")] + CREATED_AT_ID_DESC),
+    ("ix_posts_created_at_id", "posts", CREATED_AT_ID_DESC),
+    ("ix_reels_user_id_created_at_id", "reels", [sa.text("user_id")] + CREATED_AT_ID_DESC),
+    ("ix_reels_created_at_id", "reels", CREATED_AT_ID_DESC),
+    ("ix_comments_post_id_created_at_id", "comments", [sa.text("post_id")] + CREATED_AT_ID_DESC),
+    ("ix_reel_comments_reel_id_created_at_id", "reel_comments", [sa.text("reel_id")] + CREATED_AT_ID_DESC),
+    ("ix_notifications_user_id_created_at_id", "notifications", [sa.text("user_id")] + CREATED_AT_ID_DESC),
+    ("ix_notifications_user_id_is_read", "notifications", ["user_id", "is_read"]),
+    ("ix_likes_user_id_post_id", "likes", ["user_id", "post_id"]),
+    ("ix_likes_user_id_reel_id", "likes", ["user_id", "reel_id"]),
+]
+
+def upgrade():
+    concurrently = {"postgresql_concurrently": True} if op.get_context().dialect.name == "postgresql" else {}
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, **concurrently)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
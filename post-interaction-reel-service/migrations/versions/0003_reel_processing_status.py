@@ -0,0 +1,29 @@
+"""reel processing status for the asynchronous transcode queue
+
+Reels are inserted as "processing" and moved to "ready" (or "failed") by the transcode
+worker; feeds only list ready reels. Existing rows were transcoded inline, so they
+default to ready.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-06-03 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def column_exists(table: str, column: str) -> bool:
+    return column in {existing["name"] for existing in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    # Databases built by create_all at startup (before the migrations owned the schema) have it already
+    if not op.get_context().as_sql and column_exists("reels", "status"):
+        return
+    op.add_column("reels", sa.Column("status", sa.String(20), nullable=False, server_default="ready"))
+
+def downgrade():
+    op.drop_column("reels", "status")
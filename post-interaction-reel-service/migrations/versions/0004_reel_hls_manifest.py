@@ -0,0 +1,29 @@
+"""reel HLS manifest URL
+
+Transcoded reels get a 240p/480p/720p HLS ladder next to the MP4; the column holds the
+URL of its master playlist. Reels transcoded before the ladder existed keep NULL and
+clients fall back to video_url.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-06-10 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def column_exists(table: str, column: str) -> bool:
+    return column in {existing["name"] for existing in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    # Databases built by create_all at startup (before the migrations owned the schema) have it already
+    if not op.get_context().as_sql and column_exists("reels", "hls_manifest_url"):
+        return
+    op.add_column("reels", sa.Column("hls_manifest_url", sa.String()))
+
+def downgrade():
+    op.drop_column("reels", "hls_manifest_url")
@@ -0,0 +1,35 @@
+"""content-addressed media index
+
+Uploads are hashed while they stream; media_blobs maps each SHA-256 to the one object
+holding those bytes and counts the uploads referencing it, so re-shared media is stored
+(and transcoded) once and an object is only deleted with its last reference.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-06-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases built by create_all at startup (before the migrations owned the schema) have it already
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table("media_blobs"):
+        return
+    op.create_table(
+        "media_blobs",
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("object_key", sa.String(), nullable=False, unique=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("content_type", sa.String(100)),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("transcode", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+def downgrade():
+    op.drop_table("media_blobs")
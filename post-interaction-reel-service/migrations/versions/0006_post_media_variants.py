@@ -0,0 +1,29 @@
+"""post media variants
+
+Uploaded post images are stored as thumb/feed/full WebP (or AVIF) variants without EXIF;
+the column maps each media URL of a post to its variant set so clients can pick a size.
+Posts created before the pipeline, and videos, keep NULL / no entry.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-06-24 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def column_exists(table: str, column: str) -> bool:
+    return column in {existing["name"] for existing in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    # Databases built by create_all at startup (before the migrations owned the schema) have it already
+    if not op.get_context().as_sql and column_exists("posts", "media_variants"):
+        return
+    op.add_column("posts", sa.Column("media_variants", sa.JSON()))
+
+def downgrade():
+    op.drop_column("posts", "media_variants")
@@ -0,0 +1,29 @@
+"""reel thumbnail sprite
+
+Reel thumbnails are picked from scored keyframes, and the same FFmpeg run renders a
+sprite sheet of evenly spaced frames for scrubbing. The column holds its URL and grid
+(columns, rows, tile width/height, seconds per tile); older reels keep NULL.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-07-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def column_exists(table: str, column: str) -> bool:
+    return column in {existing["name"] for existing in sa.inspect(op.get_bind()).get_columns(table)}
+
+def upgrade():
+    # Databases built by create_all at startup (before the migrations owned the schema) have it already
+    if not op.get_context().as_sql and column_exists("reels", "thumbnail_sprite"):
+        return
+    op.add_column("reels", sa.Column("thumbnail_sprite", sa.JSON()))
+
+def downgrade():
+    op.drop_column("reels", "thumbnail_sprite")